@@ -0,0 +1,11 @@
+"""
+Benchmarks for TFSnippet.
+
+Run all the benchmarks on CPU, and save the results as JSON::
+
+    python -m benchmarks.run -o results.json
+
+Compare the results against a previous run, to catch regressions::
+
+    python -m benchmarks.run -o new.json --compare results.json
+"""
@@ -0,0 +1,52 @@
+import numpy as np
+
+from tfsnippet.dataflows import DataFlow, SlidingWindow
+from .utils import benchmark
+
+ARRAY_SIZES = [10000, 100000, 1000000]
+BATCH_SIZE = 256
+N_FEATURES = 32
+
+
+def make_arrays(size):
+    random_state = np.random.RandomState(1234)
+    x = random_state.normal(size=[size, N_FEATURES]).astype(np.float32)
+    y = random_state.randint(0, 10, size=[size]).astype(np.int32)
+    return x, y
+
+
+def exhaust(flow):
+    for _ in flow:
+        pass
+
+
+@benchmark('dataflows.array_flow', size=ARRAY_SIZES, shuffle=[False, True])
+def bench_array_flow(size, shuffle):
+    flow = DataFlow.arrays(
+        make_arrays(size), batch_size=BATCH_SIZE, shuffle=shuffle,
+        random_state=np.random.RandomState(1234)
+    )
+    yield (lambda: exhaust(flow)), size
+
+
+@benchmark('dataflows.mapper_flow', size=ARRAY_SIZES)
+def bench_mapper_flow(size):
+    flow = DataFlow.arrays(make_arrays(size), batch_size=BATCH_SIZE). \
+        map(lambda x, y: (x * 2., y))
+    yield (lambda: exhaust(flow)), size
+
+
+@benchmark('dataflows.threading_flow', size=ARRAY_SIZES)
+def bench_threading_flow(size):
+    flow = DataFlow.arrays(make_arrays(size), batch_size=BATCH_SIZE)
+    with flow.threaded(prefetch=5) as threaded_flow:
+        yield (lambda: exhaust(threaded_flow)), size
+
+
+@benchmark('dataflows.sliding_window', size=ARRAY_SIZES,
+           mode=list(SlidingWindow.MODES))
+def bench_sliding_window(size, mode):
+    data = make_arrays(size)[0][:, :8]
+    sw = SlidingWindow(data, window_size=64, mode=mode)
+    flow = sw.as_flow(batch_size=BATCH_SIZE, shuffle=True)
+    yield (lambda: exhaust(flow)), sw.window_count
@@ -0,0 +1,90 @@
+from contextlib import contextmanager
+
+import numpy as np
+import tensorflow as tf
+
+from tfsnippet.layers import (CouplingLayer, InvertibleDense, SequentialFlow,
+                              dense)
+from tfsnippet.utils import create_session, ensure_variables_initialized
+from .utils import benchmark
+
+FLOW_DEPTHS = [2, 8]
+BATCH_SIZE = 64
+N_FEATURES = 16
+N_HIDDEN = 32
+RUNS_PER_ITER = 20
+
+
+def build_flow(depth):
+    """Build a flow with `depth` pairs of invertible dense and coupling."""
+    def shift_and_scale(x1, n2):
+        h = dense(x1, N_HIDDEN, activation_fn=tf.nn.relu)
+        return dense(h, n2, name='shift'), dense(h, n2, name='scale')
+
+    flows = []
+    for i in range(depth):
+        flows.append(InvertibleDense(strict_invertible=True))
+        flows.append(CouplingLayer(
+            tf.make_template('shift_and_scale_{}'.format(i), shift_and_scale),
+            secondary=bool(i % 2),
+            scale_type='sigmoid'
+        ))
+    return SequentialFlow(flows)
+
+
+def build_graph(depth):
+    x = tf.placeholder(tf.float32, shape=[None, N_FEATURES], name='x')
+    y = tf.placeholder(tf.float32, shape=[None, N_FEATURES], name='y')
+    flow = build_flow(depth)
+    transformed = flow.transform(x)
+    inverse_transformed = flow.inverse_transform(y)
+    return x, y, transformed, inverse_transformed
+
+
+@benchmark('flows.build_graph', depth=FLOW_DEPTHS)
+def bench_build_graph(depth):
+    def run():
+        with tf.Graph().as_default():
+            build_graph(depth)
+
+    yield run, 1
+
+
+@contextmanager
+def graph_runner(depth, inverse):
+    """Build the graph and open a session, to run the (inverse) transform."""
+    data = np.random.RandomState(1234).normal(
+        size=[BATCH_SIZE, N_FEATURES]).astype(np.float32)
+
+    graph = tf.Graph()
+    with graph.as_default():
+        x, y, transformed, inverse_transformed = build_graph(depth)
+        if inverse:
+            fetches, feed_dict = inverse_transformed, {y: data}
+        else:
+            fetches, feed_dict = transformed, {x: data}
+
+        session = create_session()
+        try:
+            with session.as_default():
+                ensure_variables_initialized()
+
+                def run():
+                    for _ in range(RUNS_PER_ITER):
+                        session.run(fetches, feed_dict=feed_dict)
+
+                yield run
+        finally:
+            session.close()
+
+
+@benchmark('flows.transform', depth=FLOW_DEPTHS)
+def bench_transform(depth):
+    with graph_runner(depth, inverse=False) as run:
+        yield run, RUNS_PER_ITER * BATCH_SIZE
+
+
+@benchmark('flows.inverse_transform', depth=FLOW_DEPTHS)
+def bench_inverse_transform(depth):
+    with graph_runner(depth, inverse=True) as run:
+        yield run, RUNS_PER_ITER * BATCH_SIZE
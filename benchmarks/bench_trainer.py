@@ -0,0 +1,80 @@
+from contextlib import contextmanager
+
+import numpy as np
+import tensorflow as tf
+
+from tfsnippet.dataflows import DataFlow
+from tfsnippet.scaffold import TrainLoop
+from tfsnippet.trainer import Trainer
+from tfsnippet.utils import create_session, ensure_variables_initialized
+from .utils import benchmark
+
+STEP_COUNTS = [100, 1000]
+BATCH_SIZE = 32
+N_FEATURES = 4
+
+
+def null_print(message):
+    pass
+
+
+@contextmanager
+def trivial_graph(steps):
+    """Build a trivial training graph, and open a session for it."""
+    graph = tf.Graph()
+    with graph.as_default():
+        x = tf.placeholder(tf.float32, shape=[None, N_FEATURES], name='x')
+        w = tf.get_variable('w', shape=[N_FEATURES],
+                            initializer=tf.zeros_initializer())
+        loss = tf.reduce_mean(tf.square(x - w))
+        train_op = tf.train.GradientDescentOptimizer(0.01).minimize(
+            loss, var_list=[w])
+        flow = DataFlow.arrays(
+            [np.zeros([steps * BATCH_SIZE, N_FEATURES], dtype=np.float32)],
+            batch_size=BATCH_SIZE
+        )
+
+        session = create_session()
+        try:
+            with session.as_default():
+                ensure_variables_initialized()
+                yield x, w, loss, train_op, flow, session
+        finally:
+            session.close()
+
+
+@benchmark('trainer.session_run_step', steps=STEP_COUNTS)
+def bench_session_run_step(steps):
+    # the baseline for measuring the overhead of `TrainLoop` and `Trainer`
+    with trivial_graph(steps) as (x, w, loss, train_op, flow, session):
+        def run():
+            for [batch_x] in flow:
+                session.run([loss, train_op], feed_dict={x: batch_x})
+
+        yield run, steps
+
+
+@benchmark('trainer.train_loop_step', steps=STEP_COUNTS)
+def bench_train_loop_step(steps):
+    with trivial_graph(steps) as (x, w, loss, train_op, flow, session):
+        def run():
+            with TrainLoop([w], max_epoch=1, print_func=null_print) as loop:
+                for _ in loop.iter_epochs():
+                    for _, [batch_x] in loop.iter_steps(flow):
+                        batch_loss, _ = session.run(
+                            [loss, train_op], feed_dict={x: batch_x})
+                        loop.collect_metrics(loss=batch_loss)
+
+        yield run, steps
+
+
+@benchmark('trainer.trainer_step', steps=STEP_COUNTS)
+def bench_trainer_step(steps):
+    with trivial_graph(steps) as (x, w, loss, train_op, flow, session):
+        def run():
+            with TrainLoop([w], max_epoch=1, print_func=null_print) as loop:
+                trainer = Trainer(loop, train_op, [x], flow,
+                                  metrics={'loss': loss})
+                trainer.run()
+
+        yield run, steps
@@ -0,0 +1,117 @@
+import codecs
+import json
+import os
+import platform
+import sys
+import time
+from collections import OrderedDict
+
+import click
+import numpy as np
+
+from .utils import compare_results, get_benchmarks, run_benchmark
+
+BENCHMARK_MODULES = ['dataflows', 'trainer', 'flows']
+
+
+def load_benchmarks(modules):
+    """Import the benchmark modules, so as to register the benchmarks."""
+    import importlib
+    for name in modules:
+        importlib.import_module('{}.bench_{}'.format(__package__, name))
+
+
+def get_environment():
+    import tensorflow as tf
+    import tfsnippet
+    return OrderedDict([
+        ('timestamp', time.strftime('%Y-%m-%dT%H:%M:%S')),
+        ('platform', platform.platform()),
+        ('python', platform.python_version()),
+        ('numpy', np.__version__),
+        ('tensorflow', tf.__version__),
+        ('tfsnippet', tfsnippet.__version__),
+    ])
+
+
+@click.command()
+@click.option('-k', '--filter', 'patterns', multiple=True,
+              help='Only run the benchmarks whose names match this regex. '
+                   'Can be specified multiple times.')
+@click.option('-m', '--module', 'modules', multiple=True,
+              type=click.Choice(BENCHMARK_MODULES),
+              help='Only load the benchmarks of this module.  Can be '
+                   'specified multiple times.')
+@click.option('--max-size', type=int, default=None,
+              help='Skip the benchmarks with `size` larger than this.')
+@click.option('-r', '--repeat', type=int, default=5, show_default=True,
+              help='Number of timed runs of each benchmark.')
+@click.option('-w', '--warmup', type=int, default=1, show_default=True,
+              help='Number of un-timed runs before the timed runs.')
+@click.option('-o', '--output', type=click.Path(dir_okay=False),
+              default=None, help='Save the JSON results to this file, '
+                                 'instead of printing to stdout.')
+@click.option('-c', '--compare', type=click.Path(exists=True, dir_okay=False),
+              default=None, help='Compare against the JSON results of a '
+                                 'previous run, and exit with code 1 if any '
+                                 'benchmark is slower than the tolerance.')
+@click.option('-t', '--tolerance', type=float, default=0.2,
+              show_default=True,
+              help='The tolerated relative slow-down when comparing.')
+@click.option('-l', '--list', 'list_only', is_flag=True, default=False,
+              help='List the benchmarks, without running them.')
+def main(patterns, modules, max_size, repeat, warmup, output, compare,
+         tolerance, list_only):
+    """Run the TFSnippet benchmarks on CPU."""
+    # hide the GPUs before TensorFlow is imported
+    os.environ.setdefault('CUDA_VISIBLE_DEVICES', '')
+    load_benchmarks(modules or BENCHMARK_MODULES)
+    tasks = []
+    for bench in get_benchmarks(patterns):
+        for params in bench.iter_params():
+            if max_size is not None and params.get('size', 0) > max_size:
+                continue
+            tasks.append((bench, params))
+
+    if list_only:
+        for bench, params in tasks:
+            click.echo('{} {}'.format(bench.name, json.dumps(params)))
+        return
+
+    results = []
+    for i, (bench, params) in enumerate(tasks, 1):
+        click.echo('[{}/{}] {} {} ...'.format(
+            i, len(tasks), bench.name, json.dumps(params)), err=True,
+            nl=False)
+        result = run_benchmark(bench, params, repeat=repeat, warmup=warmup)
+        click.echo(' {:.6g} sec'.format(result['median']), err=True)
+        results.append(result)
+
+    regressions = []
+    if compare:
+        with codecs.open(compare, 'rb', 'utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare_results(results, baseline, tolerance)
+        for r in regressions:
+            click.echo('Regression: {} {}: {:.3g}x slower than baseline.'.
+                       format(r['name'], json.dumps(r['params']),
+                              r['baseline_ratio']), err=True)
+
+    doc = OrderedDict([
+        ('environment', get_environment()),
+        ('config', OrderedDict([('repeat', repeat), ('warmup', warmup)])),
+        ('results', results),
+    ])
+    content = json.dumps(doc, indent=2)
+    if output:
+        with codecs.open(output, 'wb', 'utf-8') as f:
+            f.write(content)
+    else:
+        click.echo(content)
+
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+import itertools
+import re
+import timeit
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+import six
+
+__all__ = [
+    'Benchmark', 'benchmark', 'compare_results', 'get_benchmarks',
+    'run_benchmark',
+]
+
+_BENCHMARKS = []
+
+
+class Benchmark(object):
+    """
+    A registered benchmark, with a grid of parameters.
+
+    The benchmark function should be a generator function, which sets up
+    the benchmark with the given parameters, yields a tuple of
+    ``(run, items)``, and then tears down the benchmark after resumed.
+    ``run`` is a function without argument, executing the code to be timed
+    once, while ``items`` is the number of items processed by ``run``
+    (e.g., the number of data rows or training steps).
+    """
+
+    def __init__(self, name, func, params):
+        self.name = name
+        self.func = func
+        self.params = OrderedDict(sorted(six.iteritems(params)))
+
+    def iter_params(self):
+        """
+        Iterate through the combinations of parameters.
+
+        Yields:
+            dict: The parameters of each combination.
+        """
+        keys = list(self.params)
+        for values in itertools.product(*[self.params[k] for k in keys]):
+            yield OrderedDict(zip(keys, values))
+
+    def setup(self, params):
+        """
+        Set up the benchmark with `params`.
+
+        Returns:
+            A context manager, which gives the tuple ``(run, items)``.
+        """
+        return contextmanager(self.func)(**params)
+
+
+def benchmark(name, **params):
+    """
+    Decorator to register a benchmark function.
+
+    Args:
+        name (str): Name of the benchmark.
+        \\**params: The list of values of each parameter.  The benchmark
+            will be run with each combination of these values.
+    """
+    def wrapper(func):
+        _BENCHMARKS.append(Benchmark(name, func, params))
+        return func
+    return wrapper
+
+
+def get_benchmarks(patterns=None):
+    """
+    Get the registered benchmarks.
+
+    Args:
+        patterns (Iterable[str]): If specified, only the benchmarks whose
+            names match any of these regular expressions will be returned.
+
+    Returns:
+        list[Benchmark]: The benchmarks.
+    """
+    if patterns:
+        patterns = [re.compile(p) for p in patterns]
+        return [b for b in _BENCHMARKS
+                if any(p.search(b.name) for p in patterns)]
+    return list(_BENCHMARKS)
+
+
+def run_benchmark(bench, params, repeat=5, warmup=1):
+    """
+    Run a benchmark with `params`.
+
+    Args:
+        bench (Benchmark): The benchmark.
+        params (dict): The parameters.
+        repeat (int): Number of timed runs.
+        warmup (int): Number of un-timed runs before the timed runs.
+
+    Returns:
+        dict: The result, with the timing statistics in seconds.
+    """
+    with bench.setup(params) as (run, items):
+        for _ in range(warmup):
+            run()
+        times = []
+        for _ in range(repeat):
+            start_time = timeit.default_timer()
+            run()
+            times.append(timeit.default_timer() - start_time)
+
+    times = np.asarray(times)
+    median = float(np.median(times))
+    return OrderedDict([
+        ('name', bench.name),
+        ('params', params),
+        ('items', items),
+        ('repeat', repeat),
+        ('times', times.tolist()),
+        ('min', float(np.min(times))),
+        ('mean', float(np.mean(times))),
+        ('median', median),
+        ('std', float(np.std(times))),
+        ('items_per_sec', items / median if median > 0 else None),
+    ])
+
+
+def compare_results(results, baseline, tolerance):
+    """
+    Compare the results against the baseline results.
+
+    The ratio of the median time against that of the baseline will be stored
+    as ``baseline_ratio`` in each of `results` (if exists in the baseline).
+
+    Args:
+        results (list[dict]): The benchmark results.
+        baseline (list[dict]): The baseline benchmark results.
+        tolerance (float): The tolerated relative slow-down.
+
+    Returns:
+        list[dict]: The results slower than the baseline by more than
+            `tolerance`.
+    """
+    def key_of(r):
+        return r['name'], tuple(sorted(six.iteritems(r['params'])))
+
+    baseline = {key_of(r): r for r in baseline}
+    regressions = []
+    for r in results:
+        b = baseline.get(key_of(r))
+        if b is not None and b['median'] > 0:
+            r['baseline_ratio'] = r['median'] / b['median']
+            if r['baseline_ratio'] > 1. + tolerance:
+                regressions.append(r)
+    return regressions
@@ -1,3 +1,5 @@
+import pickle
+import time
 import unittest
 
 import numpy as np
@@ -5,6 +7,7 @@ import pytest
 
 from tfsnippet.dataflows import DataFlow
 from tfsnippet.dataflows.array_flow import ArrayFlow
+from tfsnippet.utils import PackedArray
 
 
 class ArrayFlowTestCase(unittest.TestCase):
@@ -19,6 +22,7 @@ class ArrayFlowTestCase(unittest.TestCase):
         self.assertEqual(2, df.array_count)
         self.assertEqual(5, df.data_length)
         self.assertEqual(((), (2,)), df.data_shapes)
+        self.assertEqual((arrays[0].dtype, arrays[1].dtype), df.data_dtypes)
         self.assertFalse(df.is_shuffled)
         self.assertFalse(df.skip_incomplete)
 
@@ -84,3 +88,246 @@ class ArrayFlowTestCase(unittest.TestCase):
         b = [a[0] for a in ArrayFlow([np.arange(12)], 5, shuffle=True)]
         self.assertEqual(3, len(b))
         np.testing.assert_array_equal(np.arange(12), sorted(np.concatenate(b)))
+
+    def test_gather_buffers(self):
+        x = np.arange(24).reshape([12, 2])
+        y = np.arange(12)
+        df = ArrayFlow([x, y], 5, shuffle=True, gather_buffers=2)
+        self.assertEqual(2, df.gather_buffers)
+
+        for epoch in range(2):
+            b = [(a[0].copy(), a[1].copy()) for a in df]
+            self.assertEqual(3, len(b))
+            self.assertEqual((2, 2), b[-1][0].shape)
+            for bx, by in b:
+                np.testing.assert_array_equal(x[by], bx)
+            np.testing.assert_array_equal(
+                y, sorted(np.concatenate([by for _, by in b])))
+
+        # the mini-batches should be read-only views of the buffers, which
+        # are used in turn
+        b = list(df)
+        for a in b:
+            self.assertFalse(a[0].flags.writeable)
+            self.assertFalse(a[1].flags.writeable)
+        self.assertIs(b[0][0].base, b[2][0].base)
+        self.assertIsNot(b[0][0].base, b[1][0].base)
+
+        # test numpy-like arrays which are not numpy arrays
+        class _ArrayLike(object):
+            def __init__(self, a):
+                self.a = a
+                self.shape = a.shape
+
+            def __len__(self):
+                return len(self.a)
+
+            def __getitem__(self, item):
+                return self.a[item]
+
+        df = ArrayFlow([_ArrayLike(x), y], 5, shuffle=True, gather_buffers=2)
+        for bx, by in df:
+            np.testing.assert_array_equal(x[by], bx)
+
+        with pytest.raises(
+                ValueError, match='`gather_buffers` must be at least 1'):
+            _ = ArrayFlow([x], 5, shuffle=True, gather_buffers=0)
+
+    def test_gather_buffers_threaded(self):
+        x = np.arange(78).reshape([39, 2])
+        y = np.arange(39)
+
+        # the consumer holds each mini-batch for a while, during which the
+        # buffer must not be overwritten by the prefetching worker, even if
+        # the worker has moved to the next epoch
+        for prefetch in (1, 3):
+            df = ArrayFlow([x, y], 3, shuffle=True,
+                           gather_buffers=prefetch + 2)
+            with df.threaded(prefetch) as threaded_df:
+                for epoch in range(3):
+                    b = []
+                    for bx, by in threaded_df:
+                        time.sleep(0.001)
+                        b.append((bx.copy(), by.copy()))
+                    self.assertEqual(13, len(b))
+                    for bx, by in b:
+                        np.testing.assert_array_equal(x[by], bx)
+                    np.testing.assert_array_equal(
+                        y, sorted(np.concatenate([by for _, by in b])))
+
+        # the buffers should be used in turn across the epochs
+        df = ArrayFlow([x, y], 16, shuffle=True, gather_buffers=2)
+        b = list(df) + list(df)
+        self.assertIs(b[0][0].base, b[4][0].base)
+        self.assertIsNot(b[2][0].base, b[3][0].base)
+
+        # test insufficient buffers for ThreadingFlow
+        df = ArrayFlow([x, y], 3, shuffle=True, gather_buffers=2)
+        with pytest.raises(
+                ValueError, match='ThreadingFlow with `prefetch` = 1 requires '
+                                  'the source `ArrayFlow` to have at least 3 '
+                                  '`gather_buffers`: got 2'):
+            _ = df.threaded(1)
+        _ = ArrayFlow([x, y], 3, shuffle=False, gather_buffers=2).threaded(1)
+
+    def test_packed_array(self):
+        data = np.arange(30, dtype=np.uint8).reshape([10, 3])
+        x = PackedArray(data, divisor=255.)
+        for shuffle, gather_buffers in [(False, None), (True, None),
+                                        (True, 2)]:
+            df = DataFlow.arrays(
+                [x, np.arange(10)], batch_size=4, shuffle=shuffle,
+                gather_buffers=gather_buffers,
+                random_state=np.random.RandomState(1234)
+            )
+            self.assertEqual(((3,), ()), df.data_shapes)
+            for batch_x, batch_y in df:
+                self.assertEqual(np.float32, batch_x.dtype)
+                np.testing.assert_allclose(
+                    data[batch_y].astype(np.float32) / 255., batch_x)
+
+    def test_shuffle_block_size(self):
+        x = np.arange(11)
+        df = DataFlow.arrays([x], 4, shuffle=True, shuffle_block_size=3)
+        self.assertEqual(3, df.shuffle_block_size)
+
+        for epoch in range(3):
+            b = np.concatenate([a[0] for a in df])
+            np.testing.assert_array_equal(x, sorted(b))
+            # each block of size 3 should be contiguous
+            blocks = []
+            i = 0
+            while i < len(b):
+                block_len = 2 if b[i] == 9 else 3
+                blocks.append(b[i: i + block_len])
+                i += block_len
+            for block in blocks:
+                np.testing.assert_array_equal(
+                    np.arange(block[0], block[0] + len(block)), block)
+                self.assertEqual(0, block[0] % 3)
+
+        with pytest.raises(
+                ValueError, match='`shuffle_block_size` must be at least 1'):
+            _ = ArrayFlow([x], 5, shuffle=True, shuffle_block_size=0)
+
+    def test_state(self):
+        def make_flow():
+            return ArrayFlow([np.arange(23)], 5, shuffle=True,
+                             random_state=np.random.RandomState(1234))
+
+        # the reference batches of two epochs
+        df = make_flow()
+        expected = [[a[0] for a in df] for _ in range(2)]
+
+        # interrupt at the 2nd mini-batch of the first epoch
+        df = make_flow()
+        it = iter(df)
+        np.testing.assert_array_equal(expected[0][0], next(it)[0])
+        np.testing.assert_array_equal(expected[0][1], next(it)[0])
+        state = pickle.loads(pickle.dumps(df.get_state()))
+        self.assertEqual(2, state['batch_cursor'])
+        it.close()
+
+        # restore the state into a new flow, and resume the epoch
+        df2 = ArrayFlow([np.arange(23)], 5, shuffle=True)
+        df2.set_state(state)
+        self.assertEqual(2, df2.get_state()['batch_cursor'])
+        b = [a[0] for a in df2]
+        self.assertEqual(3, len(b))
+        for x, y in zip(expected[0][2:], b):
+            np.testing.assert_array_equal(x, y)
+        self.assertEqual(0, df2.get_state()['batch_cursor'])
+
+        # the next epoch should be the same as the reference
+        for x, y in zip(expected[1], [a[0] for a in df2]):
+            np.testing.assert_array_equal(x, y)
+
+        # test the state at the end of an epoch
+        df = make_flow()
+        _ = list(df)
+        df2 = ArrayFlow([np.arange(23)], 5, shuffle=True)
+        df2.set_state(df.get_state())
+        for x, y in zip(expected[1], [a[0] for a in df2]):
+            np.testing.assert_array_equal(x, y)
+
+    def test_shards(self):
+        x = np.arange(23)
+
+        for shuffle, block_size, pad in [
+                (False, None, False), (False, None, True),
+                (True, None, False), (True, None, True),
+                (True, 4, False), (True, 4, True)]:
+            def make_flow(shard_index):
+                return DataFlow.arrays(
+                    [x], 3, shuffle=shuffle, shuffle_block_size=block_size,
+                    random_state=np.random.RandomState(1234),
+                    num_shards=4, shard_index=shard_index, pad_shards=pad
+                )
+
+            flows = [make_flow(i) for i in range(4)]
+            shard_length = 6 if pad else 5
+            for i, df in enumerate(flows):
+                self.assertEqual(4, df.num_shards)
+                self.assertEqual(i, df.shard_index)
+                self.assertEqual(pad, df.pad_shards)
+                self.assertEqual(23, df.total_length)
+                self.assertEqual(shard_length, df.data_length)
+
+            for epoch in range(3):
+                shards = [np.concatenate([a[0] for a in df]) for df in flows]
+                for s in shards:
+                    self.assertEqual(shard_length, len(s))
+                b = np.concatenate(shards)
+                if pad:
+                    # the first item should be repeated once
+                    np.testing.assert_array_equal(x, np.unique(b))
+                    self.assertEqual(b[0], b[-1])
+                else:
+                    self.assertEqual(20, len(np.unique(b)))
+                if not shuffle:
+                    np.testing.assert_array_equal(x[:20], b[:20])
+                elif block_size is not None:
+                    # the shards should be formed by contiguous blocks
+                    df = DataFlow.arrays(
+                        [x], 3, shuffle=True, shuffle_block_size=block_size,
+                        random_state=np.random.RandomState(1234))
+                    for _ in range(epoch + 1):
+                        full = np.concatenate([a[0] for a in df])
+                    np.testing.assert_array_equal(full[:20], b[:20])
+
+        # test padded shards starting beyond the end of the arrays
+        for length, num_shards, expected in [
+                (5, 4, [[0, 1], [2, 3], [4, 0], [1, 2]]),
+                (3, 5, [[0], [1], [2], [0], [1]])]:
+            y = np.arange(length)
+            for shuffle, block_size in [(False, None), (True, None),
+                                        (True, 2)]:
+                flows = [
+                    DataFlow.arrays(
+                        [y], 2, shuffle=shuffle, shuffle_block_size=block_size,
+                        random_state=np.random.RandomState(1234),
+                        num_shards=num_shards, shard_index=i, pad_shards=True
+                    )
+                    for i in range(num_shards)
+                ]
+                df = DataFlow.arrays(
+                    [y], 2, shuffle=shuffle, shuffle_block_size=block_size,
+                    random_state=np.random.RandomState(1234))
+                for epoch in range(2):
+                    full = np.concatenate([a[0] for a in df])
+                    for df_i, e in zip(flows, expected):
+                        np.testing.assert_array_equal(
+                            full[e], np.concatenate([a[0] for a in df_i]))
+
+        # test errors
+        with pytest.raises(ValueError, match='`num_shards` and `shard_index` '
+                                             'must be both specified'):
+            _ = ArrayFlow([x], 3, num_shards=2)
+        with pytest.raises(ValueError, match='`num_shards` must be at least 1'):
+            _ = ArrayFlow([x], 3, num_shards=0, shard_index=0)
+        with pytest.raises(ValueError, match='`shard_index` must be in the '
+                                             'range'):
+            _ = ArrayFlow([x], 3, num_shards=2, shard_index=2)
+        with pytest.raises(ValueError, match='`random_state` must be '
+                                             'specified'):
+            _ = ArrayFlow([x], 3, shuffle=True, num_shards=2, shard_index=0)
@@ -0,0 +1,114 @@
+import gc
+import time
+import unittest
+
+import numpy as np
+import pytest
+import six
+
+from tfsnippet.dataflows import DataFlow
+from tfsnippet.dataflows.async_flow import AsyncPrefetchFlow
+
+if not six.PY2:
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+
+def consume(loop, iterator, count=None):
+    """Consume the asynchronous iterator in `loop`."""
+    ret = []
+    while count is None or len(ret) < count:
+        try:
+            ret.append(loop.run_until_complete(iterator.__anext__()))
+        except StopAsyncIteration:
+            break
+    return ret
+
+
+@unittest.skipIf(six.PY2, 'asyncio is not available in Python 2')
+class AsyncPrefetchFlowTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        asyncio.set_event_loop(None)
+        self.loop.close()
+
+    def test_aiter(self):
+        flow = DataFlow.arrays([np.arange(10)], batch_size=4)
+        for _ in range(2):
+            batches = consume(self.loop, flow.__aiter__())
+            self.assertEqual(3, len(batches))
+            np.testing.assert_equal(np.arange(4), batches[0][0])
+            np.testing.assert_equal(np.arange(8, 10), batches[2][0])
+
+    def test_prefetch(self):
+        source = DataFlow.arrays([np.arange(10)], batch_size=4)
+        with ThreadPoolExecutor(1) as executor:
+            flow = source.async_prefetch(3, executor=executor)
+            self.assertIsInstance(flow, AsyncPrefetchFlow)
+            self.assertIs(source, flow.source)
+            self.assertEqual(3, flow.prefetch_num)
+            self.assertIs(executor, flow.executor)
+
+            # test the synchronous iteration
+            np.testing.assert_equal(
+                np.arange(10), np.concatenate([b[0] for b in flow]))
+
+            # test the asynchronous iteration
+            iterator = flow.__aiter__()
+            batches = consume(self.loop, iterator)
+            np.testing.assert_equal(
+                np.arange(10), np.concatenate([b[0] for b in batches]))
+            with pytest.raises(StopAsyncIteration):
+                self.loop.run_until_complete(iterator.__anext__())
+
+            # test leaving the loop early
+            iterator = flow.__aiter__()
+            self.assertEqual(1, len(consume(self.loop, iterator, 1)))
+            self.loop.run_until_complete(iterator.aclose())
+            with pytest.raises(StopAsyncIteration):
+                self.loop.run_until_complete(iterator.__anext__())
+            self.assertEqual(3, len(consume(self.loop, flow.__aiter__())))
+
+            # test the producer is stopped by garbage collecting the iterator
+            iterator = flow.__aiter__()
+            self.assertEqual(1, len(consume(self.loop, iterator, 1)))
+            del iterator
+            gc.collect()
+            executor.submit(lambda: None).result()
+            self.assertEqual(3, len(consume(self.loop, flow.__aiter__())))
+
+    def test_interleave(self):
+        def mapper(x):
+            time.sleep(0.02)
+            return x,
+
+        ticks = []
+
+        def tick():
+            ticks.append(time.time())
+            self.loop.call_later(0.005, tick)
+
+        flow = DataFlow.arrays([np.arange(10)], batch_size=2).map(mapper)
+        self.loop.call_soon(tick)
+        batches = consume(self.loop, flow.async_prefetch(2).__aiter__())
+        self.assertEqual(5, len(batches))
+        # the event loop should not be blocked by the source flow
+        self.assertGreater(len(ticks), 5)
+
+    def test_error(self):
+        def mapper(x):
+            raise ValueError('error in mapper')
+
+        flow = DataFlow.arrays([np.arange(10)], batch_size=2).map(mapper)
+        iterator = flow.__aiter__()
+        with pytest.raises(ValueError, match='error in mapper'):
+            _ = consume(self.loop, iterator)
+        with pytest.raises(StopAsyncIteration):
+            self.loop.run_until_complete(iterator.__anext__())
+
+        with pytest.raises(ValueError, match='`prefetch` must be at least 1'):
+            _ = flow.async_prefetch(0)
@@ -1,3 +1,4 @@
+import os
 import unittest
 
 import numpy as np
@@ -6,6 +7,7 @@ from mock import MagicMock
 
 from tfsnippet.dataflows import DataFlow
 from tfsnippet.dataflows.array_flow import ArrayFlow
+from tfsnippet.utils import TemporaryDirectory
 
 
 class _DataFlow(DataFlow):
@@ -55,6 +57,35 @@ class DataFlowTestCase(unittest.TestCase):
         df2 = df.to_arrays_flow(batch_size=6)
         self.assertIsInstance(df2, ArrayFlow)
 
+        # test skip incomplete
+        df = DataFlow.arrays([np.arange(10)], batch_size=4,
+                             skip_incomplete=True)
+        np.testing.assert_equal(np.arange(8), df.get_arrays()[0])
+
+        # test flow without data length
+        df = DataFlow.arrays([np.arange(10), np.arange(10, 20)], batch_size=3). \
+            map(lambda x, y: (x, y * 2.))
+        arrays = df.get_arrays()
+        np.testing.assert_equal(np.arange(10), arrays[0])
+        np.testing.assert_equal(np.arange(10, 20) * 2., arrays[1])
+
+    def test_get_arrays_memmap(self):
+        with TemporaryDirectory() as tmpdir:
+            df = DataFlow.arrays([np.arange(10), np.arange(10, 20)],
+                                 batch_size=3).map(lambda x, y: (x, y * 2.))
+            arrays = df.get_arrays(memmap_dir=tmpdir)
+            for arr in arrays:
+                self.assertIsInstance(arr, np.memmap)
+            np.testing.assert_equal(np.arange(10), arrays[0])
+            np.testing.assert_equal(np.arange(10, 20) * 2., arrays[1])
+            self.assertTrue(
+                os.path.isfile(os.path.join(tmpdir, 'array_1.dat')))
+
+            df2 = df.to_arrays_flow(batch_size=4, memmap_dir=tmpdir + '/2')
+            self.assertIsInstance(df2.the_arrays[0], np.memmap)
+            np.testing.assert_equal(np.arange(10), df2.get_arrays()[0])
+            del arrays, df2
+
     def test_implicit_iterator(self):
         df = DataFlow.arrays([np.arange(3)], batch_size=2)
         self.assertIsNone(df.current_batch)
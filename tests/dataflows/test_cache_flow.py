@@ -0,0 +1,112 @@
+import os
+import unittest
+
+import numpy as np
+import pytest
+from mock import Mock
+
+from tfsnippet.dataflows import DataFlow, CacheFlow
+from tfsnippet.preprocessing import BernoulliSampler
+from tfsnippet.utils import TemporaryDirectory
+
+
+class CacheFlowTestCase(unittest.TestCase):
+
+    def test_cache(self):
+        x = np.arange(10)
+        mapper = Mock(wraps=lambda x: (x * 2,))
+        source = DataFlow.arrays([x], batch_size=3).map(mapper)
+        df = source.cache()
+        self.assertIsInstance(df, CacheFlow)
+        self.assertIs(source, df.source)
+        self.assertIsNone(df.max_bytes)
+        self.assertIsNone(df.spill_dir)
+        self.assertTrue(df.cache_enabled)
+        self.assertFalse(df.is_cached)
+
+        for epoch in range(3):
+            b = list(df)
+            self.assertEqual(4, len(b))
+            np.testing.assert_array_equal(
+                x * 2, np.concatenate([a[0] for a in b]))
+            self.assertTrue(df.is_cached)
+            self.assertEqual(4, mapper.call_count)
+        self.assertEqual(x.nbytes, df.in_memory_bytes)
+
+        # the cached arrays should not be affected by in-place modifications
+        df.clear_cache()
+        for a in df:
+            a[0][:] = 0
+        np.testing.assert_array_equal(
+            x * 2, np.concatenate([a[0] for a in df]))
+        self.assertEqual(8, mapper.call_count)
+
+        # the partial cache of an incomplete epoch should be discarded
+        df.clear_cache()
+        for _ in df:
+            break
+        self.assertFalse(df.is_cached)
+        _ = list(df)
+        self.assertTrue(df.is_cached)
+
+    def test_max_bytes(self):
+        x = np.arange(10, dtype=np.int64)
+        mapper = Mock(wraps=lambda x: (x * 2,))
+        source = DataFlow.arrays([x], batch_size=3).map(mapper)
+
+        # no spill directory, drop the cache once it exceeds the budget
+        df = source.cache(max_bytes=48)
+        self.assertEqual(48, df.max_bytes)
+        for epoch in range(2):
+            np.testing.assert_array_equal(
+                x * 2, np.concatenate([a[0] for a in df]))
+        self.assertFalse(df.is_cached)
+        self.assertEqual(8, mapper.call_count)
+
+        # spill the batches exceeding the budget
+        mapper.reset_mock()
+        with TemporaryDirectory() as tmpdir:
+            df = source.cache(max_bytes=48, spill_dir=tmpdir)
+            self.assertEqual(tmpdir, df.spill_dir)
+            for epoch in range(3):
+                np.testing.assert_array_equal(
+                    x * 2, np.concatenate([a[0] for a in df]))
+            self.assertTrue(df.is_cached)
+            self.assertEqual(4, mapper.call_count)
+            self.assertEqual(48, df.in_memory_bytes)
+            self.assertEqual(1, len(os.listdir(tmpdir)))
+
+            df.clear_cache()
+            self.assertEqual([], os.listdir(tmpdir))
+
+        with pytest.raises(ValueError, match='`max_bytes` must be '
+                                             'non-negative'):
+            _ = source.cache(max_bytes=-1)
+
+    def test_stochastic_source(self):
+        x = np.arange(10)
+        self.assertFalse(DataFlow.arrays([x], 3, shuffle=True).
+                         cache().cache_enabled)
+        self.assertFalse(DataFlow.seq(0, 10, batch_size=3, shuffle=True).
+                         cache().cache_enabled)
+        self.assertFalse(DataFlow.arrays([x], 3).
+                         map(BernoulliSampler(), array_indices=[0]).
+                         map(lambda x: (x,)).cache().cache_enabled)
+        self.assertFalse(DataFlow.gather([
+            DataFlow.arrays([x], 3),
+            DataFlow.arrays([x], 3, shuffle=True)
+        ]).cache().cache_enabled)
+        self.assertTrue(DataFlow.arrays([x], 3).threaded(2).
+                        cache().cache_enabled)
+
+        # the stochastic source should be iterated in every epoch
+        df = DataFlow.arrays([x], 3, shuffle=True).cache()
+        _ = list(df)
+        self.assertFalse(df.is_cached)
+
+        # force caching
+        df = DataFlow.arrays([x], 3, shuffle=True).cache(force=True)
+        self.assertTrue(df.cache_enabled)
+        b = np.concatenate([a[0] for a in df])
+        np.testing.assert_array_equal(b, np.concatenate([a[0] for a in df]))
+        self.assertTrue(df.map(lambda x: (x,)).cache().cache_enabled)
@@ -1,3 +1,4 @@
+import os
 import unittest
 
 import numpy as np
@@ -5,6 +6,7 @@ import pytest
 from mock import Mock
 
 from tfsnippet.dataflows import DataMapper, SlidingWindow
+from tfsnippet.utils import TemporaryDirectory
 
 
 class DataMapperTestCase(unittest.TestCase):
@@ -50,3 +52,78 @@ class SlidingWindowTestCase(unittest.TestCase):
             [[8, 9, 10], [9, 10, 11], [10, 11, 12]],
             batches[2][0]
         )
+
+    def test_modes(self):
+        arr = np.arange(40).reshape([20, 2])
+        sw = SlidingWindow(arr, window_size=3, stride=2, horizon=2)
+        self.assertEqual('strided', sw.mode)
+        self.assertEqual(2, sw.stride)
+        self.assertEqual(2, sw.horizon)
+        self.assertEqual(8, sw.window_count)
+
+        def expected(indices):
+            windows = np.stack([arr[i * 2: i * 2 + 3] for i in indices])
+            targets = np.stack([arr[i * 2 + 3: i * 2 + 5] for i in indices])
+            return windows, targets
+
+        for mode in SlidingWindow.MODES:
+            sw = SlidingWindow(arr, window_size=3, stride=2, horizon=2,
+                               mode=mode)
+            for indices in ([0, 1, 2], [7, 0, 3], [2], [0, 7], [6, 7]):
+                w, t = sw(np.asarray(indices, dtype=np.int32))
+                ew, et = expected(indices)
+                np.testing.assert_equal(ew, w)
+                np.testing.assert_equal(et, t)
+
+            # test N-d indices
+            indices = np.asarray([[0, 1, 2], [7, 0, 3]])
+            w, t = sw(indices)
+            self.assertEqual((2, 3, 3, 2), w.shape)
+            self.assertEqual((2, 3, 2, 2), t.shape)
+            for i in range(2):
+                ew, et = expected(indices[i])
+                np.testing.assert_equal(ew, w[i])
+                np.testing.assert_equal(et, t[i])
+            w, t = sw(np.asarray(3))
+            ew, et = expected([3])
+            np.testing.assert_equal(ew[0], w)
+            np.testing.assert_equal(et[0], t)
+
+            b = list(sw.as_flow(batch_size=3))
+            self.assertEqual([3, 3, 2], [len(a[0]) for a in b])
+            np.testing.assert_equal(
+                expected(range(8))[0], np.concatenate([a[0] for a in b]))
+
+        # the consecutive windows should be views in strided mode
+        sw = SlidingWindow(arr, window_size=3)
+        w = sw(np.arange(3, 7))[0]
+        self.assertFalse(w.flags.writeable)
+        self.assertTrue(np.shares_memory(w, arr))
+        np.testing.assert_equal([[6, 7], [8, 9], [10, 11]], w[0])
+
+    def test_memmap(self):
+        with TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'data.npy')
+            np.save(path, np.arange(1000))
+            arr = np.load(path, mmap_mode='r')
+            sw = SlidingWindow(arr, window_size=10, horizon=1)
+            self.assertEqual('gather', sw.mode)
+            for indices in ([0, 5, 3], [989, 0]):
+                w, t = sw(np.asarray(indices))
+                np.testing.assert_equal(
+                    np.asarray(indices).reshape([-1, 1]) + np.arange(10), w)
+                np.testing.assert_equal(
+                    np.asarray(indices).reshape([-1, 1]) + 10, t)
+            del sw, arr, w, t
+
+    def test_errors(self):
+        arr = np.arange(10)
+        with pytest.raises(ValueError, match='`window_size` must be at '
+                                             'least 1'):
+            _ = SlidingWindow(arr, window_size=0)
+        with pytest.raises(ValueError, match='`stride` must be at least 1'):
+            _ = SlidingWindow(arr, window_size=2, stride=0)
+        with pytest.raises(ValueError, match='`horizon` must be non-negative'):
+            _ = SlidingWindow(arr, window_size=2, horizon=-1)
+        with pytest.raises(ValueError, match='`mode` must be one of'):
+            _ = SlidingWindow(arr, window_size=2, mode='xyz')
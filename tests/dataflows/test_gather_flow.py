@@ -22,9 +22,76 @@ class GatherFlowTestCase(unittest.TestCase):
         np.testing.assert_equal(np.arange(4, 8), batches[1][0])
         np.testing.assert_equal(np.arange(14, 17), batches[1][1])
 
+    def test_prefetch(self):
+        x_flow = DataFlow.arrays([np.arange(10)], batch_size=4)
+        y_flow = DataFlow.arrays([np.arange(10, 20), np.arange(20, 30)],
+                                 batch_size=4)
+        flow = DataFlow.gather([x_flow, y_flow], prefetch=2)
+        self.assertEqual(2, flow.prefetch)
+        self.assertEqual('ignore', flow.on_mismatch)
+
+        with flow:
+            for _ in range(3):
+                batches = list(flow)
+                self.assertEqual(3, len(batches))
+                for i, (x, y, z) in enumerate(batches):
+                    np.testing.assert_equal(np.arange(10)[i * 4: i * 4 + 4], x)
+                    np.testing.assert_equal(x + 10, y)
+                    np.testing.assert_equal(x + 20, z)
+
+            # stop iterating in the middle of an epoch
+            for b in flow:
+                break
+            np.testing.assert_equal(np.arange(4), list(flow)[0][0])
+        self.assertIsNone(flow._threaded_flows)
+
+    def test_mismatch(self):
+        x_flow = DataFlow.arrays([np.arange(10)], batch_size=4)
+        y_flow = DataFlow.arrays([np.arange(10, 17)], batch_size=4)
+        z_flow = DataFlow.arrays([np.arange(20, 30)], batch_size=3)
+
+        # truncate the mismatched mini-batches
+        flow = DataFlow.gather([x_flow, y_flow], on_mismatch='truncate')
+        batches = list(flow)
+        self.assertEqual(2, len(batches))
+        np.testing.assert_equal(np.arange(4, 7), batches[1][0])
+        np.testing.assert_equal(np.arange(14, 17), batches[1][1])
+
+        flow = DataFlow.gather([z_flow, x_flow], on_mismatch='truncate')
+        batches = list(flow)
+        self.assertEqual(3, len(batches))
+        np.testing.assert_equal(np.arange(8, 10), batches[2][1])
+        np.testing.assert_equal(np.arange(26, 28), batches[2][0])
+
+        # raise errors for the mismatched mini-batches
+        w_flow = DataFlow.arrays([np.arange(8)], batch_size=4)
+        flow = DataFlow.gather(
+            [x_flow, DataFlow.arrays([np.arange(10)], batch_size=4)],
+            on_mismatch='raise'
+        )
+        self.assertEqual(3, len(list(flow)))
+
+        with pytest.raises(ValueError, match='The mini-batches of the '
+                                             'gathered flows have different '
+                                             'lengths: \\[4, 3\\]'):
+            _ = list(DataFlow.gather([x_flow, z_flow], on_mismatch='raise'))
+        with pytest.raises(ValueError, match='The gathered flows have '
+                                             'different numbers of '
+                                             'mini-batches'):
+            _ = list(DataFlow.gather([w_flow, x_flow], on_mismatch='raise'))
+        with pytest.raises(ValueError, match='The gathered flows have '
+                                             'different numbers of '
+                                             'mini-batches'):
+            _ = list(DataFlow.gather([x_flow, w_flow], on_mismatch='raise'))
+
     def test_errors(self):
         with pytest.raises(
                 ValueError, match='At least one flow must be specified'):
             _ = DataFlow.gather([])
         with pytest.raises(TypeError, match='Not a DataFlow'):
             _ = DataFlow.gather([1])
+        x_flow = DataFlow.arrays([np.arange(10)], batch_size=4)
+        with pytest.raises(ValueError, match='`prefetch` must be at least 1'):
+            _ = DataFlow.gather([x_flow], prefetch=0)
+        with pytest.raises(ValueError, match='`on_mismatch` must be one of'):
+            _ = DataFlow.gather([x_flow], on_mismatch='xyz')
@@ -1,3 +1,4 @@
+import time
 import unittest
 
 import numpy as np
@@ -6,6 +7,10 @@ import pytest
 from tfsnippet.dataflows import DataFlow
 
 
+class _MyError(Exception):
+    pass
+
+
 class MapperFlowTestCase(unittest.TestCase):
 
     def test_map_to_tuple(self):
@@ -71,6 +76,92 @@ class MapperFlowTestCase(unittest.TestCase):
             [[4], [18], [14], [57]]
         )
 
+    def test_parallel_map(self):
+        x = np.arange(100)
+        y = np.arange(100, 200)
+        source = DataFlow.arrays([x, y], batch_size=7)
+
+        def mapper(x):
+            # sleep for a random time, such that the mapped batches would
+            # be out of order if not kept in order
+            time.sleep(np.random.random() * 0.01)
+            return [x * 2]
+
+        # test ordered
+        df = source.map(mapper, array_indices=0, workers=4)
+        self.assertEqual(4, df.workers)
+        self.assertTrue(df.ordered)
+        self.assertIsNone(df._pool)
+        pools = []
+        for epoch in range(2):
+            b = list(df)
+            pools.append(df._pool)
+            self.assertEqual(15, len(b))
+            np.testing.assert_equal(np.concatenate([a[0] for a in b]), x * 2)
+            np.testing.assert_equal(np.concatenate([a[1] for a in b]), y)
+
+        # the thread pool should be kept until the flow is closed
+        self.assertIsNotNone(pools[0])
+        self.assertIs(pools[0], pools[1])
+        df.close()
+        self.assertIsNone(df._pool)
+        with df:
+            self.assertEqual(15, len(list(df)))
+            self.assertIsNotNone(df._pool)
+        self.assertIsNone(df._pool)
+
+        # test unordered, the arrays within a batch should still be aligned
+        df = source.map(mapper, array_indices=0, workers=4, ordered=False)
+        self.assertFalse(df.ordered)
+        b = list(df)
+        self.assertEqual(15, len(b))
+        for a in b:
+            np.testing.assert_equal(a[0], (a[1] - 100) * 2)
+        np.testing.assert_equal(
+            np.sort(np.concatenate([a[0] for a in b])), x * 2)
+
+        # test break in the middle of an epoch
+        for a in df:
+            break
+        self.assertEqual(15, len(list(df)))
+
+        # test the shuffled source with gather buffers
+        source2 = DataFlow.arrays(
+            [x, y], batch_size=7, shuffle=True, gather_buffers=9)
+        for ordered in (True, False):
+            with source2.map(mapper, array_indices=0, workers=4,
+                             ordered=ordered) as df:
+                for epoch in range(2):
+                    b = [(a[0].copy(), a[1].copy()) for a in df]
+                    for a in b:
+                        np.testing.assert_equal(a[0], (a[1] - 100) * 2)
+                    np.testing.assert_equal(
+                        np.sort(np.concatenate([a[1] for a in b])), y)
+
+        # test errors
+        with pytest.raises(ValueError, match='`workers` must be at least 1'):
+            _ = source.map(mapper, workers=0)
+        with pytest.raises(
+                ValueError, match='MapperFlow with `workers` = 4 requires the '
+                                  'source `ArrayFlow` to have at least 9 '
+                                  '`gather_buffers`: got 8'):
+            _ = DataFlow.arrays([x], batch_size=7, shuffle=True,
+                                gather_buffers=8).map(mapper, workers=4)
+
+        def raise_error(x, y):
+            raise _MyError()
+
+        for ordered in (True, False):
+            df = source.map(raise_error, workers=2, ordered=ordered)
+            with pytest.raises(_MyError):
+                _ = list(df)
+
+        df = source.map(lambda x, y: x + y, workers=2, ordered=False)
+        with pytest.raises(
+                TypeError, match='The output of the mapper is expected to '
+                                 'be a tuple or a list, but got a'):
+            _ = list(df)
+
     def test_errors(self):
         # test type error
         source = DataFlow.arrays([np.arange(5), np.arange(5, 10)], batch_size=4)
@@ -99,3 +190,64 @@ class MapperFlowTestCase(unittest.TestCase):
         self.assertEqual(1, len(list(flow)))
         for b in flow:
             np.testing.assert_equal([x, z, x], b)
+
+    def test_state(self):
+        def make_flow(workers=None):
+            return DataFlow.arrays(
+                [np.arange(23)], 5, shuffle=True,
+                random_state=np.random.RandomState(1234)
+            ).map(lambda x: (x * 2,), workers=workers)
+
+        df = make_flow()
+        expected = [[a[0] for a in df] for _ in range(2)]
+
+        for workers in (None, 3):
+            df = make_flow(workers)
+            it = iter(df)
+            _ = next(it)
+            _ = next(it)
+            state = df.get_state()
+            self.assertEqual(2, state['batch_cursor'])
+            it.close()
+
+            df2 = make_flow(workers)
+            df2.set_state(state)
+            b = [a[0] for a in df2]
+            self.assertEqual(3, len(b))
+            for x, y in zip(expected[0][2:], b):
+                np.testing.assert_array_equal(x, y)
+            for x, y in zip(expected[1], [a[0] for a in df2]):
+                np.testing.assert_array_equal(x, y)
+
+        # test unordered flow, whose yielded mini-batches are not a prefix
+        # of the source mini-batches
+        df = DataFlow.arrays([np.arange(23)], 5).map(
+            lambda x: (x,), workers=2, ordered=False)
+        self.assertFalse(df._state_supported)
+        with df:
+            it = iter(df)
+            _ = next(it)
+            with pytest.raises(TypeError, match='MapperFlow with `ordered` = '
+                                                'False does not support '
+                                                'saving the iteration state'):
+                _ = df.get_state()
+            it.close()
+        with pytest.raises(TypeError, match='MapperFlow with `ordered` = '
+                                            'False does not support '
+                                            'restoring the iteration state'):
+            df.set_state({'source': {}, 'batch_cursor': 0})
+        self.assertTrue(DataFlow.arrays([np.arange(23)], 5).map(
+            lambda x: (x,), ordered=False)._state_supported)
+
+        # test source flow without iteration state
+        df = DataFlow.iterator_factory(lambda: [(np.arange(3),)]). \
+            map(lambda x: (x,))
+        np.testing.assert_array_equal([[0, 1, 2]], list(df)[0])
+        with pytest.raises(TypeError, match='The source flow does not '
+                                            'support saving the iteration '
+                                            'state'):
+            _ = df.get_state()
+        with pytest.raises(TypeError, match='The source flow does not '
+                                            'support restoring the iteration '
+                                            'state'):
+            df.set_state({'source': {}, 'batch_cursor': 0})
@@ -0,0 +1,60 @@
+import os
+import unittest
+
+import numpy as np
+
+from tfsnippet.dataflows import DataFlow, MemmapFlow
+from tfsnippet.utils import TemporaryDirectory
+
+
+class MemmapFlowTestCase(unittest.TestCase):
+
+    def test_memmap(self):
+        x = np.arange(30, dtype=np.float32).reshape([15, 2])
+        y = np.arange(15, dtype=np.int64)
+
+        with TemporaryDirectory() as tmpdir:
+            x_path = os.path.join(tmpdir, 'x.npy')
+            y_path = os.path.join(tmpdir, 'y.raw')
+            np.save(x_path, x)
+            y.tofile(y_path)
+            y_memmap = np.memmap(y_path, dtype=np.int64, mode='r')
+
+            df = DataFlow.memmap([x_path, y_memmap], batch_size=4)
+            self.assertIsInstance(df, MemmapFlow)
+            self.assertEqual((x_path, None), df.paths)
+            self.assertIsInstance(df.the_arrays[0], np.memmap)
+            self.assertIs(y_memmap, df.the_arrays[1])
+            self.assertEqual(2, df.array_count)
+            self.assertEqual(15, df.data_length)
+            self.assertEqual(((2,), ()), df.data_shapes)
+            self.assertEqual((np.float32, np.int64), df.data_dtypes)
+
+            # test without shuffle
+            b = list(df)
+            self.assertEqual(4, len(b))
+            np.testing.assert_array_equal(np.concatenate([a[0] for a in b]), x)
+            np.testing.assert_array_equal(np.concatenate([a[1] for a in b]), y)
+
+            # test with shuffle, the indices within each batch are sorted
+            df = DataFlow.memmap([x_path, y_memmap], batch_size=4,
+                                 shuffle=True, skip_incomplete=True)
+            for epoch in range(3):
+                b = list(df)
+                self.assertEqual(3, len(b))
+                for bx, by in b:
+                    np.testing.assert_array_equal(x[by], bx)
+                    np.testing.assert_array_equal(np.sort(by), by)
+                self.assertEqual(
+                    12, len(set(np.concatenate([a[1] for a in b]).tolist())))
+
+            # test the incomplete batch is also sorted
+            df = DataFlow.memmap([y_memmap], batch_size=4, shuffle=True,
+                                 gather_buffers=2)
+            b = [a[0].copy() for a in df]
+            self.assertEqual(3, len(b[-1]))
+            for by in b:
+                np.testing.assert_array_equal(np.sort(by), by)
+            np.testing.assert_array_equal(y, np.sort(np.concatenate(b)))
+
+            del df, b, y_memmap
@@ -0,0 +1,140 @@
+import os
+import unittest
+
+import numpy as np
+import pytest
+
+from tfsnippet.dataflows import DataFlow
+from tfsnippet.dataflows.multiprocess_flow import MultiprocessFlow
+
+
+class MultiprocessFlowTestCase(unittest.TestCase):
+
+    def test_errors(self):
+        with pytest.raises(
+                ValueError, match='`prefetch_num` must be at least 1'):
+            _ = MultiprocessFlow(
+                DataFlow.arrays([np.arange(10)], batch_size=2), prefetch=0)
+        with pytest.raises(
+                ValueError, match='`workers` must be at least 1'):
+            _ = MultiprocessFlow(
+                DataFlow.arrays([np.arange(10)], batch_size=2), prefetch=1,
+                workers=0)
+
+    def test_multiprocess(self):
+        flow = DataFlow.arrays([np.arange(10)], batch_size=2). \
+            multiprocess(prefetch=3, workers=2)
+        self.assertIsInstance(flow, MultiprocessFlow)
+        self.assertEqual(3, flow.prefetch_num)
+        self.assertEqual(2, flow.workers)
+
+        flow = DataFlow.arrays([np.arange(10)], batch_size=2). \
+            multiprocess(prefetch=3)
+        self.assertGreaterEqual(flow.workers, 1)
+
+    def test_iterator(self):
+        x = np.arange(100)
+        y = np.arange(100, 200)
+        pid = os.getpid()
+        source = DataFlow.arrays([x, y], batch_size=7)
+        flow = source.map(lambda x, y: (x * 2, y, np.array([os.getpid()]))). \
+            map(lambda x: (x + 1,), array_indices=0)
+
+        with flow.multiprocess(prefetch=2, workers=3) as df:
+            for epoch in range(3):
+                batches = list(df)
+                self.assertEqual(15, len(batches))
+                np.testing.assert_equal(
+                    np.concatenate([b[0] for b in batches]), x * 2 + 1)
+                np.testing.assert_equal(
+                    np.concatenate([b[1] for b in batches]), y)
+                for b in batches:
+                    self.assertNotEqual(pid, b[2][0])
+
+            # carry out an incomplete epoch by break
+            for b in df:
+                np.testing.assert_equal([1, 3, 5, 7, 9, 11, 13], b[0])
+                break
+
+            # verify that the next epoch starts from the beginning
+            batches = list(df)
+            np.testing.assert_equal(
+                np.concatenate([b[0] for b in batches]), x * 2 + 1)
+
+    def test_source_without_mapper(self):
+        flow = DataFlow.seq(0, 10, batch_size=3).multiprocess(prefetch=1)
+        self.assertIsNone(flow._pool)
+        with flow:
+            self.assertIsNone(flow._pool)
+            for epoch in range(2):
+                np.testing.assert_equal(
+                    [[0, 1, 2], [3, 4, 5], [6, 7, 8], [9]],
+                    [b[0] for b in flow]
+                )
+
+    def test_auto_init(self):
+        flow = DataFlow.seq(0, 10, batch_size=5). \
+            map(lambda x: (x + 1,)).multiprocess(prefetch=1, workers=1)
+        for epoch in range(2):
+            np.testing.assert_equal(
+                [[1, 2, 3, 4, 5], [6, 7, 8, 9, 10]], [b[0] for b in flow])
+        self.assertIsNotNone(flow._pool)
+        flow.close()
+        self.assertIsNone(flow._pool)
+
+        np.testing.assert_equal(
+            [[1, 2, 3, 4, 5], [6, 7, 8, 9, 10]], [b[0] for b in flow])
+        flow.close()
+
+    def test_shared_memory(self):
+        x = np.arange(100, dtype=np.float32).reshape([50, 2])
+        y = np.arange(50, dtype=np.int64)
+        source = DataFlow.arrays([x, y], batch_size=8)
+
+        # test shape & dtype preserving mapper
+        flow = source.map(lambda x: (x * 2,), array_indices=0). \
+            multiprocess(prefetch=2, workers=2, shared_memory=True)
+        self.assertTrue(flow.shared_memory)
+        with flow:
+            for epoch in range(3):
+                batches = list(flow)
+                self.assertEqual(7, len(batches))
+                for b in batches:
+                    self.assertFalse(b[0].flags.writeable)
+                    self.assertEqual(np.float32, b[0].dtype)
+                self.assertEqual((2, 2), batches[-1][0].shape)
+                # the views must be consumed before requesting the next batch
+            batches = [(b[0].copy(), b[1].copy()) for b in flow]
+            np.testing.assert_equal(
+                np.concatenate([b[0] for b in batches]), x * 2)
+            np.testing.assert_equal(
+                np.concatenate([b[1] for b in batches]), y)
+
+            # carry out incomplete epochs by break, and check that the
+            # stale batches do not exhaust the slots
+            for i in range(10):
+                for b in flow:
+                    np.testing.assert_equal(x[:8] * 2, b[0])
+                    break
+            batches = [b[0].copy() for b in flow]
+            np.testing.assert_equal(np.concatenate(batches), x * 2)
+
+        # test specifying the output layout
+        flow = source.map(lambda x, y: (x.astype(np.float64).sum(axis=-1),)). \
+            multiprocess(prefetch=1, workers=1, shared_memory=True,
+                         data_shapes=((),), data_dtypes=(np.float64,))
+        with flow:
+            batches = [b[0].copy() for b in flow]
+            np.testing.assert_equal(np.concatenate(batches), x.sum(axis=-1))
+
+        # test no mapper, the shared memory should be disabled
+        flow = source.multiprocess(prefetch=1, shared_memory=True)
+        self.assertFalse(flow.shared_memory)
+
+        # test errors
+        with pytest.raises(ValueError, match='`shared_memory` requires the '
+                                             'source of the mappers to be an '
+                                             'ExtraInfoDataFlow'):
+            _ = DataFlow.iterator_factory(lambda: [(x,)]). \
+                map(lambda x: (x,)). \
+                multiprocess(prefetch=1, shared_memory=True)
@@ -0,0 +1,115 @@
+import time
+import unittest
+
+import numpy as np
+import pytest
+from mock import Mock
+
+from tfsnippet.dataflows import DataFlow, DataFlowProfiler
+
+
+class DataFlowProfilerTestCase(unittest.TestCase):
+
+    def test_attach(self):
+        x_flow = DataFlow.arrays([np.arange(10)], batch_size=4)
+        y_flow = DataFlow.arrays([np.arange(10)], batch_size=4)
+        flow = DataFlow.gather([x_flow.map(lambda x: (x,)), y_flow]). \
+            map(lambda x, y: (x + y,))
+
+        profiler = DataFlowProfiler()
+        self.assertEqual('dataflow/', profiler.prefix)
+        self.assertIs(flow, profiler.attach(flow))
+        self.assertEqual(
+            ('MapperFlow', 'GatherFlow', 'MapperFlow_1', 'ArrayFlow',
+             'ArrayFlow_1'),
+            profiler.stage_names
+        )
+        self.assertEqual('ArrayFlow_1', y_flow._profile_stage)
+
+        # attaching twice should have no effect
+        profiler.attach(flow)
+        self.assertEqual(5, len(profiler.stage_names))
+
+        # attaching to another profiler should cause an error
+        with pytest.raises(ValueError, match='has been attached to another '
+                                             'profiler'):
+            _ = DataFlowProfiler().attach(x_flow)
+
+        # the results should not be affected
+        batches = list(flow)
+        self.assertEqual(3, len(batches))
+        np.testing.assert_equal(np.arange(0, 8, 2), batches[0][0])
+
+        # test detach
+        profiler.detach(flow.source, recursive=False)
+        self.assertEqual(
+            ('MapperFlow', 'MapperFlow_1', 'ArrayFlow', 'ArrayFlow_1'),
+            profiler.stage_names
+        )
+        self.assertIsNone(flow.source._profiler)
+        profiler.detach(flow)
+        self.assertEqual((), profiler.stage_names)
+        self.assertIsNone(x_flow._profiler)
+
+    def test_metrics(self):
+        def mapper(x):
+            time.sleep(0.02)
+            return x,
+
+        x = np.arange(10, dtype=np.int64)
+        array_flow = DataFlow.arrays([x], batch_size=4)
+        flow = array_flow.map(mapper)
+        profiler = DataFlowProfiler(prefix='df/')
+        profiler.attach(flow)
+        self.assertEqual({}, profiler.get_metrics())
+
+        for _ in range(2):
+            self.assertEqual(3, len(list(flow)))
+        metrics = profiler.get_metrics()
+        self.assertEqual(
+            ['df/ArrayFlow/batches_per_sec', 'df/ArrayFlow/bytes',
+             'df/ArrayFlow/time', 'df/MapperFlow/batches_per_sec',
+             'df/MapperFlow/bytes', 'df/MapperFlow/time'],
+            sorted(metrics)
+        )
+        self.assertAlmostEqual(160. / 6, metrics['df/ArrayFlow/bytes'])
+        self.assertAlmostEqual(160. / 6, metrics['df/MapperFlow/bytes'])
+        # the time of the mapper should be excluded from the array flow
+        self.assertLess(metrics['df/ArrayFlow/time'], 0.01)
+        self.assertGreaterEqual(metrics['df/MapperFlow/time'], 0.019)
+        self.assertLess(metrics['df/MapperFlow/batches_per_sec'], 50.)
+
+        # test report to the train loop
+        loop = Mock()
+        profiler.collect_metrics(loop)
+        loop.collect_metrics.assert_called_once_with(metrics)
+        self.assertEqual({}, profiler.get_metrics())
+
+        loop = Mock()
+        profiler.collect_metrics(loop)
+        self.assertFalse(loop.collect_metrics.called)
+
+    def test_threading_flow(self):
+        def mapper(x):
+            time.sleep(0.01)
+            return x,
+
+        flow = DataFlow.arrays([np.arange(10)], batch_size=2).map(mapper)
+        profiler = DataFlowProfiler()
+        with flow.threaded(prefetch=2) as threaded_flow:
+            profiler.attach(threaded_flow)
+            self.assertEqual(
+                ('ThreadingFlow', 'MapperFlow', 'ArrayFlow'),
+                profiler.stage_names
+            )
+            for _ in range(2):
+                for _ in threaded_flow:
+                    time.sleep(0.03)
+
+        metrics = profiler.get_metrics()
+        fill = metrics['dataflow/ThreadingFlow/queue_fill']
+        self.assertGreater(fill, 0.)
+        self.assertLessEqual(fill, 1.)
+        self.assertGreaterEqual(metrics['dataflow/MapperFlow/time'], 0.009)
+        self.assertLess(metrics['dataflow/ThreadingFlow/time'], 0.01)
+        self.assertNotIn('dataflow/MapperFlow/queue_fill', metrics)
@@ -0,0 +1,95 @@
+import unittest
+
+import numpy as np
+import pytest
+
+from tfsnippet.dataflows import DataFlow, RebatchFlow, BucketFlow
+
+
+class RebatchFlowTestCase(unittest.TestCase):
+
+    def test_rebatch(self):
+        x = np.arange(23)
+        y = np.arange(46).reshape([23, 2])
+        source = DataFlow.arrays([x, y], batch_size=5)
+
+        for batch_size in (1, 3, 5, 7, 10, 30):
+            df = source.rebatch(batch_size)
+            self.assertIsInstance(df, RebatchFlow)
+            self.assertIs(source, df.source)
+            self.assertEqual(batch_size, df.batch_size)
+            self.assertFalse(df.skip_incomplete)
+
+            b = list(df)
+            expected = [min(batch_size, 23 - i)
+                        for i in range(0, 23, batch_size)]
+            self.assertEqual(expected, [len(a[0]) for a in b])
+            np.testing.assert_array_equal(x, np.concatenate([a[0] for a in b]))
+            np.testing.assert_array_equal(y, np.concatenate([a[1] for a in b]))
+
+        # test skip incomplete
+        df = source.rebatch(7, skip_incomplete=True)
+        self.assertTrue(df.skip_incomplete)
+        self.assertEqual([7, 7, 7], [len(a[0]) for a in df])
+
+        # complete mini-batches within a source batch should be views
+        df = DataFlow.arrays([x], batch_size=10).rebatch(5)
+        for a in df:
+            if len(a[0]) == 5:
+                self.assertIs(x, a[0].base)
+
+        # test source which re-uses its buffers
+        df = DataFlow.arrays([x], batch_size=5, shuffle=True,
+                             gather_buffers=1).rebatch(7)
+        np.testing.assert_array_equal(
+            x, sorted(np.concatenate([a[0] for a in df])))
+
+        with pytest.raises(ValueError, match='`batch_size` must be at least 1'):
+            _ = source.rebatch(0)
+
+
+class BucketFlowTestCase(unittest.TestCase):
+
+    def test_bucket_by(self):
+        x = np.arange(100)
+        source = DataFlow.arrays([x], batch_size=8, shuffle=True)
+
+        df = source.bucket_by(lambda x: x % 10, [3, 7], batch_size=4)
+        self.assertIsInstance(df, BucketFlow)
+        self.assertIs(source, df.source)
+        self.assertEqual((3, 7), df.bucket_boundaries)
+        self.assertEqual((4, 4, 4), df.batch_sizes)
+        self.assertFalse(df.skip_incomplete)
+
+        b = [a[0] for a in df]
+        np.testing.assert_array_equal(x, sorted(np.concatenate(b)))
+        # sizes of the buckets are 30, 40 and 30
+        self.assertEqual(26, len(b))
+        for a in b:
+            bucket = np.searchsorted([3, 7], a % 10, side='right')
+            self.assertEqual(1, len(np.unique(bucket)))
+
+        # test batch size of each bucket and skip incomplete
+        df = source.bucket_by(lambda x: x % 10, [3, 7], batch_size=[8, 6, 4],
+                              skip_incomplete=True)
+        self.assertTrue(df.skip_incomplete)
+        self.assertEqual((8, 6, 4), df.batch_sizes)
+        b = [a[0] for a in df]
+        self.assertEqual(24 + 36 + 28, sum(len(a) for a in b))
+        for a in b:
+            bucket = np.searchsorted([3, 7], a % 10, side='right')
+            self.assertEqual((8, 6, 4)[bucket[0]], len(a))
+
+    def test_errors(self):
+        source = DataFlow.arrays([np.arange(10)], batch_size=3)
+        with pytest.raises(ValueError, match='`bucket_boundaries` must be '
+                                             'strictly increasing'):
+            _ = source.bucket_by(lambda x: x, [3, 3], batch_size=2)
+        with pytest.raises(ValueError, match='`batch_size` must be an integer, '
+                                             'or a list of 3 integers'):
+            _ = source.bucket_by(lambda x: x, [3, 5], batch_size=[2, 2])
+        with pytest.raises(ValueError, match='`batch_size` must be at least 1'):
+            _ = source.bucket_by(lambda x: x, [3, 5], batch_size=[2, 0, 2])
+        with pytest.raises(ValueError, match='`key_fn` must return a 1-d '
+                                             'array of keys'):
+            _ = list(source.bucket_by(lambda x: x[:1], [3], batch_size=2))
@@ -68,3 +68,28 @@ class SeqFlowTestCase(unittest.TestCase):
         self.assertEqual(2, len(b))
         np.testing.assert_array_equal(
             np.arange(1, 9, 2), sorted(np.concatenate(b)))
+
+    def test_state(self):
+        df = DataFlow.seq(0, 10, batch_size=3)
+        it = iter(df)
+        _ = next(it)
+        state = df.get_state()
+        it.close()
+
+        df2 = DataFlow.seq(0, 10, batch_size=3)
+        df2.set_state(state)
+        np.testing.assert_array_equal(
+            np.arange(3, 10), np.concatenate([a[0] for a in df2]))
+        np.testing.assert_array_equal(
+            np.arange(10), np.concatenate([a[0] for a in df2]))
+
+    def test_shards(self):
+        flows = [
+            DataFlow.seq(0, 10, batch_size=2, shuffle=True,
+                         random_state=np.random.RandomState(1),
+                         num_shards=3, shard_index=i)
+            for i in range(3)
+        ]
+        self.assertEqual(3, flows[0].data_length)
+        b = np.concatenate([a[0] for df in flows for a in df])
+        self.assertEqual(9, len(np.unique(b)))
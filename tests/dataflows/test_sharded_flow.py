@@ -0,0 +1,103 @@
+import os
+import unittest
+
+import numpy as np
+import pytest
+
+from tfsnippet.dataflows import DataFlow, ShardWriter, ShardedFlow
+from tfsnippet.utils import TemporaryDirectory
+
+
+class ShardedFlowTestCase(unittest.TestCase):
+
+    def test_write_and_read(self):
+        x = np.arange(46, dtype=np.float32).reshape([23, 2])
+        y = np.arange(23, dtype=np.int64)
+
+        with TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'dataset')
+            DataFlow.arrays([x, y], batch_size=4).write_shards(path, 5)
+            self.assertTrue(os.path.isfile(os.path.join(path, 'index.json')))
+            self.assertTrue(os.path.isfile(
+                os.path.join(path, 'shard-00004.1.npy')))
+            self.assertFalse(os.path.isfile(
+                os.path.join(path, 'shard-00005.0.npy')))
+
+            # test properties
+            df = DataFlow.shards(path, batch_size=4)
+            self.assertIsInstance(df, ShardedFlow)
+            self.assertEqual(path, df.path)
+            self.assertEqual(5, df.shard_count)
+            self.assertEqual(5, df.shard_size)
+            self.assertEqual(1, df.shuffle_shards)
+            self.assertEqual(2, df.array_count)
+            self.assertEqual(23, df.data_length)
+            self.assertEqual(((2,), ()), df.data_shapes)
+            self.assertEqual((np.float32, np.int64), df.data_dtypes)
+            self.assertFalse(df.is_shuffled)
+            self.assertFalse(df.skip_incomplete)
+
+            # test without shuffle, the batches may span over shards
+            b = list(df)
+            self.assertEqual([4, 4, 4, 4, 4, 3], [len(a[0]) for a in b])
+            np.testing.assert_array_equal(np.concatenate([a[0] for a in b]), x)
+            np.testing.assert_array_equal(np.concatenate([a[1] for a in b]), y)
+            self.assertFalse(b[0][0].flags.writeable)
+
+            df = DataFlow.shards(path, batch_size=4, skip_incomplete=True)
+            self.assertEqual([4] * 5, [len(a[0]) for a in df])
+
+            # test with shuffle
+            for shuffle_shards in (1, 2, 10):
+                df = DataFlow.shards(path, batch_size=4, shuffle=True,
+                                     shuffle_shards=shuffle_shards)
+                self.assertTrue(df.is_shuffled)
+                for epoch in range(2):
+                    b = list(df)
+                    self.assertEqual([4, 4, 4, 4, 4, 3],
+                                     [len(a[0]) for a in b])
+                    for bx, by in b:
+                        np.testing.assert_array_equal(x[by], bx)
+                    np.testing.assert_array_equal(
+                        y, np.sort(np.concatenate([a[1] for a in b])))
+
+            # test the writer cannot overwrite existing dataset
+            with pytest.raises(IOError, match='Sharded dataset already '
+                                              'exists'):
+                _ = ShardWriter(path, shard_size=5)
+
+    def test_writer(self):
+        with TemporaryDirectory() as tmpdir:
+            # test writing batches larger than the shard size
+            path = os.path.join(tmpdir, 'a')
+            with ShardWriter(path, shard_size=3) as writer:
+                self.assertEqual(path, writer.path)
+                self.assertEqual(3, writer.shard_size)
+                writer.write([np.arange(7)])
+                writer.write([np.arange(7, 9)])
+            b = list(DataFlow.shards(path, batch_size=100))
+            np.testing.assert_array_equal(np.arange(9), b[0][0])
+            self.assertEqual(3, DataFlow.shards(path, 1).shard_count)
+
+            # test errors
+            with pytest.raises(ValueError,
+                               match='`shard_size` must be at least 1'):
+                _ = ShardWriter(os.path.join(tmpdir, 'b'), shard_size=0)
+
+            writer = ShardWriter(os.path.join(tmpdir, 'b'), shard_size=3)
+            with pytest.raises(ValueError, match='The arrays of the '
+                                                 'mini-batch must have the '
+                                                 'same length'):
+                writer.write([np.arange(3), np.arange(4)])
+            writer.write([np.arange(3)])
+            with pytest.raises(ValueError, match='The shapes or dtypes of '
+                                                 'the mini-batch do not match'):
+                writer.write([np.arange(3, dtype=np.float32)])
+
+            with pytest.raises(ValueError, match='No data has been written'):
+                ShardWriter(os.path.join(tmpdir, 'c'), shard_size=3).close()
+            with pytest.raises(IOError, match='Sharded dataset not found'):
+                _ = ShardedFlow(os.path.join(tmpdir, 'c'), batch_size=3)
+            with pytest.raises(ValueError,
+                               match='`shuffle_shards` must be at least 1'):
+                _ = ShardedFlow(path, batch_size=3, shuffle_shards=0)
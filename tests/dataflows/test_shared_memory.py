@@ -0,0 +1,77 @@
+import unittest
+
+import numpy as np
+import pytest
+
+from tfsnippet.dataflows import DataFlow, SharedMemoryRingBuffer
+
+
+class SharedMemoryRingBufferTestCase(unittest.TestCase):
+
+    def test_props_and_read_write(self):
+        buf = SharedMemoryRingBuffer(
+            slot_count=3, batch_size=4, data_shapes=[(2,), []],
+            data_dtypes=[np.float32, 'int64'])
+        self.assertEqual(3, buf.slot_count)
+        self.assertEqual(4, buf.batch_size)
+        self.assertEqual(((2,), ()), buf.data_shapes)
+        self.assertEqual((np.float32, np.int64), buf.data_dtypes)
+
+        x = np.arange(8, dtype=np.float32).reshape([4, 2])
+        y = np.arange(4, dtype=np.int64)
+        self.assertEqual(4, buf.write(0, (x, y)))
+        self.assertEqual(3, buf.write(2, (x[:3] + 1, y[:3] + 1)))
+
+        b = buf.read(0, 4)
+        self.assertFalse(b[0].flags.writeable)
+        self.assertFalse(b[1].flags.writeable)
+        np.testing.assert_equal(x, b[0])
+        np.testing.assert_equal(y, b[1])
+        b = buf.read(2, 3)
+        np.testing.assert_equal(x[:3] + 1, b[0])
+        np.testing.assert_equal(y[:3] + 1, b[1])
+
+        # test the restored buffer shares memory with the original one
+        buf2 = SharedMemoryRingBuffer.__new__(SharedMemoryRingBuffer)
+        buf2.__setstate__(buf.__getstate__())
+        buf2.write(1, (x * 2, y * 2))
+        np.testing.assert_equal(x * 2, buf.read(1, 4)[0])
+
+    def test_from_flow(self):
+        flow = DataFlow.arrays(
+            [np.zeros([10, 3], dtype=np.uint8), np.zeros([10])], batch_size=4)
+        buf = SharedMemoryRingBuffer.from_flow(flow, slot_count=2)
+        self.assertEqual(2, buf.slot_count)
+        self.assertEqual(4, buf.batch_size)
+        self.assertEqual(((3,), ()), buf.data_shapes)
+        self.assertEqual((np.uint8, np.float64), buf.data_dtypes)
+
+        with pytest.raises(TypeError, match='`flow` must be an '
+                                            'ExtraInfoDataFlow'):
+            _ = SharedMemoryRingBuffer.from_flow(
+                DataFlow.iterator_factory(lambda: []), slot_count=2)
+
+    def test_errors(self):
+        with pytest.raises(ValueError, match='`slot_count` must be at least 1'):
+            _ = SharedMemoryRingBuffer(0, 1, [()], [np.int32])
+        with pytest.raises(ValueError, match='`batch_size` must be at least 1'):
+            _ = SharedMemoryRingBuffer(1, 0, [()], [np.int32])
+        with pytest.raises(ValueError, match='`data_shapes` must not be empty'):
+            _ = SharedMemoryRingBuffer(1, 1, [], [])
+        with pytest.raises(ValueError, match='`data_shapes` and `data_dtypes` '
+                                             'must have the same length'):
+            _ = SharedMemoryRingBuffer(1, 1, [()], [])
+
+        buf = SharedMemoryRingBuffer(2, 4, [(2,)], [np.float32])
+        with pytest.raises(ValueError, match='The mini-batch is expected to '
+                                             'have 1 arrays, but got 2'):
+            _ = buf.write(0, (np.zeros([4, 2]), np.zeros([4, 2])))
+        with pytest.raises(ValueError, match='The array 0 of the mini-batch '
+                                             'does not match the slot layout'):
+            _ = buf.write(0, (np.zeros([4, 2], dtype=np.float64),))
+        with pytest.raises(ValueError, match='The array 0 of the mini-batch '
+                                             'does not match the slot layout'):
+            _ = buf.write(0, (np.zeros([4, 3], dtype=np.float32),))
+        with pytest.raises(ValueError, match='The mini-batch size 5 exceeds '
+                                             'the batch size of the slot 4'):
+            _ = buf.write(0, (np.zeros([5, 2], dtype=np.float32),))
@@ -0,0 +1,66 @@
+import unittest
+
+import numpy as np
+import pytest
+
+from tfsnippet.dataflows import DataFlow, ShuffleBufferFlow
+
+
+class ShuffleBufferFlowTestCase(unittest.TestCase):
+
+    def test_shuffle_buffer(self):
+        x = np.arange(100)
+        y = np.arange(200).reshape([100, 2])
+        source = DataFlow.iterator_factory(
+            lambda: ((x[i: i + 7], y[i: i + 7]) for i in range(0, 100, 7)))
+
+        for buffer_size in (8, 30, 100, 1000):
+            df = source.shuffle_buffer(buffer_size, batch_size=8)
+            self.assertIsInstance(df, ShuffleBufferFlow)
+            self.assertIs(source, df.source)
+            self.assertEqual(buffer_size, df.buffer_size)
+            self.assertEqual(8, df.batch_size)
+            self.assertFalse(df.skip_incomplete)
+
+            for epoch in range(2):
+                b = list(df)
+                self.assertEqual([8] * 12 + [4], [len(a[0]) for a in b])
+                bx = np.concatenate([a[0] for a in b])
+                by = np.concatenate([a[1] for a in b])
+                np.testing.assert_array_equal(x, np.sort(bx))
+                np.testing.assert_array_equal(y[bx], by)
+                self.assertFalse(np.all(bx == x))
+
+        # test skip incomplete
+        df = source.shuffle_buffer(16, batch_size=8, skip_incomplete=True)
+        self.assertTrue(df.skip_incomplete)
+        self.assertEqual([8] * 12, [len(a[0]) for a in df])
+
+        # test the approximate shuffling is bounded by the buffer size,
+        # i.e., the first batch must come from the first `buffer_size` items
+        df = source.shuffle_buffer(10, batch_size=5)
+        self.assertTrue(np.all(list(df)[0][0] < 10))
+
+        # test empty source
+        df = DataFlow.iterator_factory(lambda: []).shuffle_buffer(10, 5)
+        self.assertEqual([], list(df))
+
+    def test_errors(self):
+        source = DataFlow.arrays([np.arange(10)], batch_size=3)
+        with pytest.raises(ValueError, match='`batch_size` must be at least 1'):
+            _ = source.shuffle_buffer(10, batch_size=0)
+        with pytest.raises(ValueError, match='`buffer_size` must be at least '
+                                             '`batch_size`'):
+            _ = source.shuffle_buffer(4, batch_size=5)
+
+        batches = [(np.arange(3),), (np.arange(3).reshape([3, 1]),)]
+        df = DataFlow.iterator_factory(lambda: batches).shuffle_buffer(10, 5)
+        with pytest.raises(ValueError, match='The shape of the mini-batch '
+                                             'arrays does not match'):
+            _ = list(df)
+
+        batches = [(np.arange(3),), (np.arange(3), np.arange(3))]
+        df = DataFlow.iterator_factory(lambda: batches).shuffle_buffer(10, 5)
+        with pytest.raises(ValueError, match='The number of arrays in the '
+                                             'mini-batch does not match'):
+            _ = list(df)
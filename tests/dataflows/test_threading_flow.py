@@ -120,3 +120,76 @@ class ThreadingFlowTestCase(unittest.TestCase):
             [[40, 41], [42, 43], [44, 45], [46, 47], [48, 49]], batches)
 
         flow.close()
+
+    def test_state(self):
+        def make_flow():
+            return DataFlow.arrays(
+                [np.arange(23)], 5, shuffle=True,
+                random_state=np.random.RandomState(1234)
+            ).map(lambda x: (x * 2,)).threaded(prefetch=3)
+
+        with make_flow() as df:
+            expected = [[a[0] for a in df] for _ in range(2)]
+
+        with make_flow() as df:
+            it = iter(df)
+            _ = next(it)
+            _ = next(it)
+            time.sleep(0.1)  # let the worker prefetch ahead
+            state = df.get_state()
+            self.assertEqual(2, state['batch_cursor'])
+            it.close()
+
+        with make_flow() as df2:
+            # consume one epoch, then restore the state
+            _ = list(df2)
+            df2.set_state(state)
+            b = [a[0] for a in df2]
+            self.assertEqual(3, len(b))
+            for x, y in zip(expected[0][2:], b):
+                np.testing.assert_array_equal(x, y)
+
+            # the state at the epoch end
+            time.sleep(0.1)
+            state2 = df2.get_state()
+            self.assertEqual(0, state2['batch_cursor'])
+            for x, y in zip(expected[1], [a[0] for a in df2]):
+                np.testing.assert_array_equal(x, y)
+
+        with make_flow() as df3:
+            df3.set_state(state2)
+            for x, y in zip(expected[1], [a[0] for a in df3]):
+                np.testing.assert_array_equal(x, y)
+
+    def test_state_after_break(self):
+        def make_flow():
+            return DataFlow.arrays(
+                [np.arange(23)], 5, shuffle=True,
+                random_state=np.random.RandomState(1234)
+            ).threaded(prefetch=1)
+
+        with make_flow() as df:
+            expected = [[a[0].copy() for a in df] for _ in range(2)]
+
+        # break out of the epoch while the worker is blocked in it
+        with make_flow() as df:
+            for _ in df:
+                break
+            state = df.get_state()
+            self.assertEqual(1, state['batch_cursor'])
+
+            # the state should resume the rest of the broken epoch
+            df.set_state(state)
+            b = [a[0] for a in df]
+            self.assertEqual(4, len(b))
+            for x, y in zip(expected[0][1:], b):
+                np.testing.assert_array_equal(x, y)
+
+        with make_flow() as df2:
+            df2.set_state(state)
+            b = [a[0] for a in df2]
+            self.assertEqual(4, len(b))
+            for x, y in zip(expected[0][1:], b):
+                np.testing.assert_array_equal(x, y)
+            for x, y in zip(expected[1], [a[0] for a in df2]):
+                np.testing.assert_array_equal(x, y)
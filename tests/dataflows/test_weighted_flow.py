@@ -0,0 +1,133 @@
+import unittest
+
+import numpy as np
+import pytest
+
+from tfsnippet.dataflows import DataFlow, WeightedFlow
+from tfsnippet.dataflows.weighted_flow import build_alias_table
+
+
+class BuildAliasTableTestCase(unittest.TestCase):
+
+    def test_build_alias_table(self):
+        np.random.seed(1234)
+        for n in [1, 2, 5, 100, 1000]:
+            for _ in range(10):
+                w = np.random.exponential(size=n) ** 3
+                if n > 100:
+                    # test many ties in the cumulative sums
+                    w = np.round(w)
+                w[np.random.uniform(size=n) < .2] = 0.
+                if np.sum(w) == 0:
+                    continue
+                prob, alias = build_alias_table(w)
+                self.assertTrue(np.all(prob >= -1e-12))
+                self.assertTrue(np.all(prob <= 1. + 1e-12))
+                # the distribution implied by the alias table
+                p = prob.copy()
+                np.add.at(p, alias, 1. - prob)
+                np.testing.assert_allclose(p / n, w / np.sum(w), atol=1e-10)
+
+
+class WeightedFlowTestCase(unittest.TestCase):
+
+    def test_with_replacement(self):
+        x = np.arange(10000)
+        weights = (x % 4).astype(np.float64)
+        df = DataFlow.weighted([x, x * 2], weights, batch_size=1000,
+                               random_state=np.random.RandomState(1234))
+        self.assertIsInstance(df, WeightedFlow)
+        self.assertTrue(df.replacement)
+        self.assertTrue(df.is_shuffled)
+        self.assertIsNone(df.labels)
+        self.assertEqual(10000, df.data_length)
+        self.assertEqual(2, df.array_count)
+        np.testing.assert_array_equal(weights, df.weights)
+
+        b = list(df)
+        self.assertEqual(10, len(b))
+        bx = np.concatenate([a[0] for a in b])
+        np.testing.assert_array_equal(bx * 2,
+                                      np.concatenate([a[1] for a in b]))
+        freq = np.bincount(bx % 4, minlength=4) / float(len(bx))
+        np.testing.assert_allclose(freq, [0., 1. / 6, 2. / 6, 3. / 6],
+                                   atol=.02)
+
+        # update the weights, which only affects the first group
+        df.update_weights(np.arange(0, 100, 4), 1000.)
+        self.assertEqual([0], sorted(df._dirty_groups))
+        bx = np.concatenate([a[0] for a in df])
+        self.assertFalse(df._dirty_groups)
+        self.assertTrue(np.all(bx[bx % 4 == 0] < 100))
+        self.assertGreater(np.mean(bx % 4 == 0), .3)
+
+        # test epoch size and skip incomplete
+        df = DataFlow.weighted([x], None, batch_size=300, epoch_size=1000,
+                               skip_incomplete=True)
+        self.assertEqual([300] * 3, [len(a[0]) for a in df])
+
+    def test_without_replacement(self):
+        x = np.arange(1000)
+        weights = np.where(x < 500, 1., 10.)
+        weights[:10] = 0.
+        df = DataFlow.weighted([x], weights, batch_size=128,
+                               replacement=False)
+        self.assertFalse(df.replacement)
+        self.assertEqual(990, df.data_length)
+
+        bx = np.concatenate([a[0] for a in df])
+        np.testing.assert_array_equal(np.arange(10, 1000), np.sort(bx))
+        # the heavier items should come first in general
+        self.assertGreater(np.mean(bx[:200] >= 500), .8)
+
+        df = DataFlow.weighted([x], weights, batch_size=128,
+                               replacement=False, epoch_size=100)
+        bx = np.concatenate([a[0] for a in df])
+        self.assertEqual(100, len(np.unique(bx)))
+
+    def test_stratified(self):
+        x = np.arange(1000)
+        y = np.where(x < 900, 0, np.where(x < 990, 1, 2))
+        weights = np.ones_like(x, dtype=np.float64)
+        weights[990:995] = 0.
+        df = DataFlow.weighted([x, y], weights, batch_size=31,
+                               stratify_by=y)
+        np.testing.assert_array_equal([0, 1, 2], df.labels)
+
+        b = list(df)
+        for bx, by in b[:-1]:
+            np.testing.assert_array_equal(y[bx], by)
+            counts = np.bincount(by, minlength=3)
+            self.assertEqual(10, np.min(counts))
+            self.assertEqual(11, np.max(counts))
+        bx = np.concatenate([a[0] for a in b])
+        self.assertFalse(np.any((bx >= 990) & (bx < 995)))
+
+        # test updating the weights of one label
+        df.update_weights([990], 1.)
+        df.update_weights(np.arange(995, 1000), 0.)
+        self.assertEqual([2], sorted(df._dirty_groups))
+        with pytest.raises(ValueError, match='`weights` of the items with '
+                                             'label 2 must have at least one '
+                                             'positive value'):
+            df.update_weights([990], 0.)
+        for bx, by in df:
+            self.assertTrue(np.all(bx[by == 2] == 990))
+
+    def test_errors(self):
+        x = np.arange(10)
+        with pytest.raises(ValueError, match='`weights` must be a 1-d array'):
+            _ = DataFlow.weighted([x], np.ones([9]), batch_size=3)
+        with pytest.raises(ValueError, match='`weights` must be finite and '
+                                             'non-negative'):
+            _ = DataFlow.weighted([x], -np.ones([10]), batch_size=3)
+        with pytest.raises(ValueError, match='`weights` must have at least '
+                                             'one positive value'):
+            _ = DataFlow.weighted([x], np.zeros([10]), batch_size=3)
+        with pytest.raises(ValueError, match='`stratify_by` requires '
+                                             '`replacement` to be True'):
+            _ = DataFlow.weighted([x], None, batch_size=3, stratify_by=x,
+                                  replacement=False)
+        with pytest.raises(ValueError, match='`epoch_size` must not exceed'):
+            _ = DataFlow.weighted([x], None, batch_size=3, epoch_size=11,
+                                  replacement=False)
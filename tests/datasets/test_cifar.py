@@ -5,6 +5,7 @@ import pytest
 
 from tests.datasets.helper import skipUnlessRunDatasetsTests
 from tfsnippet.datasets import *
+from tfsnippet.utils import PackedArray
 
 
 class CifarTestCase(unittest.TestCase):
@@ -36,6 +37,20 @@ class CifarTestCase(unittest.TestCase):
         self.assertTupleEqual(train_x.shape, (50000, 1024, 3))
         self.assertTupleEqual(test_x.shape, (10000, 1024, 3))
 
+        # test lazy = True
+        for channels_last in (True, False):
+            (train_x, train_y), (test_x, test_y) = load_cifar10(
+                channels_last=channels_last, normalize_x=True, lazy=True)
+            self.assertIsInstance(train_x, PackedArray)
+            self.assertEqual(np.uint8, train_x.data.dtype)
+            self.assertEqual(train_x.shape[0], 50000)
+            self.assertEqual(np.float32, train_x[:10].dtype)
+            (train_x2, train_y2), (test_x2, _) = load_cifar10(
+                channels_last=channels_last, normalize_x=True)
+            np.testing.assert_equal(train_y2, train_y)
+            np.testing.assert_allclose(train_x2[:100], train_x[:100])
+            np.testing.assert_allclose(test_x2[-100:], test_x[-100:])
+
         with pytest.raises(ValueError,
                            match='`x_shape` does not product to 3072'):
             _ = load_cifar10(x_shape=(1, 2, 3))
@@ -5,6 +5,7 @@ import pytest
 
 from tests.datasets.helper import skipUnlessRunDatasetsTests
 from tfsnippet.datasets import *
+from tfsnippet.utils import PackedArray
 
 
 class MnistTestCase(unittest.TestCase):
@@ -34,6 +35,19 @@ class MnistTestCase(unittest.TestCase):
         self.assertTupleEqual(train_x.shape, (60000, 784))
         self.assertTupleEqual(test_x.shape, (10000, 784))
 
+        # test lazy = True
+        (train_x, train_y), (test_x, test_y) = \
+            load_mnist(x_shape=(784,), normalize_x=True, lazy=True)
+        self.assertIsInstance(train_x, PackedArray)
+        self.assertEqual(np.uint8, train_x.data.dtype)
+        self.assertTupleEqual(train_x.shape, (60000, 784))
+        self.assertTupleEqual(test_x.shape, (10000, 784))
+        self.assertEqual(np.float32, train_x[:10].dtype)
+        (train_x2, _), (test_x2, _) = \
+            load_mnist(x_shape=(784,), normalize_x=True)
+        np.testing.assert_allclose(train_x2[:100], train_x[:100])
+        np.testing.assert_allclose(test_x2[-100:], test_x[-100:])
+
         with pytest.raises(ValueError,
                            match='`x_shape` does not product to 784'):
             _ = load_mnist(x_shape=(1, 2, 3))
@@ -1,8 +1,11 @@
 import unittest
 
 import numpy as np
+import pytest
+from mock import Mock
 
 from tfsnippet.preprocessing import *
+from tfsnippet.preprocessing.samplers import _spawn_generators
 
 
 class BaseSamplerTestCase(unittest.TestCase):
@@ -18,6 +21,140 @@ class BaseSamplerTestCase(unittest.TestCase):
         self.assertEqual(sampler(x), (x,))
 
 
+def make_generator(seed):
+    return np.random.Generator(np.random.Philox(seed))
+
+
+@pytest.mark.skipif(not hasattr(np.random, 'Generator'),
+                    reason='numpy.random.Generator is not available')
+class GeneratorSamplerTestCase(unittest.TestCase):
+
+    def test_bernoulli(self):
+        x = np.full([1000, 100], 0.3, dtype=np.float32)
+        for threads in (None, 1, 4):
+            sampler = BernoulliSampler(
+                random_state=make_generator(1234), threads=threads)
+            y = sampler.sample(x)
+            self.assertEqual(x.shape, y.shape)
+            self.assertEqual(np.int32, y.dtype)
+            self.assertEqual({0, 1}, set(np.unique(y)))
+            self.assertAlmostEqual(0.3, np.mean(y), delta=0.01)
+
+            # test reproducible with independent mini-batches
+            y2 = sampler.sample(x)
+            self.assertFalse(np.all(y == y2))
+            sampler = BernoulliSampler(
+                random_state=make_generator(1234), threads=threads)
+            np.testing.assert_equal(y, sampler.sample(x))
+            np.testing.assert_equal(y2, sampler.sample(x))
+
+        # test the different float types and shapes
+        sampler = BernoulliSampler(dtype=np.float32,
+                                   random_state=make_generator(1234),
+                                   threads=3)
+        for x in (np.linspace(0, 1, 1001, dtype=np.float64),
+                  np.zeros([2, 3], dtype=np.float16),
+                  np.ones([0, 5], dtype=np.float32),
+                  np.asarray(1., dtype=np.float32)):
+            y = sampler.sample(x)
+            self.assertEqual(x.shape, y.shape)
+            self.assertEqual(np.float32, y.dtype)
+            self.assertTrue(np.all((y == 0) | (y == 1)))
+        np.testing.assert_equal(0, sampler.sample(np.zeros([2, 3])))
+        np.testing.assert_equal(1, sampler.sample(np.ones([2, 3])))
+
+    def test_uniform_noise(self):
+        x = np.arange(0, 100000, dtype=np.float32).reshape([1000, 100])
+        for threads in (None, 4):
+            sampler = UniformNoiseSampler(
+                minval=-2., maxval=2., random_state=make_generator(1234),
+                threads=threads
+            )
+            y = sampler.sample(x)
+            self.assertEqual(x.shape, y.shape)
+            self.assertEqual(np.float32, y.dtype)
+            noise = y.astype(np.float64) - x
+            self.assertLessEqual(np.max(noise), 2.)
+            self.assertGreaterEqual(np.min(noise), -2.)
+            self.assertAlmostEqual(0., np.mean(noise), delta=0.05)
+
+            # test reproducible with independent mini-batches
+            y2 = sampler.sample(x)
+            self.assertFalse(np.all(y == y2))
+            sampler = UniformNoiseSampler(
+                minval=-2., maxval=2., random_state=make_generator(1234),
+                threads=threads
+            )
+            np.testing.assert_equal(y, sampler.sample(x))
+            np.testing.assert_equal(y2, sampler.sample(x))
+
+        # test the output dtype
+        x = np.arange(0, 1000, dtype=np.float64)
+        sampler = UniformNoiseSampler(random_state=make_generator(1234))
+        y = sampler.sample(x)
+        self.assertEqual(np.float64, y.dtype)
+        self.assertLess(np.max(y - x), 1.)
+        self.assertGreaterEqual(np.min(y - x), 0.)
+
+        sampler = UniformNoiseSampler(dtype=np.int32,
+                                      random_state=make_generator(1234))
+        y = sampler.sample(x)
+        self.assertEqual(np.int32, y.dtype)
+        np.testing.assert_equal(x, y)
+
+    def test_threads(self):
+        sampler = BernoulliSampler(
+            random_state=make_generator(1234), threads=3)
+        drawer = sampler._drawer
+        children = drawer._children
+        self.assertEqual(3, len(children))
+        self.assertIsNone(drawer._pool)
+
+        # the chunks are drawn from the substreams spawned by SeedSequence
+        seed_seq = make_generator(1234).bit_generator.seed_seq
+        expected = [np.random.Generator(np.random.Philox(s))
+                    for s in seed_seq.spawn(3)]
+        u = drawer.draw((10, 2), np.float64)
+        pool = drawer._pool
+        self.assertIsNotNone(pool)
+        np.testing.assert_equal(
+            np.concatenate([expected[0].random((3, 2)),
+                            expected[1].random((3, 2)),
+                            expected[2].random((4, 2))]),
+            u
+        )
+
+        # the substreams and the thread pool are kept across the draws,
+        # and fewer chunks than the threads are drawn for short buffers
+        u = drawer.draw((2,), np.float64)
+        self.assertIs(pool, drawer._pool)
+        self.assertIs(children, drawer._children)
+        np.testing.assert_equal(
+            [expected[0].random(), expected[1].random()], u)
+
+        # fall back to jumping the bit generator without a seed sequence
+        bit_generator = np.random.Philox(1234)
+        generator = Mock(bit_generator=Mock(
+            spec=['jumped'], jumped=bit_generator.jumped))
+        children = _spawn_generators(generator, 2)
+        for i, child in enumerate(children):
+            np.testing.assert_equal(
+                np.random.Generator(bit_generator.jumped(i + 1)).random(5),
+                child.random(5)
+            )
+
+    def test_errors(self):
+        with pytest.raises(ValueError, match='`threads` requires '
+                                             '`random_state` to be a '
+                                             '`numpy.random.Generator`'):
+            _ = BernoulliSampler(threads=2)
+        with pytest.raises(ValueError, match='`threads` requires '
+                                             '`random_state` to be a '
+                                             '`numpy.random.Generator`'):
+            _ = UniformNoiseSampler(
+                random_state=np.random.RandomState(1234), threads=2)
+
+
 class BernoulliSamplerTestCase(unittest.TestCase):
 
     def test_property(self):
@@ -1,14 +1,16 @@
 import hashlib
 import mimetypes
 import os
-import shutil
+import re
 import socket
 import unittest
 from contextlib import contextmanager
 from threading import Thread
 
+import numpy as np
 import six
 import pytest
+from filelock import FileLock
 from mock import mock
 
 from tfsnippet.utils import *
@@ -48,19 +50,55 @@ PAYLOAD_CONTENT = [
 
 class AssetsHTTPRequestHandler(BaseHTTPRequestHandler):
 
-    def do_GET(self):
+    def send_asset_headers(self):
         asset_file = get_asset_path(self.path.lstrip('/'))
         if not os.path.isfile(asset_file):
             self.send_error(404, 'Not Found')
-        else:
-            self.send_response(200)
-            self.send_header('Content-type', mimetypes.guess_type(asset_file))
-            self.send_header('Content-Length', os.stat(asset_file).st_size)
-            self.send_header('Connection', 'close')
-            self.end_headers()
-            with open(asset_file, 'rb') as f:
-                shutil.copyfileobj(f, self.wfile)
+            return None
+
+        size = os.stat(asset_file).st_size
+        start, end, status = 0, size, 200
+        range_header = self.headers.get('Range')
+        if range_header is not None:
+            self.server.ranges.append(range_header)
+        if_range = self.headers.get('If-Range')
+        if range_header is not None and self.server.accept_ranges and \
+                (if_range is None or if_range == self.server.etag):
+            m = re.match(r'^bytes=(\d+)-(\d*)$', range_header)
+            start = int(m.group(1))
+            end = int(m.group(2)) + 1 if m.group(2) else size
+            if start >= size:
+                self.send_error(416, 'Requested Range Not Satisfiable')
+                return None
+            status = 206
+
+        self.send_response(status)
+        self.send_header('Content-type', mimetypes.guess_type(asset_file))
+        self.send_header('Content-Length', end - start)
+        if self.server.accept_ranges:
+            self.send_header('Accept-Ranges', 'bytes')
+        if self.server.etag is not None:
+            self.send_header('ETag', self.server.etag)
+        if status == 206:
+            self.send_header('Content-Range',
+                             'bytes {}-{}/{}'.format(start, end - 1, size))
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        return asset_file, start, end
+
+    def do_HEAD(self):
+        self.send_asset_headers()
+
+    def do_GET(self):
+        ret = self.send_asset_headers()
+        if ret is not None:
+            asset_file, start, end = ret
+            if self.server.truncate is not None:
+                end = min(end, start + self.server.truncate)
             self.server.counter[0] += 1
+            with open(asset_file, 'rb') as f:
+                f.seek(start)
+                self.wfile.write(f.read(end - start))
         return
 
 
@@ -110,6 +148,10 @@ def assets_server():
     port = get_free_port()
     server = HTTPServer(('127.0.0.1', port), AssetsHTTPRequestHandler)
     server.counter = [0]
+    server.ranges = []
+    server.accept_ranges = True
+    server.truncate = None
+    server.etag = '"v1"'
     background_thread = Thread(target=server.serve_forever)
     background_thread.daemon = True
     background_thread.start()
@@ -226,6 +268,292 @@ class CacheDirTestCase(unittest.TestCase):
                     'Downloading ' + url + 'not-exist.zip ... error\n'
                 )
 
+    def test_download_resume(self):
+        with open(get_asset_path('payload.tar'), 'rb') as f:
+            content = f.read()
+        content_md5 = hashlib.md5(content).hexdigest()
+
+        def read_file(path):
+            with open(path, 'rb') as f:
+                return f.read()
+
+        def write_file(path, cnt):
+            with open(path, 'wb') as f:
+                f.write(cnt)
+
+        with TemporaryDirectory() as tmpdir, \
+                mock.patch('tfsnippet.utils.caching._DOWNLOAD_CHUNK_SIZE',
+                           100):
+            cache_dir = CacheDir('sub-dir', cache_root=tmpdir)
+            path = os.path.join(cache_dir.path, 'payload.tar')
+            temp_file = path + '._downloading_'
+            makedirs(cache_dir.path, exist_ok=True)
+
+            def download():
+                return cache_dir.download(
+                    url + 'payload.tar', progress_file=LogIO(),
+                    hasher=hashlib.md5(), expected_hash=content_md5
+                )
+
+            def interrupted_download(size, **kwargs):
+                server.truncate = size
+                try:
+                    with pytest.raises(IOError):
+                        _ = cache_dir.download(url + 'payload.tar',
+                                               progress_file=LogIO(),
+                                               **kwargs)
+                finally:
+                    server.truncate = None
+                server.ranges[:] = []
+
+            with assets_server() as (server, url):
+                # resume from the partially downloaded file
+                interrupted_download(1000)
+                self.assertEqual(content[:1000], read_file(temp_file))
+                self.assertEqual(path, download())
+                self.assertEqual(content, read_file(path))
+                self.assertEqual(['payload.tar', 'payload.tar.lock',
+                                  'payload.tar.verified'],
+                                 sorted(os.listdir(cache_dir.path)))
+                self.assertEqual(['bytes=1000-'], server.ranges)
+
+                # the content has changed, start over even without hasher
+                os.remove(path)
+                interrupted_download(1000)
+                write_file(temp_file, b'1' * 1000)
+                server.etag = '"v2"'
+                cache_dir.download(url + 'payload.tar', progress_file=LogIO())
+                self.assertEqual(content, read_file(path))
+                self.assertEqual(['bytes=1000-'], server.ranges)
+
+                # the server does not provide validators, start over
+                os.remove(path)
+                server.etag = None
+                interrupted_download(1000)
+                self.assertEqual(path, download())
+                self.assertEqual(content, read_file(path))
+                self.assertEqual([], server.ranges)
+                server.etag = '"v1"'
+
+                # the partial file without resume info, start over
+                os.remove(path)
+                write_file(temp_file, b'1' * 1000)
+                self.assertEqual(path, download())
+                self.assertEqual(content, read_file(path))
+                self.assertEqual([], server.ranges)
+
+                # the server does not accept ranges, start over
+                os.remove(path)
+                interrupted_download(1000)
+                server.accept_ranges = False
+                self.assertEqual(path, download())
+                self.assertEqual(content, read_file(path))
+                server.accept_ranges = True
+
+                # the partial file is larger than the content, start over
+                os.remove(path)
+                interrupted_download(1000)
+                write_file(temp_file, content + b'12345')
+                self.assertEqual(path, download())
+                self.assertEqual(content, read_file(path))
+
+                # the interrupted download should be kept for resuming
+                os.remove(path)
+                server.truncate = 3000
+                with pytest.raises(IOError):
+                    _ = download()
+                self.assertFalse(os.path.isfile(path))
+                self.assertTrue(os.path.isfile(temp_file))
+                self.assertEqual(content[:os.path.getsize(temp_file)],
+                                 read_file(temp_file))
+                server.truncate = None
+                self.assertEqual(path, download())
+                self.assertEqual(content, read_file(path))
+
+                # the corrupted download should be removed
+                os.remove(path)
+                interrupted_download(1000)
+                write_file(temp_file, b'1' * 1000)
+                with pytest.raises(IOError, match='Hash not match'):
+                    _ = download()
+                self.assertEqual([], [
+                    name for name in os.listdir(cache_dir.path)
+                    if name.startswith('payload.tar._downloading_')
+                ])
+
+            # the partial file from the mirror should not be resumed from
+            # the original URI
+            with assets_server() as (mirror, mirror_url), \
+                    assets_server() as (server, url), \
+                    scoped_set_config(settings, download_mirror=mirror_url):
+                mirror.truncate = 1000
+                server.etag = mirror.etag
+                self.assertEqual(path, cache_dir.download(
+                    url + 'payload.tar', progress_file=LogIO()))
+                self.assertEqual(content, read_file(path))
+                self.assertEqual(1, mirror.counter[0])
+                self.assertEqual([], server.ranges)
+
+    def test_download_segments(self):
+        with open(get_asset_path('payload.tar'), 'rb') as f:
+            content = f.read()
+
+        with TemporaryDirectory() as tmpdir, \
+                mock.patch('tfsnippet.utils.caching._MIN_SEGMENT_SIZE',
+                           1000), \
+                mock.patch('tfsnippet.utils.caching._DOWNLOAD_CHUNK_SIZE',
+                           100):
+            cache_dir = CacheDir('sub-dir', cache_root=tmpdir)
+            path = os.path.join(cache_dir.path, 'payload.tar')
+
+            with assets_server() as (server, url):
+                # download in 3 segments
+                with scoped_set_config(settings, download_segments=3):
+                    self.assertEqual(path, cache_dir.download(
+                        url + 'payload.tar', progress_file=LogIO()))
+                with open(path, 'rb') as f:
+                    self.assertEqual(content, f.read())
+                self.assertEqual(
+                    ['bytes=0-1705', 'bytes=1706-3412', 'bytes=3413-5119'],
+                    sorted(server.ranges)
+                )
+                self.assertEqual(
+                    ['payload.tar', 'payload.tar.lock'],
+                    sorted(os.listdir(cache_dir.path))
+                )
+
+                # resume the partially downloaded segments
+                def interrupted_download():
+                    os.remove(path)
+                    server.truncate = 500
+                    with pytest.raises(IOError):
+                        _ = cache_dir.download(
+                            url + 'payload.tar', progress_file=LogIO(),
+                            segments=3
+                        )
+                    server.truncate = None
+                    server.ranges[:] = []
+
+                interrupted_download()
+                self.assertEqual(path, cache_dir.download(
+                    url + 'payload.tar', progress_file=LogIO(), segments=3))
+                with open(path, 'rb') as f:
+                    self.assertEqual(content, f.read())
+                self.assertEqual(
+                    ['bytes=2206-3412', 'bytes=3913-5119', 'bytes=500-1705'],
+                    sorted(server.ranges)
+                )
+                self.assertEqual(
+                    ['payload.tar', 'payload.tar.lock'],
+                    sorted(os.listdir(cache_dir.path))
+                )
+
+                # the content has changed, discard the segments
+                interrupted_download()
+                server.etag = '"v2"'
+                self.assertEqual(path, cache_dir.download(
+                    url + 'payload.tar', progress_file=LogIO(), segments=3))
+                with open(path, 'rb') as f:
+                    self.assertEqual(content, f.read())
+                self.assertEqual(
+                    ['bytes=0-1705', 'bytes=1706-3412', 'bytes=3413-5119'],
+                    sorted(server.ranges)
+                )
+
+                # the server does not accept ranges, use single request
+                os.remove(path)
+                server.ranges[:] = []
+                server.accept_ranges = False
+                self.assertEqual(path, cache_dir.download(
+                    url + 'payload.tar', progress_file=LogIO(), segments=3))
+                with open(path, 'rb') as f:
+                    self.assertEqual(content, f.read())
+                self.assertEqual([], server.ranges)
+
+    def test_download_local_and_mirror(self):
+        assets_dir = os.path.split(get_asset_path('payload.zip'))[0]
+        with open(get_asset_path('payload.zip'), 'rb') as f:
+            content = f.read()
+        bad_url = 'http://127.0.0.1:{}/'.format(get_free_port())
+
+        def check_file(path, name):
+            self.assertEqual(os.path.join(cache_dir.path, name), path)
+            with open(path, 'rb') as f:
+                self.assertEqual(content, f.read())
+
+        with TemporaryDirectory() as tmpdir:
+            cache_dir = CacheDir('sub-dir', cache_root=tmpdir)
+
+            # download from file:// URI and local path
+            check_file(
+                cache_dir.download('file://' + get_asset_path('payload.zip'),
+                                   progress_file=LogIO()),
+                'payload.zip'
+            )
+            check_file(
+                cache_dir.download(get_asset_path('payload.zip'),
+                                   filename='local.zip',
+                                   progress_file=LogIO()),
+                'local.zip'
+            )
+
+            # download from local mirror
+            with scoped_set_config(settings, download_mirror=assets_dir):
+                check_file(
+                    cache_dir.download(bad_url + 'a/payload.zip',
+                                       filename='mirror1.zip',
+                                       progress_file=LogIO()),
+                    'mirror1.zip'
+                )
+
+            with assets_server() as (server, url):
+                # download from HTTP mirror
+                with scoped_set_config(settings, download_mirror=url):
+                    check_file(
+                        cache_dir.download(bad_url + 'a/payload.zip',
+                                           filename='mirror2.zip',
+                                           progress_file=LogIO()),
+                        'mirror2.zip'
+                    )
+                self.assertEqual(1, server.counter[0])
+
+                # fall back to the original URI, reporting the mirror error
+                mirror_dir = os.path.join(tmpdir, 'not-exist')
+                log_file = LogIO()
+                with scoped_set_config(settings, download_mirror=mirror_dir):
+                    check_file(
+                        cache_dir.download(url + 'payload.zip',
+                                           filename='mirror3.zip',
+                                           progress_file=log_file),
+                        'mirror3.zip'
+                    )
+                self.assertEqual(2, server.counter[0])
+                log = log_file.getvalue()
+                self.assertTrue(log.startswith(
+                    'Downloading {} ... Failed to download from the mirror '
+                    '{}: '.format(url + 'payload.zip',
+                                  os.path.join(mirror_dir, 'payload.zip'))))
+                self.assertTrue(log.endswith(
+                    '\nDownloading {} ... ok\n'.format(url + 'payload.zip')))
+
+                # errors other than I/O errors should not be swallowed
+                with scoped_set_config(settings, download_mirror=url), \
+                        mock.patch('tfsnippet.utils.caching._fetch_http',
+                                   mock.Mock(side_effect=ValueError('bug'))), \
+                        pytest.raises(ValueError, match='bug'):
+                    _ = cache_dir.download(url + 'payload.zip',
+                                           filename='mirror4.zip',
+                                           progress_file=LogIO())
+                self.assertEqual(2, server.counter[0])
+
+            # error of the original URI should be raised
+            with scoped_set_config(settings, download_mirror=bad_url), \
+                    pytest.raises(IOError, match='not-exist.zip'):
+                _ = cache_dir.download(
+                    os.path.join(tmpdir, 'not-exist.zip'),
+                    progress_file=LogIO()
+                )
+
     def test_download_validate_hash(self):
         def compute_hash(hasher, path):
             with open(path, 'rb') as f:
@@ -287,6 +615,90 @@ class CacheDirTestCase(unittest.TestCase):
                                                hasher=hashlib.sha1(),
                                                expected_hash=payload_tar_sha1)
 
+    def test_verified_hash(self):
+        from tfsnippet.utils import caching
+
+        def compute_hash(hasher, path):
+            with open(path, 'rb') as f:
+                hasher.update(f.read())
+            return hasher.hexdigest()
+
+        payload_tar_sha1 = compute_hash(
+            hashlib.sha1(), get_asset_path('payload.tar'))
+
+        with TemporaryDirectory() as tmpdir:
+            # test hashing by memory-mapped blocks
+            empty_file = os.path.join(tmpdir, 'empty.txt')
+            with open(empty_file, 'wb'):
+                pass
+            self.assertEqual(
+                hashlib.md5().hexdigest(),
+                caching._compute_file_hash(empty_file, hashlib.md5())
+            )
+            with mock.patch('tfsnippet.utils.caching._HASH_BLOCK_SIZE', 1000):
+                self.assertEqual(
+                    payload_tar_sha1,
+                    caching._compute_file_hash(
+                        get_asset_path('payload.tar'), hashlib.sha1())
+                )
+
+            cache_dir = CacheDir('sub-dir', cache_root=tmpdir)
+            path = os.path.join(cache_dir.path, 'payload.tar')
+            sidecar_file = path + '.verified'
+
+            def download():
+                return cache_dir.download(
+                    url + 'payload.tar', progress_file=LogIO(),
+                    hasher=hashlib.sha1(), expected_hash=payload_tar_sha1
+                )
+
+            with assets_server() as (server, url), \
+                    scoped_set_config(settings, file_cache_checksum=True), \
+                    mock.patch('tfsnippet.utils.caching._compute_file_hash',
+                               wraps=caching._compute_file_hash) as m:
+                # the verified hash should be saved after downloaded
+                self.assertEqual(path, download())
+                self.assertTrue(os.path.isfile(sidecar_file))
+                self.assertEqual(1, m.call_count)
+
+                # the cached file should not be re-hashed
+                self.assertEqual(path, download())
+                self.assertEqual(1, server.counter[0])
+                self.assertEqual(1, m.call_count)
+
+                # a different hash algorithm should trigger re-hashing
+                payload_tar_md5 = compute_hash(hashlib.md5(), path)
+                self.assertEqual(path, cache_dir.download(
+                    url + 'payload.tar', hasher=hashlib.md5(),
+                    expected_hash=payload_tar_md5
+                ))
+                self.assertEqual(2, m.call_count)
+
+                # the modified file should be re-hashed
+                st = os.stat(path)
+                os.utime(path, (st.st_atime, st.st_mtime + 10))
+                self.assertEqual(path, download())
+                self.assertEqual(3, m.call_count)
+                self.assertEqual(path, download())
+                self.assertEqual(3, m.call_count)
+
+                # the corrupted sidecar file should be ignored
+                with open(sidecar_file, 'wb') as f:
+                    f.write(b'not json')
+                self.assertEqual(path, download())
+                self.assertEqual(4, m.call_count)
+
+                # the mismatched file should be removed along with the
+                # sidecar file
+                with open(path, 'r+b') as f:
+                    f.write(b'12345')
+                os.utime(path, (st.st_atime, st.st_mtime + 20))
+                with pytest.raises(IOError, match='Hash not match for '
+                                                  'cached file'):
+                    _ = download()
+                self.assertFalse(os.path.isfile(path))
+                self.assertFalse(os.path.isfile(sidecar_file))
+
     @mock.patch('tfsnippet.utils.caching.Extractor', PatchedExtractor)
     def test_extract_file(self):
         with TemporaryDirectory() as tmpdir:
@@ -356,6 +768,166 @@ class CacheDirTestCase(unittest.TestCase):
                 log_file.getvalue()
             )
 
+    def test_cached_arrays(self):
+        x = np.arange(12, dtype=np.uint8).reshape([3, 4])
+        y = np.asarray([1, 2, 3], dtype=np.int32)
+
+        with TemporaryDirectory() as tmpdir:
+            cache_dir = CacheDir('sub-dir', cache_root=tmpdir)
+            factory = mock.Mock(return_value=(x, y))
+
+            # create the arrays by the factory
+            arrays = cache_dir.cached_arrays('arrays', ['abc', 1], factory)
+            self.assertEqual(1, factory.call_count)
+            self.assertEqual(2, len(arrays))
+            for a, b in zip(arrays, (x, y)):
+                self.assertIsInstance(a, np.memmap)
+                self.assertEqual(b.dtype, a.dtype)
+                np.testing.assert_equal(b, a)
+            del arrays
+
+            # load the arrays from the cache
+            arrays = cache_dir.cached_arrays('arrays', ['abc', 1], factory)
+            self.assertEqual(1, factory.call_count)
+            np.testing.assert_equal(x, arrays[0])
+            np.testing.assert_equal(y, arrays[1])
+            del arrays
+
+            # a different key should produce a new cache entry
+            arrays = cache_dir.cached_arrays(
+                'arrays', ['abc', 2], factory, mmap_mode=None)
+            self.assertEqual(2, factory.call_count)
+            self.assertNotIsInstance(arrays[0], np.memmap)
+            np.testing.assert_equal(x, arrays[0])
+            self.assertEqual(
+                2, len([n for n in os.listdir(cache_dir.path)
+                        if os.path.isdir(os.path.join(cache_dir.path, n))]))
+
+            # the error raised by the factory should not be cached
+            def factory_error():
+                yield x
+                raise RuntimeError('factory error')
+
+            with pytest.raises(RuntimeError, match='factory error'):
+                _ = cache_dir.cached_arrays('arrays', ['def'], factory_error)
+            self.assertEqual(
+                2, len([n for n in os.listdir(cache_dir.path)
+                        if os.path.isdir(os.path.join(cache_dir.path, n))]))
+
+    def test_cache_root(self):
+        def array_factory():
+            return (np.zeros([1000], dtype=np.uint8),)
+
+        def get_arrays_path(cache_dir, key):
+            arrays = cache_dir.cached_arrays('arrays', key, array_factory)
+            return os.path.split(arrays[0].filename)[0]
+
+        with TemporaryDirectory() as tmpdir, \
+                mock.patch('tfsnippet.utils.caching.time',
+                           mock.Mock(time=mock.Mock(
+                               side_effect=range(0, 10000, 100)))):
+            root = CacheRoot(tmpdir)
+            self.assertEqual(tmpdir, root.path)
+            self.assertEqual(
+                {'entries': 0, 'size': 0, 'budget': None, 'hits': 0,
+                 'misses': 0, 'bytes_saved': 0, 'evictions': 0},
+                root.get_stats()
+            )
+
+            # test hits and misses of the cached arrays
+            cache_dir = CacheDir('sub-dir', cache_root=tmpdir)
+            path1 = get_arrays_path(cache_dir, 1)
+            size = os.path.getsize(os.path.join(path1, 'arr_0.npy'))
+            path2 = get_arrays_path(cache_dir, 2)
+            self.assertEqual(path1, get_arrays_path(cache_dir, 1))
+            stats = root.get_stats()
+            self.assertEqual(2, stats['entries'])
+            self.assertEqual(2 * size, stats['size'])
+            self.assertEqual((1, 2, size),
+                             (stats['hits'], stats['misses'],
+                              stats['bytes_saved']))
+
+            # test evicting the least recently used entries
+            with scoped_set_config(settings, cache_size_budget=2 * size):
+                path3 = get_arrays_path(cache_dir, 3)
+                stats = root.get_stats()
+                self.assertEqual(2 * size, stats['budget'])
+            self.assertTrue(os.path.isdir(path1))
+            self.assertFalse(os.path.isdir(path2))
+            self.assertTrue(os.path.isdir(path3))
+            self.assertEqual((2, 2 * size, 1),
+                             (stats['entries'], stats['size'],
+                              stats['evictions']))
+
+            self.assertEqual([], root.evict())
+            self.assertEqual([path1], root.evict(budget=size))
+            self.assertFalse(os.path.isdir(path1))
+
+            # the entry being created by other process should not be evicted
+            with FileLock(path3 + '.lock'):
+                self.assertEqual([], root.evict(budget=0))
+            self.assertTrue(os.path.isdir(path3))
+
+            # the entry which cannot be removed should be skipped
+            with mock.patch('tfsnippet.utils.caching._remove_cache_entry',
+                            mock.Mock(side_effect=OSError('in use'))):
+                self.assertEqual([], root.evict(budget=0))
+                path4 = get_arrays_path(cache_dir, 4)
+            self.assertTrue(os.path.isdir(path3))
+            self.assertEqual(2, root.get_stats()['entries'])
+            self.assertEqual([path3, path4], root.evict(budget=0))
+            path3 = get_arrays_path(cache_dir, 3)
+
+            # the hits within the access time granularity should not
+            # rewrite the index, and be saved with the next update
+            hits = root.get_stats()['hits']
+            index_file = os.path.join(tmpdir, CacheRoot.INDEX_FILE)
+            with open(index_file, 'rb') as f:
+                index_content = f.read()
+            with mock.patch(
+                    'tfsnippet.utils.caching._ACCESS_TIME_GRANULARITY', 1000):
+                self.assertEqual(path3, get_arrays_path(cache_dir, 3))
+                self.assertEqual(path3, get_arrays_path(cache_dir, 3))
+            with open(index_file, 'rb') as f:
+                self.assertEqual(index_content, f.read())
+            self.assertEqual(hits, root.get_stats()['hits'])
+            self.assertEqual(hits + 2, cache_dir._root.get_stats()['hits'])
+
+            # test the downloaded files
+            with assets_server() as (server, url):
+                path = cache_dir.download(url + 'payload.zip',
+                                          progress_file=LogIO())
+                _ = cache_dir.download(url + 'payload.zip',
+                                       progress_file=LogIO())
+            stats = root.get_stats()
+            self.assertEqual((2, os.path.getsize(path) + size),
+                             (stats['entries'], stats['size']))
+            self.assertEqual((4, 6), (stats['hits'], stats['misses']))
+
+            # test the corrupted index file, which should be rebuilt
+            with open(os.path.join(tmpdir, CacheRoot.INDEX_FILE), 'wb') as f:
+                f.write(b'{"entries": ')
+            stats = root.get_stats()
+            self.assertEqual((2, os.path.getsize(path) + size),
+                             (stats['entries'], stats['size']))
+            self.assertEqual((0, 0), (stats['hits'], stats['misses']))
+            self.assertEqual(
+                [CacheRoot.INDEX_FILE, CacheRoot.INDEX_FILE + '.lock',
+                 'sub-dir'],
+                sorted(os.listdir(tmpdir))
+            )
+            with scoped_set_config(settings, cache_size_budget=size):
+                self.assertEqual([path3], root.evict())
+
+            # test purge all and reset stats
+            cache_dir.purge_all()
+            root.reset_stats()
+            self.assertEqual(
+                {'entries': 0, 'size': 0, 'budget': None, 'hits': 0,
+                 'misses': 0, 'bytes_saved': 0, 'evictions': 0},
+                root.get_stats()
+            )
+
     def test_download_and_extract_and_purge_all(self):
         with TemporaryDirectory() as tmpdir:
             cache_dir = CacheDir('sub-dir', cache_root=tmpdir)
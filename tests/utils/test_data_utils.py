@@ -1,3 +1,4 @@
+import os
 import unittest
 
 import numpy as np
@@ -128,3 +129,119 @@ class SplitNumpyArraysTestCase(unittest.TestCase):
             np.arange(10), portion=0.1, shuffle=False)
         np.testing.assert_equal(left, np.arange(9))
         np.testing.assert_equal(right, [9])
+
+
+class ArrayCollectorTestCase(unittest.TestCase):
+
+    def test_collect(self):
+        x = np.arange(30).reshape([15, 2])
+
+        # test exact capacity, unknown capacity, and too small capacity
+        for capacity in (15, None, 3):
+            collector = ArrayCollector(capacity=capacity)
+            for i in range(0, 15, 4):
+                collector.append(x[i: i + 4])
+            self.assertEqual(15, collector.length)
+            collected = collector.to_array()
+            np.testing.assert_equal(x, collected)
+
+        # test too large capacity
+        collector = ArrayCollector(capacity=100)
+        collector.append(x)
+        np.testing.assert_equal(x, collector.to_array())
+
+        # test dtype promotion
+        collector = ArrayCollector()
+        collector.append(np.arange(3, dtype=np.int32))
+        collector.append(np.arange(3, 5, dtype=np.float64))
+        collected = collector.to_array()
+        self.assertEqual(np.float64, collected.dtype)
+        np.testing.assert_equal(np.arange(5), collected)
+
+        # test empty
+        collector = ArrayCollector(capacity=10)
+        collector.append(np.zeros([0, 2], dtype=np.float32))
+        collected = collector.to_array()
+        self.assertEqual((0, 2), collected.shape)
+        self.assertEqual(np.float32, collected.dtype)
+
+    def test_memmap(self):
+        x = np.arange(30, dtype=np.float32).reshape([15, 2])
+
+        with TemporaryDirectory() as tmpdir:
+            for capacity in (15, None, 3, 100):
+                path = os.path.join(tmpdir, 'x.dat')
+                collector = ArrayCollector(capacity=capacity, memmap_path=path)
+                for i in range(0, 15, 4):
+                    collector.append(x[i: i + 4])
+                collected = collector.to_array()
+                self.assertIsInstance(collected, np.memmap)
+                np.testing.assert_equal(x, collected)
+                self.assertEqual(x.nbytes, os.path.getsize(path))
+                np.testing.assert_equal(
+                    x, np.fromfile(path, dtype=np.float32).reshape([15, 2]))
+                del collected, collector
+
+            collector = ArrayCollector(memmap_path=path)
+            collector.append(np.arange(3, dtype=np.int32))
+            with pytest.raises(ValueError, match='The dtype of the array '
+                                                 'cannot be cast into the '
+                                                 'memory-mapped data'):
+                collector.append(np.arange(3, dtype=np.float32))
+            del collector
+
+    def test_errors(self):
+        with pytest.raises(ValueError, match='`capacity` must be '
+                                             'non-negative'):
+            _ = ArrayCollector(capacity=-1)
+
+        collector = ArrayCollector()
+        with pytest.raises(ValueError, match='No array has been collected'):
+            _ = collector.to_array()
+        with pytest.raises(ValueError, match='`arr` must be at least 1-d'):
+            collector.append(np.array(0))
+        collector.append(np.zeros([2, 3]))
+        with pytest.raises(ValueError, match='The shape of the array does not '
+                                             'match the collected data'):
+            collector.append(np.zeros([2, 4]))
+        _ = collector.to_array()
+        with pytest.raises(RuntimeError, match='The collected array has been '
+                                               'taken out'):
+            collector.append(np.zeros([2, 3]))
+
+
+class PackedArrayTestCase(unittest.TestCase):
+
+    def test_packed_array(self):
+        data = np.arange(24, dtype=np.uint8).reshape([4, 3, 2])
+        arr = PackedArray(data, divisor=255.)
+        self.assertIs(data, arr.data)
+        self.assertEqual(np.float32, arr.dtype)
+        self.assertEqual(255., arr.divisor)
+        self.assertEqual((4, 3, 2), arr.shape)
+        self.assertEqual(3, arr.ndim)
+        self.assertEqual(4, len(arr))
+        self.assertEqual(24, arr.nbytes)
+        self.assertEqual('PackedArray(shape=(4, 3, 2), dtype=float32, '
+                         'storage_dtype=uint8)', repr(arr))
+
+        expected = data.astype(np.float32) / np.float32(255.)
+        for item in (slice(1, 3), np.array([3, 0, 1]), 2, (1, 2)):
+            value = arr[item]
+            self.assertEqual(np.float32, value.dtype)
+            np.testing.assert_allclose(expected[item], value)
+        np.testing.assert_allclose(expected, np.asarray(arr))
+        self.assertEqual(np.float64, np.asarray(arr, dtype=np.float64).dtype)
+
+        # test without the divisor
+        arr = PackedArray(data, dtype=np.int32)
+        self.assertIsNone(arr.divisor)
+        np.testing.assert_equal(data[1:3].astype(np.int32), arr[1:3])
+        self.assertEqual(np.int32, arr[1:3].dtype)
+
+        # test subset
+        subset = PackedArray(data, divisor=255.).subset(np.array([3, 1]))
+        self.assertIsInstance(subset, PackedArray)
+        self.assertEqual(np.uint8, subset.data.dtype)
+        self.assertEqual(255., subset.divisor)
+        np.testing.assert_allclose(expected[[3, 1]], subset[:])
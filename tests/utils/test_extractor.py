@@ -63,6 +63,49 @@ class ExtractorTestCase(unittest.TestCase):
         self.check_archive_file(TarExtractor, self.get_asset('payload.tar.bz2'),
                                 'payload.tb2')
 
+    def test_iter_buffers(self):
+        for name in ('payload.zip', 'payload.rar', 'payload.tar',
+                     'payload.tar.gz'):
+            with Extractor.open(self.get_asset(name)) as e:
+                self.assertListEqual(
+                    [
+                        ('a/1.txt', b'a/1.txt'),
+                        ('b/2.txt', b'b/2.txt'),
+                        ('c.txt', b'c.txt'),
+                    ],
+                    list(e.iter_buffers())
+                )
+            with Extractor.open(self.get_asset(name)) as e:
+                self.assertListEqual(
+                    [('a/1.txt', b'a/1.txt'), ('c.txt', b'c.txt')],
+                    list(e.iter_buffers(['c.txt', 'a/1.txt', 'd.txt']))
+                )
+
+    def test_extract_all(self):
+        def check_extract_all(archive_file, **kwargs):
+            with TemporaryDirectory() as tmpdir, \
+                    Extractor.open(archive_file) as e:
+                extract_path = os.path.join(tmpdir, 'payload')
+                e.extract_all(extract_path, **kwargs)
+                files = []
+                for name in iter_files(extract_path):
+                    with open(os.path.join(extract_path, name), 'rb') as f:
+                        files.append((name, f.read()))
+                self.assertListEqual(
+                    [
+                        ('a/1.txt', b'a/1.txt'),
+                        ('b/2.txt', b'b/2.txt'),
+                        ('c.txt', b'c.txt'),
+                    ],
+                    sorted(files)
+                )
+
+        check_extract_all(self.get_asset('payload.tar.gz'))
+        check_extract_all(self.get_asset('payload.rar'))
+        check_extract_all(self.get_asset('payload.zip'))
+        for workers in (1, 2, 3, 10):
+            check_extract_all(self.get_asset('payload.zip'), workers=workers)
+
     def test_errors(self):
         with TemporaryDirectory() as tmpdir:
             archive_file = os.path.join(tmpdir, 'payload.txt')
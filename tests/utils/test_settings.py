@@ -9,3 +9,6 @@ class TFSnippetConfigTestCase(unittest.TestCase):
         self.assertTrue(spt.settings.enable_assertions)
         self.assertFalse(spt.settings.check_numerics)
         self.assertFalse(spt.settings.auto_histogram)
+        self.assertTrue(spt.settings.cache_dataset_arrays)
+        self.assertIsNone(spt.settings.cache_size_budget)
+        self.assertEqual(1, spt.settings.download_segments)
@@ -1,14 +1,27 @@
 from .array_flow import *
+from .async_flow import *
 from .base import *
+from .cache_flow import *
 from .data_mappers import *
 from .gather_flow import *
 from .iterator_flow import *
 from .mapper_flow import *
+from .memmap_flow import *
+from .multiprocess_flow import *
+from .profiler import *
+from .rebatch_flow import *
 from .seq_flow import *
+from .sharded_flow import *
+from .shared_memory import *
+from .shuffle_buffer_flow import *
 from .threading_flow import *
+from .weighted_flow import *
 
 __all__ = [
-    'ArrayFlow', 'DataFlow', 'DataMapper', 'ExtraInfoDataFlow', 'GatherFlow',
-    'IteratorFactoryFlow', 'MapperFlow', 'SeqFlow', 'SlidingWindow',
-    'ThreadingFlow',
+    'ArrayFlow', 'AsyncPrefetchFlow', 'BucketFlow', 'CacheFlow', 'DataFlow',
+    'DataFlowProfiler', 'DataMapper', 'ExtraInfoDataFlow', 'GatherFlow',
+    'IteratorFactoryFlow', 'MapperFlow', 'MemmapFlow', 'MultiprocessFlow',
+    'RebatchFlow', 'SeqFlow', 'ShardWriter', 'ShardedFlow',
+    'SharedMemoryRingBuffer', 'ShuffleBufferFlow', 'SlidingWindow',
+    'ThreadingFlow', 'WeightedFlow',
 ]
@@ -1,7 +1,10 @@
+from itertools import islice
+
 import numpy as np
 from numpy.random import RandomState
 
-from tfsnippet.utils import minibatch_slices_iterator, generate_random_seed
+from tfsnippet.utils import (minibatch_slices_iterator, generate_random_seed,
+                             CheckpointSavableObject)
 from .base import ExtraInfoDataFlow
 
 __all__ = ['ArrayFlow']
@@ -13,7 +16,20 @@ def _make_readonly(arr):
     return arr
 
 
-class ArrayFlow(ExtraInfoDataFlow):
+def _check_gather_buffers(source, required, consumer):
+    """
+    Check whether or not `source`, if it is a shuffled :class:`ArrayFlow`
+    with `gather_buffers`, has at least `required` buffers for `consumer`.
+    """
+    if isinstance(source, ArrayFlow) and source.is_shuffled and \
+            source.gather_buffers is not None and \
+            source.gather_buffers < required:
+        raise ValueError('{} requires the source `ArrayFlow` to have at '
+                         'least {} `gather_buffers`: got {}.'.
+                         format(consumer, required, source.gather_buffers))
+
+
+class ArrayFlow(ExtraInfoDataFlow, CheckpointSavableObject):
     """
     Using numpy-like arrays as data source flow.
 
@@ -23,10 +39,57 @@ class ArrayFlow(ExtraInfoDataFlow):
                                      skip_incomplete=True)
         for batch_x, batch_y in array_flow:
             ...
+
+    With ``shuffle = True``, each shuffled mini-batch is gathered from the
+    arrays into newly allocated arrays by default.  If `gather_buffers` is
+    specified, the mini-batches of numpy arrays will instead be gathered
+    into a ring of pre-allocated buffers, which saves the allocation cost
+    on large arrays.  The buffers are used in turn across the epochs, thus
+    each mini-batch is overwritten when the `gather_buffers`-th next one is
+    gathered.  The buffers must therefore cover all the mini-batches held
+    by the consumers at the same time:
+
+    *   a plain ``for`` loop holds 1 mini-batch, thus 1 buffer is enough;
+    *   :class:`ThreadingFlow` with ``prefetch = P`` holds 1 mini-batch
+        being consumed, ``P`` in the queue and 1 being produced by its
+        background worker, thus at least ``P + 2`` buffers are required;
+    *   :class:`MapperFlow` with ``workers = W`` holds at most ``2 * W``
+        mini-batches in flight, plus 1 being gathered, thus at least
+        ``2 * W + 1`` buffers are required.
+
+    When these flows are stacked, the requirements add up.  For example::
+
+        array_flow = DataFlow.arrays([x, y], batch_size=256, shuffle=True,
+                                     gather_buffers=3)
+        with array_flow.threaded(prefetch=1) as df:
+            ...
+
+    For data-parallel training, each worker may iterate through a disjoint
+    shard of every epoch, by specifying `num_shards` and `shard_index`.
+    All the shards derive the same per-epoch permutation from `random_state`,
+    which must thus be constructed with the same seed in every worker::
+
+        array_flow = DataFlow.arrays(
+            [x, y], batch_size=256, shuffle=True,
+            random_state=np.random.RandomState(shared_seed),
+            num_shards=worker_count, shard_index=worker_rank,
+        )
+
+    The iteration state (i.e., the random state at the beginning of the
+    active epoch, and the number of mini-batches already yielded in this
+    epoch) can be saved via :class:`~tfsnippet.scaffold.CheckpointSaver`.
+    After restoring, the interrupted epoch will be resumed from the next
+    unseen mini-batch, with the same shuffling order::
+
+        with TrainLoop(..., checkpoint_dir='./checkpoint',
+                       checkpoint_save_objects={'train_flow': array_flow}):
+            ...
     """
 
     def __init__(self, arrays, batch_size,
-                 shuffle=False, skip_incomplete=False, random_state=None):
+                 shuffle=False, skip_incomplete=False, random_state=None,
+                 gather_buffers=None, shuffle_block_size=None,
+                 num_shards=None, shard_index=None, pad_shards=False):
         """
         Construct an :class:`ArrayFlow`.
 
@@ -42,8 +105,53 @@ class ArrayFlow(ExtraInfoDataFlow):
             random_state (RandomState): Optional numpy RandomState for
                 shuffling data before each epoch.  (default :obj:`None`,
                 construct a new :class:`RandomState`).
+            gather_buffers (int): If specified, gather the shuffled
+                mini-batches into this number of pre-allocated buffers in
+                turn.  See above for the number of buffers required by the
+                consumers.  (default :obj:`None`, allocate new arrays for
+                each shuffled mini-batch)
+            shuffle_block_size (int): If specified, shuffle the data by
+                permuting contiguous blocks of this number of items, rather
+                than individual items.  This improves the memory locality
+                of shuffled iteration on large arrays, at the cost of less
+                randomness.  (default :obj:`None`, shuffle individual items)
+            num_shards (int): If specified, split each epoch into this number
+                of disjoint shards, and iterate through only one of them.
+                (default :obj:`None`, iterate through all the data)
+            shard_index (int): The index of the shard to iterate through,
+                required if `num_shards` is specified.
+            pad_shards (bool): If :obj:`True`, pad the shards with the items
+                from the beginning of the epoch, such that every shard gets
+                ``ceil(data_length / num_shards)`` items.  Otherwise drop the
+                remaining items at the end of the epoch, such that every
+                shard gets ``floor(data_length / num_shards)`` items.
+                (default :obj:`False`)
+
+        Notes:
+            Each shard generates the full per-epoch permutation (and then
+            keeps only its own part), unless `shuffle_block_size` is
+            specified, in which case only the permutation of the blocks is
+            generated, and only the items of its own part are expanded.
         """
         # validate parameters
+        if gather_buffers is not None and gather_buffers < 1:
+            raise ValueError('`gather_buffers` must be at least 1')
+        if shuffle_block_size is not None and shuffle_block_size < 1:
+            raise ValueError('`shuffle_block_size` must be at least 1')
+        if (num_shards is None) != (shard_index is None):
+            raise ValueError('`num_shards` and `shard_index` must be both '
+                             'specified or both not specified.')
+        if num_shards is not None:
+            if num_shards < 1:
+                raise ValueError('`num_shards` must be at least 1')
+            if not 0 <= shard_index < num_shards:
+                raise ValueError('`shard_index` must be in the range '
+                                 '[0, {}): got {}'.
+                                 format(num_shards, shard_index))
+            if shuffle and num_shards > 1 and random_state is None:
+                raise ValueError('`random_state` must be specified, with '
+                                 'the same seed for all the shards, if '
+                                 '`shuffle` is True and `num_shards` > 1.')
         arrays = tuple(arrays)
         if not arrays:
             raise ValueError('`arrays` must not be empty.')
@@ -52,11 +160,27 @@ class ArrayFlow(ExtraInfoDataFlow):
                 raise ValueError('`arrays` must be numpy-like arrays.')
             if len(a.shape) < 1:
                 raise ValueError('`arrays` must be at least 1-d arrays.')
-        data_length = len(arrays[0])
+        total_length = len(arrays[0])
         for a in arrays[1:]:
-            if len(a) != data_length:
+            if len(a) != total_length:
                 raise ValueError('`arrays` must have the same data length.')
 
+        # determine the range of items of this shard, within the epoch
+        if num_shards is None:
+            data_length = total_length
+            shard_start = 0
+        else:
+            if pad_shards:
+                data_length = (total_length + num_shards - 1) // num_shards
+            else:
+                data_length = total_length // num_shards
+            # the padded shards may start beyond the end of the arrays if
+            # `num_shards` is close to (or larger than) the data length,
+            # in which case the positions wrap around the end of the epoch
+            shard_start = shard_index * data_length
+            if total_length > 0:
+                shard_start %= total_length
+
         # memorize the parameters
         super(ArrayFlow, self).__init__(
             array_count=len(arrays),
@@ -64,40 +188,247 @@ class ArrayFlow(ExtraInfoDataFlow):
             data_shapes=tuple(a.shape[1:] for a in arrays),
             batch_size=batch_size,
             skip_incomplete=skip_incomplete,
-            is_shuffled=shuffle
+            is_shuffled=shuffle,
+            data_dtypes=tuple(getattr(a, 'dtype', None) for a in arrays)
         )
         self._arrays = arrays
         self._random_state = \
             random_state or np.random.RandomState(generate_random_seed())
 
+        self._gather_buffer_count = gather_buffers
+        self._shuffle_block_size = shuffle_block_size
+        self._total_length = total_length
+        self._num_shards = num_shards
+        self._shard_index = shard_index
+        self._pad_shards = pad_shards
+        self._shard_start = shard_start
+
         # internal indices buffer
         self._indices_buffer = None
+        # internal pre-allocated buffers for gathering shuffled mini-batches,
+        # and the index of the next buffer to use, carried across the epochs
+        self._gather_buffers = None
+        self._gather_buffer_cursor = 0
+
+        # internal states for the active epoch, and for resuming an epoch
+        self._epoch_random_state = None
+        self._batch_cursor = None
+        self._resume_cursor = None
 
     @property
     def the_arrays(self):
         """Get the tuple of arrays accessed by this :class:`ArrayFlow`."""
         return self._arrays
 
+    @property
+    def gather_buffers(self):
+        """Get the number of pre-allocated buffers for shuffled gathering."""
+        return self._gather_buffer_count
+
+    @property
+    def shuffle_block_size(self):
+        """Get the size of contiguous blocks to be permuted for shuffling."""
+        return self._shuffle_block_size
+
+    @property
+    def num_shards(self):
+        """Get the number of shards, or :obj:`None` if not sharded."""
+        return self._num_shards
+
+    @property
+    def shard_index(self):
+        """Get the index of the shard, or :obj:`None` if not sharded."""
+        return self._shard_index
+
+    @property
+    def pad_shards(self):
+        """Whether or not to pad the shards to the same length?"""
+        return self._pad_shards
+
+    @property
+    def total_length(self):
+        """
+        Get the total number of items in the arrays.  It differs from
+        :attr:`data_length` (the number of items in this shard) if sharded.
+        """
+        return self._total_length
+
+    def _shard_positions(self):
+        """
+        Get the ``[start, stop)`` ranges of the positions of this shard
+        within the epoch, wrapping around the end of the epoch if padded.
+        """
+        start = self._shard_start
+        stop = start + self._data_length
+        if stop <= self._total_length:
+            return [(start, stop)]
+        return [(start, self._total_length), (0, stop - self._total_length)]
+
+    def get_state(self):
+        """
+        Get the iteration state of this flow.
+
+        Returns:
+            dict: The state dict, with the random state at the beginning of
+                the active epoch (or the current random state if no epoch
+                is active), and the number of mini-batches already yielded
+                in the active epoch.
+        """
+        if self._batch_cursor is not None:
+            return {'random_state': self._epoch_random_state,
+                    'batch_cursor': self._batch_cursor}
+        return {'random_state': self._random_state.get_state(),
+                'batch_cursor': self._resume_cursor or 0}
+
+    def set_state(self, state):
+        """
+        Set the iteration state of this flow.
+
+        The next epoch will re-generate the shuffling order from the
+        restored random state, then skip the first ``state['batch_cursor']``
+        mini-batches without gathering them.
+
+        Args:
+            state (dict): The state dict obtained by :meth:`get_state`.
+        """
+        self._random_state.set_state(state['random_state'])
+        self._resume_cursor = state['batch_cursor'] or None
+
+    def _shuffle_indices(self):
+        if self._indices_buffer is None:
+            t = np.int32 if self._total_length < (1 << 31) else np.int64
+            self._indices_buffer = np.arange(self._data_length, dtype=t)
+        indices = self._indices_buffer
+
+        if self._shuffle_block_size is None:
+            if self._num_shards is None:
+                # reset the indices before shuffling, such that the
+                # permutation only depends on the random state, and can be
+                # re-generated when resuming an epoch by :meth:`set_state`
+                indices[:] = np.arange(len(indices), dtype=indices.dtype)
+                self._random_state.shuffle(indices)
+            else:
+                perm = self._random_state.permutation(self._total_length)
+                indices[:] = np.concatenate(
+                    [perm[a: b] for a, b in self._shard_positions()])
+        else:
+            block_size = self._shuffle_block_size
+            block_count = \
+                (self._total_length + block_size - 1) // block_size
+            block_perm = self._random_state.permutation(block_count). \
+                astype(indices.dtype)
+            indices[:] = np.concatenate([
+                self._expand_blocks(block_perm, a, b)
+                for a, b in self._shard_positions()
+            ])
+
+    def _expand_blocks(self, block_perm, start, stop):
+        """
+        Get the item indices at the positions ``[start, stop)`` of the epoch,
+        where the epoch is formed by the blocks in the order of `block_perm`.
+        Only the blocks overlapping with these positions are expanded.
+        """
+        if stop <= start:
+            return block_perm[:0]
+        block_size = self._shuffle_block_size
+        last_block = len(block_perm) - 1
+        block_lengths = np.where(
+            block_perm == last_block,
+            self._total_length - last_block * block_size,
+            block_size
+        )
+        offsets = np.concatenate([[0], np.cumsum(block_lengths)])
+        first = np.searchsorted(offsets, start, side='right') - 1
+        last = np.searchsorted(offsets, stop, side='left')
+        indices = (
+            block_perm[first: last].reshape([-1, 1]) * block_size +
+            np.arange(block_size, dtype=block_perm.dtype)
+        ).reshape([-1])
+        if block_perm[first: last].max() == last_block:
+            # the last block is incomplete
+            indices = indices[indices < self._total_length]
+        skip = start - offsets[first]
+        return indices[skip: skip + stop - start]
+
+    def _get_gather_buffers(self):
+        if self._gather_buffers is None:
+            self._gather_buffers = [
+                tuple(
+                    np.empty((self.batch_size,) + a.shape[1:], dtype=a.dtype)
+                    if isinstance(a, np.ndarray) else None
+                    for a in self.the_arrays
+                )
+                for _ in range(self._gather_buffer_count)
+            ]
+        return self._gather_buffers
+
     def _minibatch_iterator(self):
+        resume_cursor = self._resume_cursor or 0
+        self._resume_cursor = None
+        self._epoch_random_state = self._random_state.get_state()
+
         # shuffle the source arrays if necessary
         if self.is_shuffled:
-            if self._indices_buffer is None:
-                t = np.int32 if self._data_length < (1 << 31) else np.int64
-                self._indices_buffer = np.arange(self._data_length, dtype=t)
-            self._random_state.shuffle(self._indices_buffer)
+            self._shuffle_indices()
+
+            if self._gather_buffer_count is None:
+                def get_slice(s):
+                    return tuple(
+                        _make_readonly(a[self._indices_buffer[s]])
+                        for a in self.the_arrays
+                    )
+            else:
+                gather_buffers = self._get_gather_buffers()
+
+                def gather(a, indices, buf):
+                    if buf is None:
+                        return _make_readonly(a[indices])
+                    out = buf[:len(indices)]
+                    np.take(a, indices, axis=0, out=out, mode='clip')
+                    return _make_readonly(out)
+
+                def get_slice(s):
+                    indices = self._indices_buffer[s]
+                    # do not restart from the first buffer at each epoch,
+                    # which may still be held by the consumer
+                    buffers = gather_buffers[self._gather_buffer_cursor]
+                    self._gather_buffer_cursor = \
+                        (self._gather_buffer_cursor + 1) % len(gather_buffers)
+                    return tuple(
+                        gather(a, indices, buf)
+                        for a, buf in zip(self.the_arrays, buffers)
+                    )
+        elif len(self._shard_positions()) > 1:
+            # the padded shard wraps around the end of the arrays
+            indices = np.concatenate([
+                np.arange(a, b) for a, b in self._shard_positions()])
 
             def get_slice(s):
-                return tuple(
-                    _make_readonly(a[self._indices_buffer[s]])
-                    for a in self.the_arrays
-                )
+                return tuple(_make_readonly(a[indices[s]])
+                             for a in self.the_arrays)
         else:
+            offset = self._shard_start
+
             def get_slice(s):
+                if offset:
+                    s = slice(s.start + offset, s.stop + offset)
                 return tuple(_make_readonly(a[s]) for a in self.the_arrays)
 
-        # now iterator through the mini-batches
-        for batch_s in minibatch_slices_iterator(
-                length=self.data_length,
-                batch_size=self.batch_size,
-                skip_incomplete=self.skip_incomplete):
-            yield get_slice(batch_s)
+        # now iterator through the mini-batches, skipping the mini-batches
+        # which have been yielded before the state was saved
+        slices = minibatch_slices_iterator(
+            length=self.data_length,
+            batch_size=self.batch_size,
+            skip_incomplete=self.skip_incomplete
+        )
+        if resume_cursor:
+            slices = islice(slices, resume_cursor, None)
+
+        self._batch_cursor = resume_cursor
+        try:
+            for batch_s in slices:
+                self._batch_cursor += 1
+                yield get_slice(batch_s)
+        finally:
+            self._batch_cursor = None
+            self._epoch_random_state = None
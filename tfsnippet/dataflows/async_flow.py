@@ -0,0 +1,218 @@
+import threading
+
+from .base import DataFlow
+
+__all__ = ['AsyncPrefetchFlow']
+
+_POLL_INTERVAL = 0.05  # interval to check the stopping flag in producer
+
+
+class _ProducerError(object):
+    """Wraps an error raised by the source flow in the producer."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def _put_batch(queue, loop, stop_event, item):
+    """
+    Put `item` into the asyncio `queue` from the producer thread.
+
+    Returns:
+        bool: :obj:`True` if `item` has been put, :obj:`False` if the
+            consumer has been stopped, or the event loop has been closed.
+    """
+    import asyncio
+    from concurrent.futures import CancelledError, TimeoutError
+
+    try:
+        future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+    except RuntimeError:  # pragma: no cover
+        return False  # the event loop has been closed
+
+    while True:
+        try:
+            future.result(timeout=_POLL_INTERVAL)
+            return True
+        except TimeoutError:
+            if stop_event.is_set():
+                future.cancel()
+                return False
+        except CancelledError:  # pragma: no cover
+            return False
+
+
+def _produce_batches(flow, queue, loop, stop_event):
+    """Iterate through `flow` in the producer thread."""
+    iterator = iter(flow)
+    try:
+        while not stop_event.is_set():
+            try:
+                batch = next(iterator)
+            except StopIteration:
+                _put_batch(queue, loop, stop_event, _AsyncBatchIterator.END)
+                break
+            if not _put_batch(queue, loop, stop_event, batch):
+                break
+    except Exception as ex:
+        _put_batch(queue, loop, stop_event, _ProducerError(ex))
+    finally:
+        iterator.close()
+
+
+class _AsyncBatchIterator(object):
+    """
+    Asynchronous iterator of the mini-batches from a :class:`DataFlow`,
+    which runs the blocking iteration of the flow in an executor, and hands
+    over the mini-batches through an :class:`asyncio.Queue`.
+    """
+
+    END = object()
+    """Object to mark the ending position of the mini-batches."""
+
+    def __init__(self, flow, prefetch, executor=None):
+        import asyncio
+        self._flow = flow
+        self._executor = executor
+        self._loop = asyncio.get_event_loop()
+        self._queue = asyncio.Queue(maxsize=prefetch)
+        self._stop_event = threading.Event()
+        self._producer = None  # the future of the producer
+        self._exhausted = False
+
+    def __del__(self):
+        # the producer does not reference this object, so that the consumer
+        # leaving the loop can stop the producer by garbage collecting this
+        self._stop_event.set()
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        result = self._loop.create_future()
+        if self._exhausted:
+            result.set_exception(StopAsyncIteration())
+            return result
+
+        if self._producer is None:
+            self._producer = self._loop.run_in_executor(
+                self._executor, _produce_batches, self._flow, self._queue,
+                self._loop, self._stop_event
+            )
+
+        get_future = self._loop.create_task(self._queue.get())
+
+        def on_get_done(f):
+            if result.cancelled():
+                return
+            if f.cancelled():
+                result.cancel()
+            elif f.exception() is not None:  # pragma: no cover
+                result.set_exception(f.exception())
+            else:
+                item = f.result()
+                if item is self.END:
+                    self._exhausted = True
+                    result.set_exception(StopAsyncIteration())
+                elif isinstance(item, _ProducerError):
+                    self._exhausted = True
+                    result.set_exception(item.error)
+                else:
+                    result.set_result(item)
+
+        def on_result_done(r):
+            if r.cancelled():
+                get_future.cancel()
+
+        get_future.add_done_callback(on_get_done)
+        result.add_done_callback(on_result_done)
+        return result
+
+    def aclose(self):
+        """
+        Stop the producer, discarding all prefetched mini-batches.
+
+        Returns:
+            asyncio.Future: Awaitable for waiting the producer to exit.
+        """
+        self._stop_event.set()
+        self._exhausted = True
+        if self._producer is None:
+            future = self._loop.create_future()
+            future.set_result(None)
+            return future
+        return self._producer
+
+
+class AsyncPrefetchFlow(DataFlow):
+    """
+    Data flow to prefetch from the source data flow in an executor, which
+    can be consumed by coroutines in an :mod:`asyncio` event loop.
+
+    Usage::
+
+        array_flow = DataFlow.arrays([x], batch_size=256)
+        async_flow = array_flow.async_prefetch(prefetch=5)
+
+        async def evaluate():
+            loop = asyncio.get_event_loop()
+            async for [batch_x] in async_flow:
+                # run the blocking computation in the executor as well
+                await loop.run_in_executor(
+                    None, session.run, outputs, {input_x: batch_x})
+
+    The blocking iteration of the source flow is run in `executor`, while
+    the mini-batches are handed over to the coroutine through an
+    :class:`asyncio.Queue`, such that the event loop can run other
+    coroutines when waiting for the mini-batches.  If the coroutine leaves
+    the ``async for`` loop early, the executor will be released as soon
+    as the asynchronous iterator is garbage collected, or after
+    ``await iterator.aclose()`` is called.
+
+    This flow can also be iterated synchronously, which simply iterates
+    through the source flow.  Asynchronous iteration requires Python 3.5.2
+    or higher.
+    """
+
+    def __init__(self, source, prefetch, executor=None):
+        """
+        Construct an :class:`AsyncPrefetchFlow`.
+
+        Args:
+            source (DataFlow): The source data flow.
+            prefetch (int): Number of mini-batches to prefetch ahead.
+                It should be at least 1.
+            executor (concurrent.futures.Executor): The executor to run
+                the source flow.  (default :obj:`None`, the default executor
+                of the event loop)
+        """
+        if prefetch < 1:
+            raise ValueError('`prefetch` must be at least 1')
+        self._source = source
+        self._prefetch_num = prefetch
+        self._executor = executor
+
+    @property
+    def source(self):
+        """Get the source data flow."""
+        return self._source
+
+    @property
+    def prefetch_num(self):
+        """Get the number of batches to prefetch."""
+        return self._prefetch_num
+
+    @property
+    def executor(self):
+        """Get the executor to run the source flow."""
+        return self._executor
+
+    def _minibatch_iterator(self):
+        for batch in self._source:
+            yield batch
+
+    def __aiter__(self):
+        return _AsyncBatchIterator(
+            self._source, prefetch=self._prefetch_num,
+            executor=self._executor
+        )
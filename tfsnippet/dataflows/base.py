@@ -1,5 +1,9 @@
+import os
+
 import numpy as np
 
+from tfsnippet.utils import ArrayCollector, CheckpointSavableObject, makedirs
+
 __all__ = ['DataFlow', 'ExtraInfoDataFlow']
 
 
@@ -26,6 +30,8 @@ class DataFlow(object):
     _is_iter_entered = False
     _implicit_iterator = None  # tracking the iterator for :meth:`next_batch()`
     _current_batch = None  # tracking the result of last :meth:`next_batch()`
+    _profiler = None  # the :class:`DataFlowProfiler` attached to this flow
+    _profile_stage = None  # the stage name of this flow in the profiler
 
     def _minibatch_iterator(self):
         """
@@ -38,6 +44,36 @@ class DataFlow(object):
         """
         raise NotImplementedError()
 
+    def __aiter__(self):
+        """
+        Iterate through the mini-batches asynchronously.  Not reentrant.
+
+        The blocking iteration of this flow is run in the default executor
+        of the event loop, with one mini-batch prefetched ahead.
+        Use :meth:`async_prefetch` to specify the number of mini-batches
+        to prefetch, and the executor.  For example::
+
+            async for batch_x, batch_y in flow:
+                ...
+
+        Requires Python 3.5.2 or higher.
+
+        Returns:
+            The asynchronous iterator of the mini-batches.
+        """
+        from .async_flow import _AsyncBatchIterator
+        return _AsyncBatchIterator(self, prefetch=1)
+
+    def _get_queue_fill(self):
+        """
+        Get the fraction of the prefetch queue being filled, for profiling.
+        Subclasses with a prefetch queue should override this.
+
+        Returns:
+            float or None: The fraction, or :obj:`None` if not available.
+        """
+        return None
+
     def __iter__(self):
         """
         Iterate through the mini-batches.  Not reentrant.
@@ -60,40 +96,69 @@ class DataFlow(object):
                                format(self.__class__.__name__))
         self._is_iter_entered = True
         try:
-            for b in self._minibatch_iterator():
+            iterator = self._minibatch_iterator()
+            if self._profiler is not None:
+                iterator = self._profiler._profiled_iterator(self, iterator)
+            for b in iterator:
                 yield b
         finally:
             self._is_iter_entered = False
 
-    def get_arrays(self):
+    def get_arrays(self, memmap_dir=None):
         """
         Iterate through the data-flow, collecting mini-batches into arrays.
 
+        The mini-batches are copied into pre-allocated arrays, instead of
+        being concatenated at last, thus the peak memory usage is about the
+        size of the collected arrays.  If this data-flow is an
+        :class:`ExtraInfoDataFlow`, the arrays will be allocated only once,
+        according to its data length.  Otherwise the arrays will be grown
+        geometrically.
+
+        Args:
+            memmap_dir (str): If specified, collect the arrays into raw
+                :class:`np.memmap` files under this directory (named as
+                ``array_0.dat``, ``array_1.dat``, etc.), instead of the
+                memory.  (default :obj:`None`)
+
         Returns:
             tuple[np.ndarray]: The collected arrays.
 
         Raises:
             ValueError: If this data-flow is empty.
         """
-        arrays_buf = []
-        it = iter(self)
-        try:
-            batch = next(it)
-        except StopIteration:
+        capacity = None
+        if isinstance(self, ExtraInfoDataFlow):
+            capacity = self.data_length
+            if self.skip_incomplete:
+                capacity = capacity // self.batch_size * self.batch_size
+        if memmap_dir is not None:
+            makedirs(memmap_dir, exist_ok=True)
+
+        collectors = None
+        for batch in self:
+            if collectors is None:
+                collectors = [
+                    ArrayCollector(
+                        capacity=capacity,
+                        memmap_path=(
+                            None if memmap_dir is None else
+                            os.path.join(memmap_dir, 'array_{}.dat'.format(i))
+                        )
+                    )
+                    for i in range(len(batch))
+                ]
+            for collector, arr in zip(collectors, batch):
+                collector.append(arr)
+
+        if collectors is None:
             raise ValueError('{!r} is empty, cannot convert to arrays'.
                              format(self))
-        try:
-            arrays_buf = [[arr] for arr in batch]
-            while True:
-                batch = next(it)
-                for i, arr in enumerate(batch):
-                    arrays_buf[i].append(arr)
-        except StopIteration:
-            pass
-        return tuple(np.concatenate(arr) for arr in arrays_buf)
+        return tuple(collector.to_array() for collector in collectors)
 
     def to_arrays_flow(self, batch_size, shuffle=False,
-                       skip_incomplete=False, random_state=None):
+                       skip_incomplete=False, random_state=None,
+                       memmap_dir=None):
         """
         Convert this data-flow to a :class:`~tfsnippet.dataflows.ArrayFlow`.
 
@@ -109,15 +174,42 @@ class DataFlow(object):
             random_state (RandomState): Optional numpy RandomState for
                 shuffling data before each epoch.  (default :obj:`None`,
                 construct a new :class:`RandomState`).
+            memmap_dir (str): If specified, collect the arrays into raw
+                :class:`np.memmap` files under this directory, instead of
+                the memory.  See :meth:`get_arrays`.  (default :obj:`None`)
 
         Returns:
             tfsnippet.dataflow.ArrayFlow: The constructed ArrayFlow.
         """
         from .array_flow import ArrayFlow
-        return ArrayFlow(self.get_arrays(), batch_size=batch_size,
-                         shuffle=shuffle, skip_incomplete=skip_incomplete,
+        return ArrayFlow(self.get_arrays(memmap_dir=memmap_dir),
+                         batch_size=batch_size, shuffle=shuffle,
+                         skip_incomplete=skip_incomplete,
                          random_state=random_state)
 
+    def write_shards(self, path, shard_size):
+        """
+        Iterate through the data-flow, writing mini-batches into a sharded
+        on-disk dataset, which can be read by
+        :class:`~tfsnippet.dataflows.ShardedFlow`.
+
+        Unlike :meth:`get_arrays`, only one shard of data will be kept in
+        memory at the same time.
+
+        Args:
+            path (str): The directory where to save the shards.
+            shard_size (int): The number of items in each shard.
+
+        Raises:
+            ValueError: If this data-flow is empty.
+            IOError: If a sharded dataset already exists at `path`.
+        """
+        from .sharded_flow import ShardWriter
+        writer = ShardWriter(path, shard_size=shard_size)
+        with writer:
+            for batch in self:
+                writer.write(batch)
+
     @property
     def current_batch(self):
         """
@@ -154,7 +246,7 @@ class DataFlow(object):
             raise
 
     # -------- here starts the transforming methods --------
-    def map(self, mapper, array_indices=None):
+    def map(self, mapper, array_indices=None, workers=None, ordered=True):
         """
         Construct a :class:`~tfsnippet.dataflows.MapperFlow`.
 
@@ -171,12 +263,21 @@ class DataFlow(object):
 
                 If not specified, apply the mapper on all arrays, and do
                 not require the number of output arrays to match the inputs.
+            workers (int): If specified, apply the mapper on this number of
+                threads, which are kept until the returned flow is closed.
+                The mapper must be thread-safe in this case.
+                (default :obj:`None`, apply the mapper in the iterating
+                thread, one mini-batch at a time)
+            ordered (bool): Whether or not to yield the mapped mini-batches
+                in the same order as this flow, if `workers` is specified?
+                (default :obj:`True`)
 
         Returns:
             tfsnippet.dataflow.MapperFlow: The data flow with `mapper` applied.
         """
         from .mapper_flow import MapperFlow
-        return MapperFlow(self, mapper, array_indices=array_indices)
+        return MapperFlow(self, mapper, array_indices=array_indices,
+                          workers=workers, ordered=ordered)
 
     def threaded(self, prefetch):
         """
@@ -193,6 +294,151 @@ class DataFlow(object):
         from .threading_flow import ThreadingFlow
         return ThreadingFlow(self, prefetch=prefetch)
 
+    def async_prefetch(self, prefetch, executor=None):
+        """
+        Construct a :class:`~tfsnippet.dataflows.AsyncPrefetchFlow` from this
+        flow.
+
+        Args:
+            prefetch (int): Number of mini-batches to prefetch ahead.
+                It should be at least 1.
+            executor (concurrent.futures.Executor): The executor to run
+                this flow.  (default :obj:`None`, the default executor
+                of the event loop)
+
+        Returns:
+            tfsnippet.dataflows.AsyncPrefetchFlow: The data flow to prefetch
+                mini-batches from this flow, for asynchronous iteration.
+        """
+        from .async_flow import AsyncPrefetchFlow
+        return AsyncPrefetchFlow(self, prefetch=prefetch, executor=executor)
+
+    def multiprocess(self, prefetch, workers=None, shared_memory=False,
+                     data_shapes=None, data_dtypes=None):
+        """
+        Construct a :class:`~tfsnippet.dataflows.MultiprocessFlow` from this
+        flow.
+
+        Args:
+            prefetch (int): Number of mini-batches to prefetch ahead.
+                It should be at least 1.
+            workers (int): Number of worker processes to execute the mappers.
+                It should be at least 1.  (default :obj:`None`, the number
+                of CPU cores)
+            shared_memory (bool): Whether or not to transport the mapped
+                mini-batches through shared memory?  (default :obj:`False`)
+            data_shapes (tuple[tuple[int]]): The shapes of data in a mapped
+                mini-batch, excluding the batch dimension.  Only used if
+                `shared_memory` is :obj:`True`.  (default :obj:`None`, the
+                `data_shapes` of the source of the mappers)
+            data_dtypes (tuple[np.dtype]): The dtypes of data in a mapped
+                mini-batch.  Only used if `shared_memory` is :obj:`True`.
+                (default :obj:`None`, the `data_dtypes` of the source of
+                the mappers)
+
+        Returns:
+            tfsnippet.dataflow.MultiprocessFlow: The background data flow
+                to prefetch mini-batches from this flow, with the mappers
+                executed in worker processes.
+        """
+        from .multiprocess_flow import MultiprocessFlow
+        return MultiprocessFlow(
+            self, prefetch=prefetch, workers=workers,
+            shared_memory=shared_memory, data_shapes=data_shapes,
+            data_dtypes=data_dtypes
+        )
+
+    def shuffle_buffer(self, buffer_size, batch_size, skip_incomplete=False,
+                       random_state=None):
+        """
+        Construct a :class:`~tfsnippet.dataflows.ShuffleBufferFlow`, which
+        approximately shuffles and re-batches the samples of this flow,
+        through a fixed-size shuffling buffer.
+
+        Args:
+            buffer_size (int): The number of samples in the shuffling
+                buffer.  It should be at least `batch_size`.
+            batch_size (int): Size of each mini-batch.
+            skip_incomplete (bool): Whether or not to exclude the last
+                mini-batch if it is incomplete? (default :obj:`False`)
+            random_state (RandomState): Optional numpy RandomState for
+                shuffling data.  (default :obj:`None`, construct a new
+                :class:`RandomState`).
+
+        Returns:
+            tfsnippet.dataflow.ShuffleBufferFlow: The shuffled data flow.
+        """
+        from .shuffle_buffer_flow import ShuffleBufferFlow
+        return ShuffleBufferFlow(
+            self, buffer_size=buffer_size, batch_size=batch_size,
+            skip_incomplete=skip_incomplete, random_state=random_state
+        )
+
+    def rebatch(self, batch_size, skip_incomplete=False):
+        """
+        Construct a :class:`~tfsnippet.dataflows.RebatchFlow`, which splits
+        and merges the mini-batches of this flow into a new `batch_size`.
+
+        Args:
+            batch_size (int): Size of each mini-batch.
+            skip_incomplete (bool): Whether or not to exclude the last
+                mini-batch if it is incomplete? (default :obj:`False`)
+
+        Returns:
+            tfsnippet.dataflow.RebatchFlow: The re-batched data flow.
+        """
+        from .rebatch_flow import RebatchFlow
+        return RebatchFlow(self, batch_size=batch_size,
+                           skip_incomplete=skip_incomplete)
+
+    def bucket_by(self, key_fn, bucket_boundaries, batch_size,
+                  skip_incomplete=False):
+        """
+        Construct a :class:`~tfsnippet.dataflows.BucketFlow`, which groups
+        the samples of this flow into mini-batches of samples with similar
+        keys (e.g., the sequence lengths).
+
+        Args:
+            key_fn ((\\*np.ndarray) -> np.ndarray): Function which receives
+                the arrays of a mini-batch, and returns the 1-d array of
+                keys for the samples.
+            bucket_boundaries (Iterable[int or float]): The increasing
+                boundaries of the buckets.
+            batch_size (int or Iterable[int]): Size of each mini-batch, or
+                the mini-batch size for each bucket.
+            skip_incomplete (bool): Whether or not to exclude the last
+                incomplete mini-batch of each bucket? (default :obj:`False`)
+
+        Returns:
+            tfsnippet.dataflow.BucketFlow: The bucketed data flow.
+        """
+        from .rebatch_flow import BucketFlow
+        return BucketFlow(self, key_fn=key_fn,
+                          bucket_boundaries=bucket_boundaries,
+                          batch_size=batch_size,
+                          skip_incomplete=skip_incomplete)
+
+    def cache(self, max_bytes=None, spill_dir=None, force=False):
+        """
+        Construct a :class:`~tfsnippet.dataflows.CacheFlow`, which
+        memorizes the mini-batches of this flow during the first epoch,
+        and replays them in the following epochs.
+
+        Args:
+            max_bytes (int): The maximum number of bytes of the mini-batches
+                to be cached in memory.  (default :obj:`None`, no limit)
+            spill_dir (str): The directory where to spill the mini-batches
+                exceeding `max_bytes`.  (default :obj:`None`)
+            force (bool): Whether or not to cache the mini-batches even if
+                this flow is stochastic?  (default :obj:`False`)
+
+        Returns:
+            tfsnippet.dataflow.CacheFlow: The cached data flow.
+        """
+        from .cache_flow import CacheFlow
+        return CacheFlow(self, max_bytes=max_bytes, spill_dir=spill_dir,
+                         force=force)
+
     def select(self, indices):
         """
         Construct a :class:`DataFlow`, which selects and rearranges arrays
@@ -212,7 +458,7 @@ class DataFlow(object):
 
     # -------- here starts the factory methods for data flows --------
     @staticmethod
-    def gather(flows):
+    def gather(flows, prefetch=None, on_mismatch='ignore'):
         """
         Gather multiple data flows into a single flow.
 
@@ -220,6 +466,12 @@ class DataFlow(object):
             flows(Iterable[DataFlow]): The data flows to gather.
                 At least one data flow should be specified, otherwise a
                 :class:`ValueError` will be raised.
+            prefetch (None or int): If specified, iterate each of the flows
+                in a background thread, with this number of mini-batches
+                to prefetch ahead.  (default :obj:`None`)
+            on_mismatch (str): The action for mismatched mini-batches,
+                one of "ignore", "raise" and "truncate".
+                (default "ignore")
 
         Returns:
             tfsnippet.dataflow.GatherFlow: The gathered data flow.
@@ -229,11 +481,13 @@ class DataFlow(object):
             TypeError: If a specified flow is not a :class:`DataFlow`.
         """
         from .gather_flow import GatherFlow
-        return GatherFlow(tuple(flows))
+        return GatherFlow(tuple(flows), prefetch=prefetch,
+                          on_mismatch=on_mismatch)
 
     @staticmethod
     def seq(start, stop, step=1, batch_size=None, shuffle=False,
-            skip_incomplete=False, dtype=np.int32, random_state=None):
+            skip_incomplete=False, dtype=np.int32, random_state=None,
+            num_shards=None, shard_index=None, pad_shards=False):
         """
         Construct a :class:`~tfsnippet.dataflows.SeqFlow`.
 
@@ -250,6 +504,15 @@ class DataFlow(object):
             random_state (RandomState): Optional numpy RandomState for
                 shuffling data before each epoch.  (default :obj:`None`,
                 construct a new :class:`RandomState`).
+            num_shards (int): If specified, split each epoch into this number
+                of disjoint shards, and iterate through only one of them.
+                (default :obj:`None`, iterate through all the data)
+            shard_index (int): The index of the shard to iterate through,
+                required if `num_shards` is specified.
+            pad_shards (bool): Whether or not to pad the shards with the
+                items from the beginning of the epoch, instead of dropping
+                the remaining items, such that every shard gets the same
+                number of items?  (default :obj:`False`)
 
         Returns:
             tfsnippet.dataflow.SeqFlow: The data flow from number sequence.
@@ -258,12 +521,15 @@ class DataFlow(object):
         return SeqFlow(
             start=start, stop=stop, step=step, batch_size=batch_size,
             shuffle=shuffle, skip_incomplete=skip_incomplete, dtype=dtype,
-            random_state=random_state
+            random_state=random_state, num_shards=num_shards,
+            shard_index=shard_index, pad_shards=pad_shards
         )
 
     @staticmethod
     def arrays(arrays, batch_size, shuffle=False, skip_incomplete=False,
-               random_state=None):
+               random_state=None, gather_buffers=None,
+               shuffle_block_size=None, num_shards=None, shard_index=None,
+               pad_shards=False):
         """
         Construct an :class:`~tfsnippet.dataflows.ArrayFlow`.
 
@@ -279,6 +545,23 @@ class DataFlow(object):
             random_state (RandomState): Optional numpy RandomState for
                 shuffling data before each epoch.  (default :obj:`None`,
                 construct a new :class:`RandomState`).
+            gather_buffers (int): If specified, gather the shuffled
+                mini-batches into this number of pre-allocated buffers in
+                turn.  (default :obj:`None`, allocate new arrays for each
+                shuffled mini-batch)
+            shuffle_block_size (int): If specified, shuffle the data by
+                permuting contiguous blocks of this number of items, rather
+                than individual items.  (default :obj:`None`, shuffle
+                individual items)
+            num_shards (int): If specified, split each epoch into this number
+                of disjoint shards, and iterate through only one of them.
+                (default :obj:`None`, iterate through all the data)
+            shard_index (int): The index of the shard to iterate through,
+                required if `num_shards` is specified.
+            pad_shards (bool): Whether or not to pad the shards with the
+                items from the beginning of the epoch, instead of dropping
+                the remaining items, such that every shard gets the same
+                number of items?  (default :obj:`False`)
 
         Returns:
             tfsnippet.dataflow.ArrayFlow: The data flow from arrays.
@@ -286,7 +569,123 @@ class DataFlow(object):
         from .array_flow import ArrayFlow
         return ArrayFlow(
             arrays=arrays, batch_size=batch_size, shuffle=shuffle,
-            skip_incomplete=skip_incomplete, random_state=random_state
+            skip_incomplete=skip_incomplete, random_state=random_state,
+            gather_buffers=gather_buffers,
+            shuffle_block_size=shuffle_block_size, num_shards=num_shards,
+            shard_index=shard_index, pad_shards=pad_shards
+        )
+
+    @staticmethod
+    def memmap(arrays, batch_size, shuffle=False, skip_incomplete=False,
+               random_state=None, mmap_mode='r', gather_buffers=None,
+               shuffle_block_size=None):
+        """
+        Construct a :class:`~tfsnippet.dataflows.MemmapFlow`.
+
+        Args:
+            arrays: List of ``.npy`` file paths, or memory-mapped arrays
+                (e.g., :class:`np.memmap` for raw binary files).  These
+                arrays should be at least 1-d, with identical first dimension.
+            batch_size (int): Size of each mini-batch.
+            shuffle (bool): Whether or not to shuffle data before iterating?
+                (default :obj:`False`)
+            skip_incomplete (bool): Whether or not to exclude the last
+                mini-batch if it is incomplete? (default :obj:`False`)
+            random_state (RandomState): Optional numpy RandomState for
+                shuffling data before each epoch.  (default :obj:`None`,
+                construct a new :class:`RandomState`).
+            mmap_mode (str): The mode to open the ``.npy`` files.
+                (default "r")
+            gather_buffers (int): If specified, gather the shuffled
+                mini-batches into this number of pre-allocated buffers in
+                turn.  (default :obj:`None`, allocate new arrays for each
+                shuffled mini-batch)
+            shuffle_block_size (int): If specified, shuffle the data by
+                permuting contiguous blocks of this number of items, rather
+                than individual items.  (default :obj:`None`, shuffle
+                individual items)
+
+        Returns:
+            tfsnippet.dataflow.MemmapFlow: The data flow from memory-mapped
+                arrays.
+        """
+        from .memmap_flow import MemmapFlow
+        return MemmapFlow(
+            arrays=arrays, batch_size=batch_size, shuffle=shuffle,
+            skip_incomplete=skip_incomplete, random_state=random_state,
+            mmap_mode=mmap_mode, gather_buffers=gather_buffers,
+            shuffle_block_size=shuffle_block_size
+        )
+
+    @staticmethod
+    def shards(path, batch_size, shuffle=False, skip_incomplete=False,
+               random_state=None, shuffle_shards=1):
+        """
+        Construct a :class:`~tfsnippet.dataflows.ShardedFlow`.
+
+        Args:
+            path (str): The directory of the sharded dataset, written by
+                :meth:`write_shards` or :class:`ShardWriter`.
+            batch_size (int): Size of each mini-batch.
+            shuffle (bool): Whether or not to shuffle data before iterating?
+                (default :obj:`False`)
+            skip_incomplete (bool): Whether or not to exclude the last
+                mini-batch if it is incomplete? (default :obj:`False`)
+            random_state (RandomState): Optional numpy RandomState for
+                shuffling data before each epoch.  (default :obj:`None`,
+                construct a new :class:`RandomState`).
+            shuffle_shards (int): The number of shards to be loaded into
+                the shuffling buffer at the same time.  (default 1)
+
+        Returns:
+            tfsnippet.dataflow.ShardedFlow: The data flow from the sharded
+                dataset.
+        """
+        from .sharded_flow import ShardedFlow
+        return ShardedFlow(
+            path, batch_size=batch_size, shuffle=shuffle,
+            skip_incomplete=skip_incomplete, random_state=random_state,
+            shuffle_shards=shuffle_shards
+        )
+
+    @staticmethod
+    def weighted(arrays, weights, batch_size, replacement=True,
+                 epoch_size=None, stratify_by=None, skip_incomplete=False,
+                 random_state=None):
+        """
+        Construct a :class:`~tfsnippet.dataflows.WeightedFlow`.
+
+        Args:
+            arrays: List of numpy-like arrays, to be sampled through
+                mini-batches.  These arrays should be at least 1-d,
+                with identical first dimension.
+            weights: The 1-d non-negative sampling weights of the items.
+                If :obj:`None`, the items are weighted uniformly.
+            batch_size (int): Size of each mini-batch.
+            replacement (bool): Whether or not to sample with replacement?
+                (default :obj:`True`)
+            epoch_size (int): The number of items to sample in each epoch.
+                (default :obj:`None`, the number of items if `replacement`
+                is :obj:`True`, or the number of items with positive weights
+                if `replacement` is :obj:`False`)
+            stratify_by: If specified, the 1-d integer labels of the items.
+                Each mini-batch will contain the same number of items of
+                each label.  Requires `replacement` to be :obj:`True`.
+            skip_incomplete (bool): Whether or not to exclude the last
+                mini-batch if it is incomplete? (default :obj:`False`)
+            random_state (RandomState): Optional numpy RandomState for
+                sampling.  (default :obj:`None`, construct a new
+                :class:`RandomState`).
+
+        Returns:
+            tfsnippet.dataflow.WeightedFlow: The weighted data flow.
+        """
+        from .weighted_flow import WeightedFlow
+        return WeightedFlow(
+            arrays=arrays, weights=weights, batch_size=batch_size,
+            replacement=replacement, epoch_size=epoch_size,
+            stratify_by=stratify_by, skip_incomplete=skip_incomplete,
+            random_state=random_state
         )
 
     @staticmethod
@@ -312,7 +711,7 @@ class ExtraInfoDataFlow(DataFlow):
     """
 
     def __init__(self, array_count, data_length, data_shapes, batch_size,
-                 skip_incomplete, is_shuffled):
+                 skip_incomplete, is_shuffled, data_dtypes=None):
         """
         Construct an :class:`ExtraInfoDataFlow`.
 
@@ -326,6 +725,8 @@ class ExtraInfoDataFlow(DataFlow):
                 mini-batch if it is incomplete?
             is_shuffled (bool): Whether or not the data are first shuffled
                 before iterated through mini-batches?
+            data_dtypes (tuple[np.dtype]): The dtypes of data in a
+                mini-batch.  (default :obj:`None`, unknown)
         """
         self._array_count = array_count
         self._data_length = data_length
@@ -333,6 +734,7 @@ class ExtraInfoDataFlow(DataFlow):
         self._batch_size = batch_size
         self._skip_incomplete = skip_incomplete
         self._is_shuffled = is_shuffled
+        self._data_dtypes = data_dtypes
 
     @property
     def array_count(self):
@@ -365,6 +767,17 @@ class ExtraInfoDataFlow(DataFlow):
         """
         return self._data_shapes
 
+    @property
+    def data_dtypes(self):
+        """
+        Get the dtypes of the data in each mini-batch.
+
+        Returns:
+            tuple[np.dtype] or None: The dtypes of data in a mini-batch,
+                or :obj:`None` if unknown.
+        """
+        return self._data_dtypes
+
     @property
     def batch_size(self):
         """
@@ -389,3 +802,35 @@ class ExtraInfoDataFlow(DataFlow):
         mini-batches?
         """
         return self._is_shuffled
+
+
+def _is_state_supported(flow):
+    """
+    Check whether or not the iteration state of `flow` can be saved and
+    restored.  A flow wrapping other flows may declare it by the private
+    property ``_state_supported``.
+    """
+    return isinstance(flow, CheckpointSavableObject) and \
+        getattr(flow, '_state_supported', True)
+
+
+def _get_flow_state(flow):
+    """Get the iteration state of a source `flow`."""
+    if not _is_state_supported(flow):
+        raise TypeError('The source flow does not support saving the '
+                        'iteration state: {!r}'.format(flow))
+    return flow.get_state()
+
+
+def _set_flow_state(flow, state):
+    """
+    Restore the iteration state of a one-to-one mapped source `flow`, from
+    the state of the wrapping flow.  The source flow will skip the same
+    number of mini-batches as the wrapping flow.
+    """
+    if not _is_state_supported(flow):
+        raise TypeError('The source flow does not support restoring the '
+                        'iteration state: {!r}'.format(flow))
+    source_state = dict(state['source'])
+    source_state['batch_cursor'] = state['batch_cursor']
+    flow.set_state(source_state)
@@ -0,0 +1,201 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from tfsnippet.utils import makedirs
+from .base import DataFlow, ExtraInfoDataFlow
+from .mapper_flow import MapperFlow
+
+__all__ = ['CacheFlow']
+
+
+def _is_stochastic_flow(flow):
+    """
+    Check whether or not the mini-batches of `flow` might differ from epoch
+    to epoch, by inspecting the whole chain of its source flows.
+    """
+    from tfsnippet.preprocessing import BaseSampler
+    from .shuffle_buffer_flow import ShuffleBufferFlow
+
+    stack = [flow]
+    while stack:
+        flow = stack.pop()
+        if isinstance(flow, CacheFlow):
+            # an enabled cache always replays the same mini-batches
+            if flow.cache_enabled:
+                continue
+            return True
+        if isinstance(flow, ExtraInfoDataFlow) and flow.is_shuffled:
+            return True
+        if isinstance(flow, ShuffleBufferFlow):
+            return True
+        if isinstance(flow, MapperFlow):
+            if isinstance(flow.mapper, BaseSampler):
+                return True
+            if flow.workers is not None and not flow.ordered:
+                return True
+        stack.extend(getattr(flow, 'flows', ()))
+        source = getattr(flow, 'source', None)
+        if source is not None:
+            stack.append(source)
+    return False
+
+
+class CacheFlow(DataFlow):
+    """
+    Data flow which memorizes the mini-batches of its source flow during
+    the first epoch, and replays them in the following epochs.
+
+    This is useful for expensive deterministic mapper chains (e.g.,
+    decoding followed by normalization).  The cached mini-batches are kept
+    in memory up to `max_bytes`, and the remaining ones are spilled to
+    ``.npy`` files under `spill_dir`.  Since the mini-batches are replayed
+    in exactly the same order, the first cached mini-batches are kept in
+    memory, rather than evicting them by any replacement policy.
+
+    Usage::
+
+        flow = DataFlow.arrays([x], batch_size=256). \\
+            map(decode).map(normalize). \\
+            cache(max_bytes=2 ** 30, spill_dir='/tmp/cache')
+
+    Caching is disabled if the source flow is stochastic, i.e., if any
+    flow in the source chain shuffles its data, or maps its data by a
+    :class:`~tfsnippet.preprocessing.BaseSampler`, unless `force` is
+    :obj:`True`.  In this case, this flow just iterates through the source.
+    """
+
+    def __init__(self, source, max_bytes=None, spill_dir=None, force=False):
+        """
+        Construct a :class:`CacheFlow`.
+
+        Args:
+            source (DataFlow): The source data flow.
+            max_bytes (int): The maximum number of bytes of the mini-batches
+                to be cached in memory.  (default :obj:`None`, no limit)
+            spill_dir (str): The directory where to spill the mini-batches
+                exceeding `max_bytes`.  If not specified, the cache will be
+                dropped once its size exceeds `max_bytes`, and the source
+                will be iterated in every epoch.  (default :obj:`None`)
+            force (bool): Whether or not to cache the mini-batches even if
+                the source flow is stochastic?  (default :obj:`False`)
+        """
+        if max_bytes is not None and max_bytes < 0:
+            raise ValueError('`max_bytes` must be non-negative')
+        self._source = source
+        self._max_bytes = max_bytes
+        self._spill_dir = \
+            os.path.abspath(spill_dir) if spill_dir is not None else None
+        self._cache_enabled = force or not _is_stochastic_flow(source)
+
+        # the cached mini-batches, each is either a tuple of arrays, or a
+        # tuple of ``.npy`` file paths if spilled
+        self._batches = None
+        self._in_memory_bytes = 0
+        self._spill_path = None
+        self._cache_dropped = False
+
+    @property
+    def source(self):
+        """Get the source data flow."""
+        return self._source
+
+    @property
+    def max_bytes(self):
+        """Get the maximum number of bytes to be cached in memory."""
+        return self._max_bytes
+
+    @property
+    def spill_dir(self):
+        """Get the directory where to spill the mini-batches."""
+        return self._spill_dir
+
+    @property
+    def cache_enabled(self):
+        """Whether or not the mini-batches of the source will be cached?"""
+        return self._cache_enabled
+
+    @property
+    def is_cached(self):
+        """Whether or not the mini-batches have been cached?"""
+        return self._batches is not None
+
+    @property
+    def in_memory_bytes(self):
+        """Get the number of bytes of the mini-batches cached in memory."""
+        return self._in_memory_bytes
+
+    def clear_cache(self):
+        """Clear the cached mini-batches, and remove the spilled files."""
+        self._batches = None
+        self._in_memory_bytes = 0
+        self._cache_dropped = False
+        if self._spill_path is not None:
+            shutil.rmtree(self._spill_path, ignore_errors=True)
+            self._spill_path = None
+
+    def _spill(self, index, batch):
+        if self._spill_path is None:
+            makedirs(self._spill_dir, exist_ok=True)
+            self._spill_path = tempfile.mkdtemp(
+                prefix='cache-', dir=self._spill_dir)
+        paths = []
+        for i, arr in enumerate(batch):
+            path = os.path.join(
+                self._spill_path, 'batch-{:06d}.{}.npy'.format(index, i))
+            np.save(path, arr)
+            paths.append(path)
+        return tuple(paths)
+
+    def _record_epoch(self):
+        batches = []
+        in_memory_bytes = 0
+        spilled = False
+        try:
+            for batch in self._source:
+                batch = tuple(batch)
+                if batches is not None:
+                    nbytes = sum(np.asarray(a).nbytes for a in batch)
+                    if not spilled and (
+                            self._max_bytes is None or
+                            in_memory_bytes + nbytes <= self._max_bytes):
+                        # copy the arrays, in case that the consumer or the
+                        # source modifies them later
+                        cached = tuple(np.array(a) for a in batch)
+                        for a in cached:
+                            a.setflags(write=False)
+                        batches.append(cached)
+                        in_memory_bytes += nbytes
+                    elif self._spill_dir is not None:
+                        spilled = True
+                        batches.append(self._spill(len(batches), batch))
+                    else:
+                        batches = None
+                        self.clear_cache()
+                yield batch
+        except BaseException:
+            # the epoch is not completed, discard the partial cache
+            self.clear_cache()
+            raise
+
+        if batches is not None:
+            self._batches = batches
+            self._in_memory_bytes = in_memory_bytes
+        else:
+            self._cache_dropped = True
+
+    def _minibatch_iterator(self):
+        if not self._cache_enabled or self._cache_dropped:
+            for batch in self._source:
+                yield batch
+        elif self._batches is None:
+            for batch in self._record_epoch():
+                yield batch
+        else:
+            for batch in self._batches:
+                if isinstance(batch[0], np.ndarray):
+                    yield batch
+                else:
+                    yield tuple(np.load(path) for path in batch)
@@ -53,9 +53,35 @@ class SlidingWindow(DataMapper):
         # or equivalently
         sw_flow = DataFlow.seq(
             0, len(data) - sw.window_size + 1, batch_size=64).map(sw)
+
+    The `i`-th window starts at ``i * stride`` of `data_array`, which may
+    be multi-variate (i.e., with shape ``(length,) + value_shape``).  If
+    `horizon` is positive, the following `horizon` values after each window
+    are also produced as the forecasting targets::
+
+        sw = SlidingWindow(series, window_size=96, stride=4, horizon=24)
+        for windows, targets in sw.as_flow(batch_size=64, shuffle=True):
+            ...
+
+    The windows can be extracted in the following modes:
+
+    *   "strided": using a read-only strided view of all the windows
+        (by ``np.lib.stride_tricks.as_strided``), such that the windows
+        of consecutive indices are returned as a view, without copying.
+        Other indices are taken from the view by one gather.
+    *   "gather": reading each window by contiguous slicing, which works
+        on memory-mapped or numpy-like arrays (e.g., HDF5 datasets).  If the
+        requested windows are densely located, the covering range of data
+        is read at once, and the windows are taken from its strided view.
+    *   "index": fancy-indexing `data_array` by a ``(batch, window)``
+        index matrix.
     """
 
-    def __init__(self, data_array, window_size):
+    MODES = ('strided', 'gather', 'index')
+    """The supported window extraction modes."""
+
+    def __init__(self, data_array, window_size, stride=1, horizon=0,
+                 mode=None):
         """
         Construct a :class:`SlidingWindow`.
 
@@ -63,11 +89,41 @@ class SlidingWindow(DataMapper):
             data_array (np.ndarray): The array from which to extract
                 sliding windows.
             window_size (int): Size of each window.
+            stride (int): The distance between the beginnings of two
+                adjacent windows.  (default 1)
+            horizon (int): The number of values after each window to be
+                produced as the targets.  (default 0, no targets)
+            mode (str): The window extraction mode, one of
+                :attr:`MODES`.  (default :obj:`None`, use "strided" for
+                numpy arrays not memory-mapped, and "gather" for others)
         """
+        if window_size < 1:
+            raise ValueError('`window_size` must be at least 1')
+        if stride < 1:
+            raise ValueError('`stride` must be at least 1')
+        if horizon < 0:
+            raise ValueError('`horizon` must be non-negative')
+        if mode is None:
+            mode = 'strided' if type(data_array) is np.ndarray else 'gather'
+        if mode not in self.MODES:
+            raise ValueError('`mode` must be one of {!r}: got {!r}'.
+                             format(self.MODES, mode))
+
         self._data_array = data_array
         self._window_size = window_size
+        self._stride = stride
+        self._horizon = horizon
+        self._mode = mode
         offset_dtype = (np.int32 if window_size < (1 << 32) else np.int64)
-        self._offset = np.arange(0, window_size, 1, dtype=offset_dtype)
+        self._offset = np.arange(
+            0, window_size + horizon, 1, dtype=offset_dtype)
+        self._strided_views = None
+
+    @property
+    def window_count(self):
+        """Get the number of windows in `data_array`."""
+        span = self._window_size + self._horizon
+        return max((len(self._data_array) - span) // self._stride + 1, 0)
 
     def as_flow(self, batch_size, shuffle=False, skip_incomplete=False):
         """
@@ -84,10 +140,10 @@ class SlidingWindow(DataMapper):
         Returns:
             DataFlow: The data flow for sliding windows.
         """
-        data_length = len(self.data_array)
-        seq_dtype = (np.int32 if data_length < (1 << 32) else np.int64)
+        window_count = self.window_count
+        seq_dtype = (np.int32 if window_count < (1 << 32) else np.int64)
         seq_flow = DataFlow.seq(
-            0, data_length - self.window_size + 1, 1, batch_size=batch_size,
+            0, window_count, 1, batch_size=batch_size,
             shuffle=shuffle, skip_incomplete=skip_incomplete, dtype=seq_dtype
         )
         return seq_flow.map(self)
@@ -102,9 +158,105 @@ class SlidingWindow(DataMapper):
         """Get the window size."""
         return self._window_size
 
+    @property
+    def stride(self):
+        """Get the distance between the beginnings of adjacent windows."""
+        return self._stride
+
+    @property
+    def horizon(self):
+        """Get the number of values after each window as the targets."""
+        return self._horizon
+
+    @property
+    def mode(self):
+        """Get the window extraction mode."""
+        return self._mode
+
+    def _make_strided_views(self, arr, start, count):
+        """
+        Make the read-only strided views of `count` windows (and targets)
+        within `arr`, where the first window begins at `start`.
+        """
+        step = arr.strides[0]
+        views = [np.lib.stride_tricks.as_strided(
+            arr[start:],
+            shape=(count, self._window_size) + arr.shape[1:],
+            strides=(self._stride * step,) + arr.strides,
+            writeable=False
+        )]
+        if self._horizon > 0:
+            views.append(np.lib.stride_tricks.as_strided(
+                arr[start + self._window_size:],
+                shape=(count, self._horizon) + arr.shape[1:],
+                strides=(self._stride * step,) + arr.strides,
+                writeable=False
+            ))
+        return tuple(views)
+
+    def _split_targets(self, arr):
+        if self._horizon > 0:
+            return (arr[:, :self._window_size], arr[:, self._window_size:])
+        return (arr,)
+
+    @staticmethod
+    def _take_windows(views, indices):
+        if len(indices) > 0 and \
+                indices[-1] - indices[0] + 1 == len(indices) and \
+                np.all(np.diff(indices) == 1):
+            # consecutive indices, return the views without copying
+            return tuple(v[indices[0]: indices[-1] + 1] for v in views)
+        return tuple(v[indices] for v in views)
+
+    def _transform_strided(self, indices):
+        if self._strided_views is None:
+            self._strided_views = self._make_strided_views(
+                self._data_array, 0, self.window_count)
+        return self._take_windows(self._strided_views, indices)
+
+    def _transform_gather(self, indices):
+        span = self._window_size + self._horizon
+        starts = np.asarray(indices, dtype=np.int64) * self._stride
+        count = len(starts)
+        if count == 0:
+            shape = (0, span) + self._data_array.shape[1:]
+            return self._split_targets(
+                np.empty(shape, dtype=self._data_array.dtype))
+
+        first, last = np.min(starts), np.max(starts)
+        if last - first + span <= 2 * count * span:
+            # the windows are densely located, read the covering range
+            # at once, and take the windows from its strided view
+            chunk = np.asarray(self._data_array[first: last + span])
+            views = self._make_strided_views(
+                chunk, 0, (last - first) // self._stride + 1)
+            return self._take_windows(views, (starts - first) // self._stride)
+
+        # otherwise read each window by contiguous slicing
+        out = np.empty((count, span) + self._data_array.shape[1:],
+                       dtype=self._data_array.dtype)
+        for i, start in enumerate(starts):
+            out[i] = self._data_array[start: start + span]
+        return self._split_targets(out)
+
+    def _transform_index(self, indices):
+        starts = indices * self._stride if self._stride != 1 else indices
+        return self._split_targets(self._data_array[
+            starts.reshape(starts.shape + (1,)) + self._offset
+        ])
+
     def _transform(self, indices):
-        return (
-            self._data_array[
-                indices.reshape(indices.shape + (1,)) + self._offset
-            ],
-        )
+        indices = np.asarray(indices)
+        if indices.ndim != 1:
+            # extract the windows of the flattened indices, then restore
+            # the shape of the indices
+            outputs = self._transform(indices.reshape([-1]))
+            return tuple(o.reshape(indices.shape + o.shape[1:])
+                         for o in outputs)
+
+        if self._mode == 'strided':
+            return self._transform_strided(indices)
+        elif self._mode == 'gather':
+            return self._transform_gather(indices)
+        else:
+            return self._transform_index(indices)
@@ -1,9 +1,10 @@
+from tfsnippet.utils import AutoInitAndCloseable
 from .base import DataFlow
 
 __all__ = ['GatherFlow']
 
 
-class GatherFlow(DataFlow):
+class GatherFlow(DataFlow, AutoInitAndCloseable):
     """
     Gathering multiple data flows into a single flow.
 
@@ -12,16 +13,48 @@ class GatherFlow(DataFlow):
         x_flow = DataFlow.arrays([x], batch_size=256)
         y_flow = DataFlow.arrays([y], batch_size=256)
         xy_flow = DataFlow.gather([x_flow, y_flow])
+
+    If `prefetch` is specified, each of the gathered flows will be iterated
+    in its own background thread (see :class:`ThreadingFlow`), such that
+    independent sources (e.g., images loaded from disk, and labels in memory)
+    can produce their mini-batches concurrently::
+
+        with DataFlow.gather([image_flow, label_flow], prefetch=3) as df:
+            for epoch in epochs:
+                for batch_image, batch_label in df:
+                    ...
+
+    The sizes of the gathered mini-batches can also be checked or aligned,
+    by specifying `on_mismatch`:
+
+    *   "ignore": do not check the mini-batches, and stop iterating as soon
+        as any of the flows is exhausted.
+    *   "raise": raise :class:`ValueError` if the arrays of a gathered
+        mini-batch have different lengths, or if any of the flows is
+        exhausted before the others.
+    *   "truncate": truncate all arrays of a gathered mini-batch to the
+        shortest length, and stop iterating as soon as any of the flows
+        is exhausted.
     """
 
-    def __init__(self, flows):
+    MISMATCH_ACTIONS = ('ignore', 'raise', 'truncate')
+    """The supported actions for mismatched mini-batches."""
+
+    def __init__(self, flows, prefetch=None, on_mismatch='ignore'):
         """
-        Construct an :class:`IteratorFlow`.
+        Construct a :class:`GatherFlow`.
 
         Args:
             flows(Iterable[DataFlow]): The data flows to gather.
                 At least one data flow should be specified, otherwise a
                 :class:`ValueError` will be raised.
+            prefetch (None or int): If specified, iterate each of the flows
+                in a background thread, with this number of mini-batches
+                to prefetch ahead.  It should be at least 1.
+                (default :obj:`None`, iterate the flows sequentially in
+                the consumer thread)
+            on_mismatch (str): The action for mismatched mini-batches,
+                one of :attr:`MISMATCH_ACTIONS`.  (default "ignore")
 
         Raises:
             ValueError: If not even one data flow is specified.
@@ -33,7 +66,15 @@ class GatherFlow(DataFlow):
         for flow in flows:
             if not isinstance(flow, DataFlow):
                 raise TypeError('Not a DataFlow: {!r}'.format(flow))
+        if prefetch is not None and prefetch < 1:
+            raise ValueError('`prefetch` must be at least 1')
+        if on_mismatch not in self.MISMATCH_ACTIONS:
+            raise ValueError('`on_mismatch` must be one of {!r}: got {!r}'.
+                             format(self.MISMATCH_ACTIONS, on_mismatch))
         self._flows = flows
+        self._prefetch = prefetch
+        self._on_mismatch = on_mismatch
+        self._threaded_flows = None
 
     @property
     def flows(self):
@@ -45,6 +86,77 @@ class GatherFlow(DataFlow):
         """
         return self._flows
 
+    @property
+    def prefetch(self):
+        """
+        Get the number of mini-batches to prefetch for each flow.
+
+        Returns:
+            None or int: The number of mini-batches, or :obj:`None` if
+                the flows are iterated sequentially.
+        """
+        return self._prefetch
+
+    @property
+    def on_mismatch(self):
+        """Get the action for mismatched mini-batches."""
+        return self._on_mismatch
+
+    def _init(self):
+        if self._prefetch is not None:
+            from .threading_flow import ThreadingFlow
+            self._threaded_flows = tuple(
+                ThreadingFlow(flow, prefetch=self._prefetch)
+                for flow in self._flows
+            )
+            for flow in self._threaded_flows:
+                flow.init()
+
+    def _close(self):
+        try:
+            if self._threaded_flows is not None:
+                for flow in self._threaded_flows:
+                    flow.close()
+        finally:
+            self._threaded_flows = None
+
+    def _gather_batch(self, batches):
+        arrays = []
+        for b in batches:
+            arrays.extend(b)
+        if self._on_mismatch != 'ignore' and arrays:
+            lengths = [len(a) for a in arrays]
+            min_length = min(lengths)
+            if max(lengths) != min_length:
+                if self._on_mismatch == 'raise':
+                    raise ValueError('The mini-batches of the gathered flows '
+                                     'have different lengths: {!r}'.
+                                     format(lengths))
+                arrays = [a[:min_length] for a in arrays]
+        return tuple(arrays)
+
     def _minibatch_iterator(self):
-        for batches in zip(*self._flows):
-            yield sum([tuple(b) for b in batches], ())
+        self.init()
+        flows = self._threaded_flows or self._flows
+        iterators = [iter(flow) for flow in flows]
+        try:
+            while True:
+                batches = []
+                for it in iterators:
+                    try:
+                        batches.append(next(it))
+                    except StopIteration:
+                        break
+                if len(batches) < len(iterators):
+                    # any of the flows is exhausted, check whether or not
+                    # the others are also exhausted if required
+                    if self._on_mismatch == 'raise' and (
+                            batches or any(next(it, None) is not None
+                                           for it in iterators[1:])):
+                        raise ValueError('The gathered flows have different '
+                                         'numbers of mini-batches.')
+                    break
+                yield self._gather_batch(batches)
+        finally:
+            for it in iterators:
+                it.close()
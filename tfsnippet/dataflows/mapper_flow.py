@@ -1,9 +1,23 @@
-from .base import DataFlow
+import sys
+from collections import deque
+from multiprocessing.pool import ThreadPool
+
+import six
+
+from tfsnippet.utils import AutoInitAndCloseable, CheckpointSavableObject
+from .array_flow import _check_gather_buffers
+from .base import DataFlow, _is_state_supported, _get_flow_state, \
+    _set_flow_state
+
+if six.PY2:
+    from Queue import Queue
+else:
+    from queue import Queue
 
 __all__ = ['MapperFlow']
 
 
-class MapperFlow(DataFlow):
+class MapperFlow(DataFlow, AutoInitAndCloseable, CheckpointSavableObject):
     """
     Data flow which transforms the mini-batch arrays from source flow
     by a specified mapper function.
@@ -12,15 +26,34 @@ class MapperFlow(DataFlow):
 
         source_flow = Data.arrays([x, y], batch_size=256)
         mapper_flow = source_flow.map(lambda x, y: (x + y,))
+
+    If `workers` is specified, several mini-batches will be kept in flight
+    on a pool of threads.  This is useful when the mapper spends most of
+    its time in routines which release the GIL (e.g., NumPy operations).
+    The pool is created at the first epoch, and kept until the flow is
+    closed::
+
+        with source_flow.map(augment, workers=4) as mapper_flow:
+            for epoch in epochs:
+                for batch_x, batch_y in mapper_flow:
+                    ...
+
+    If the source flow supports :meth:`get_state` and :meth:`set_state`
+    (e.g., :class:`ArrayFlow`), the iteration state of this flow can also
+    be saved and restored, such that an interrupted epoch can be resumed
+    from the next unseen mini-batch.  This is not supported if `workers`
+    is specified with `ordered` being :obj:`False`, since the yielded
+    mini-batches are not a prefix of the source mini-batches.
     """
 
-    def __init__(self, source, mapper, array_indices=None):
+    def __init__(self, source, mapper, array_indices=None, workers=None,
+                 ordered=True):
         """
         Construct a :class:`MapperFlow`.
 
         Args:
             source (DataFlow): The source data flow.
-            mapper ((\*np.ndarray) -> tuple[np.ndarray])): The mapper
+            mapper ((\\*np.ndarray) -> tuple[np.ndarray])): The mapper
                 function, which transforms numpy arrays into a tuple
                 of other numpy arrays.
             array_indices (int or Iterable[int]): The indices of the arrays
@@ -32,7 +65,26 @@ class MapperFlow(DataFlow):
 
                 If not specified, apply the mapper on all arrays, and do
                 not require the number of output arrays to match the inputs.
+            workers (int): If specified, apply the mapper on this number of
+                threads, keeping at most ``2 * workers`` mini-batches in
+                flight.  The mapper must be thread-safe in this case.  If
+                `source` is a shuffled :class:`ArrayFlow` with
+                `gather_buffers`, it should have at least ``2 * workers + 1``
+                buffers.  (default :obj:`None`, apply the mapper in the
+                iterating thread, one mini-batch at a time)
+            ordered (bool): Whether or not to yield the mapped mini-batches
+                in the same order as the source flow, if `workers` is
+                specified?  If :obj:`False`, the mini-batches will be
+                yielded as soon as they are mapped, and the iteration state
+                cannot be saved or restored.  (default :obj:`True`)
         """
+        if workers is not None:
+            if workers < 1:
+                raise ValueError('`workers` must be at least 1')
+            _check_gather_buffers(
+                source, 2 * workers + 1, 'MapperFlow with `workers` = {}'.
+                format(workers)
+            )
         if array_indices is not None:
             try:
                 array_indices = (int(array_indices),)
@@ -41,41 +93,227 @@ class MapperFlow(DataFlow):
         self._source = source
         self._mapper = mapper
         self._array_indices = array_indices
+        self._workers = workers
+        self._ordered = ordered
+
+        # internal states for the active epoch, and for resuming an epoch
+        self._epoch_source_state = None
+        self._batch_cursor = None
+        self._resume_cursor = None
+
+        # the thread pool to apply the mapper, if `workers` is specified
+        self._pool = None  # type: ThreadPool
 
     @property
     def source(self):
         """Get the source data flow."""
         return self._source
 
+    @property
+    def mapper(self):
+        """Get the mapper function."""
+        return self._mapper
+
     @property
     def array_indices(self):
         """Get the indices of the arrays to be processed."""
         return self._array_indices
 
-    def _validate_outputs(self, outputs):
-        if isinstance(outputs, list):
-            outputs = tuple(outputs)
-        elif not isinstance(outputs, tuple):
-            raise TypeError('The output of the mapper is expected to '
-                            'be a tuple or a list, but got a {}.'.
-                            format(outputs.__class__.__name__))
-        return outputs
+    @property
+    def _state_supported(self):
+        return not self._unordered and _is_state_supported(self._source)
+
+    @property
+    def _unordered(self):
+        return self._workers is not None and not self._ordered
+
+    def _check_ordered(self, action):
+        if self._unordered:
+            raise TypeError('MapperFlow with `ordered` = False does not '
+                            'support {} the iteration state.'.format(action))
+
+    @property
+    def workers(self):
+        """Get the number of threads to apply the mapper."""
+        return self._workers
+
+    @property
+    def ordered(self):
+        """Whether or not to keep the order of the source mini-batches?"""
+        return self._ordered
+
+    def get_state(self):
+        """
+        Get the iteration state of this flow.
+
+        Returns:
+            dict: The state dict, with the state of the source flow at the
+                beginning of the active epoch, and the number of mini-batches
+                already yielded in the active epoch.
+
+        Raises:
+            TypeError: If the source flow does not support saving the
+                iteration state, or if `ordered` is :obj:`False` with
+                `workers` specified.
+        """
+        self._check_ordered('saving')
+        if self._batch_cursor is not None:
+            return {'source': self._epoch_source_state,
+                    'batch_cursor': self._batch_cursor}
+        return {'source': _get_flow_state(self._source),
+                'batch_cursor': self._resume_cursor or 0}
+
+    def set_state(self, state):
+        """
+        Set the iteration state of this flow.
+
+        Args:
+            state (dict): The state dict obtained by :meth:`get_state`.
+
+        Raises:
+            TypeError: If the source flow does not support restoring the
+                iteration state, or if `ordered` is :obj:`False` with
+                `workers` specified.
+        """
+        self._check_ordered('restoring')
+        _set_flow_state(self._source, state)
+        self._resume_cursor = state['batch_cursor'] or None
+
+    def _map_batch(self, batch):
+        """
+        Apply the mapper on a mini-batch from the source flow.
+
+        Args:
+            batch (tuple[np.ndarray]): The mini-batch from the source flow.
+
+        Returns:
+            tuple[np.ndarray]: The mapped mini-batch.
+        """
+        return _apply_mapper(self._mapper, self._array_indices, batch)
+
+    def _init(self):
+        if self._workers is not None:
+            self._pool = ThreadPool(self._workers)
+
+    def _close(self):
+        if self._pool is not None:
+            try:
+                self._pool.terminate()
+                self._pool.join()
+            finally:
+                self._pool = None
+
+    def _parallel_minibatch_iterator(self):
+        self.init()
+        pool = self._pool
+        max_pending = 2 * self._workers
+
+        if self._ordered:
+            pending = deque()
+            try:
+                for batch in self._source:
+                    pending.append(pool.apply_async(self._map_batch, (batch,)))
+                    if len(pending) >= max_pending:
+                        yield pending.popleft().get()
+                while pending:
+                    yield pending.popleft().get()
+            finally:
+                # the dropped mini-batches may still be mapped by the pool,
+                # wait for them before the source buffers can be reused
+                if self._pool is pool:
+                    for result in pending:
+                        result.wait()
+
+        else:
+            done_queue = Queue()
+            pending = set()  # sequence numbers of the mini-batches in flight
+
+            def map_batch(seq, batch):
+                try:
+                    done_queue.put((seq, self._map_batch(batch), None))
+                except Exception:
+                    done_queue.put((seq, None, sys.exc_info()))
+
+            def get_done():
+                seq, mapped_b, exc_info = done_queue.get()
+                pending.remove(seq)
+                if exc_info is not None:
+                    six.reraise(*exc_info)
+                return mapped_b
+
+            try:
+                for seq, batch in enumerate(self._source):
+                    pool.apply_async(map_batch, (seq, batch))
+                    pending.add(seq)
+                    # a slow mini-batch should not let the others run ahead
+                    # of it by more than `max_pending` source mini-batches,
+                    # otherwise the source buffers might be reused
+                    while pending and seq + 1 - min(pending) >= max_pending:
+                        yield get_done()
+                while pending:
+                    yield get_done()
+            finally:
+                # wait for the dropped mini-batches, as the ordered case
+                while self._pool is pool and pending:
+                    pending.remove(done_queue.get()[0])
 
     def _minibatch_iterator(self):
-        for batch in self._source:
-            if self._array_indices is not None:
-                mapped_b = list(batch)
-                inputs = [mapped_b[i] for i in self._array_indices]
-                outputs = self._validate_outputs(self._mapper(*inputs))
-                if len(outputs) != len(inputs):
-                    raise ValueError('The number of output arrays of the '
-                                     'mapper is required to match the inputs, '
-                                     'since `array_indices` is specified: '
-                                     'outputs {} != inputs {}.'.
-                                     format(len(outputs), len(inputs)))
-                for i, o in zip(self._array_indices, outputs):
-                    mapped_b[i] = o
-                mapped_b = tuple(mapped_b)
+        # the source flow is one-to-one mapped, thus its mini-batches to be
+        # skipped for resuming the epoch are the same as this flow
+        self._batch_cursor = self._resume_cursor or 0
+        self._resume_cursor = None
+        if self._state_supported:
+            self._epoch_source_state = self._source.get_state()
+
+        try:
+            if self._workers is not None:
+                batches = self._parallel_minibatch_iterator()
             else:
-                mapped_b = self._validate_outputs(self._mapper(*batch))
-            yield mapped_b
+                batches = (self._map_batch(b) for b in self._source)
+            for mapped_b in batches:
+                self._batch_cursor += 1
+                yield mapped_b
+        finally:
+            self._batch_cursor = None
+            self._epoch_source_state = None
+
+
+def _validate_outputs(outputs):
+    if isinstance(outputs, list):
+        outputs = tuple(outputs)
+    elif not isinstance(outputs, tuple):
+        raise TypeError('The output of the mapper is expected to '
+                        'be a tuple or a list, but got a {}.'.
+                        format(outputs.__class__.__name__))
+    return outputs
+
+
+def _apply_mapper(mapper, array_indices, batch):
+    """
+    Apply `mapper` on a mini-batch, in the same way as :class:`MapperFlow`.
+
+    Args:
+        mapper ((\\*np.ndarray) -> tuple[np.ndarray])): The mapper function.
+        array_indices (tuple[int] or None): The indices of the arrays to be
+            processed within the mini-batch, or :obj:`None` to apply the
+            mapper on all arrays.
+        batch (tuple[np.ndarray]): The mini-batch arrays.
+
+    Returns:
+        tuple[np.ndarray]: The mapped mini-batch.
+    """
+    if array_indices is not None:
+        mapped_b = list(batch)
+        inputs = [mapped_b[i] for i in array_indices]
+        outputs = _validate_outputs(mapper(*inputs))
+        if len(outputs) != len(inputs):
+            raise ValueError('The number of output arrays of the '
+                             'mapper is required to match the inputs, '
+                             'since `array_indices` is specified: '
+                             'outputs {} != inputs {}.'.
+                             format(len(outputs), len(inputs)))
+        for i, o in zip(array_indices, outputs):
+            mapped_b[i] = o
+        return tuple(mapped_b)
+    else:
+        return _validate_outputs(mapper(*batch))
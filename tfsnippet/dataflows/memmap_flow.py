@@ -0,0 +1,94 @@
+import numpy as np
+import six
+
+from .array_flow import ArrayFlow
+
+__all__ = ['MemmapFlow']
+
+
+class MemmapFlow(ArrayFlow):
+    """
+    Using memory-mapped arrays as data source flow, for datasets which are
+    larger than the memory.
+
+    Usage::
+
+        memmap_flow = DataFlow.memmap(['x.npy', 'y.npy'], batch_size=256,
+                                      shuffle=True)
+        for batch_x, batch_y in memmap_flow:
+            ...
+
+    When shuffled, the indices within each mini-batch are sorted, such that
+    the items of a mini-batch are read from the files in sequential order.
+    The set of items in each mini-batch is still random.
+    """
+
+    def __init__(self, arrays, batch_size, shuffle=False,
+                 skip_incomplete=False, random_state=None, mmap_mode='r',
+                 gather_buffers=None, shuffle_block_size=None):
+        """
+        Construct a :class:`MemmapFlow`.
+
+        Args:
+            arrays: List of ``.npy`` file paths, or memory-mapped arrays
+                (e.g., :class:`np.memmap` for raw binary files).  The file
+                paths will be opened by ``np.load(path, mmap_mode=...)``.
+                These arrays should be at least 1-d, with identical first
+                dimension.
+            batch_size (int): Size of each mini-batch.
+            shuffle (bool): Whether or not to shuffle data before iterating?
+                (default :obj:`False`)
+            skip_incomplete (bool): Whether or not to exclude the last
+                mini-batch if it is incomplete? (default :obj:`False`)
+            random_state (RandomState): Optional numpy RandomState for
+                shuffling data before each epoch.  (default :obj:`None`,
+                construct a new :class:`RandomState`).
+            mmap_mode (str): The mode to open the ``.npy`` files.
+                (default "r")
+            gather_buffers (int): If specified, gather the shuffled
+                mini-batches into this number of pre-allocated buffers in
+                turn.  (default :obj:`None`, allocate new arrays for each
+                shuffled mini-batch)
+            shuffle_block_size (int): If specified, shuffle the data by
+                permuting contiguous blocks of this number of items, rather
+                than individual items.  (default :obj:`None`, shuffle
+                individual items)
+        """
+        arrays = tuple(arrays)
+        paths = tuple(a if isinstance(a, six.string_types) else None
+                      for a in arrays)
+        arrays = tuple(
+            np.load(a, mmap_mode=mmap_mode)
+            if isinstance(a, six.string_types) else a
+            for a in arrays
+        )
+        super(MemmapFlow, self).__init__(
+            arrays=arrays, batch_size=batch_size, shuffle=shuffle,
+            skip_incomplete=skip_incomplete, random_state=random_state,
+            gather_buffers=gather_buffers,
+            shuffle_block_size=shuffle_block_size
+        )
+        self._paths = paths
+
+    @property
+    def paths(self):
+        """
+        Get the file paths of the arrays.
+
+        Returns:
+            tuple[str or None]: The file paths, or :obj:`None` for the
+                arrays which are not opened from file paths.
+        """
+        return self._paths
+
+    def _shuffle_indices(self):
+        super(MemmapFlow, self)._shuffle_indices()
+
+        # sort the indices within each mini-batch, for sequential reads
+        indices = self._indices_buffer
+        batch_size = self.batch_size
+        full_length = (len(indices) // batch_size) * batch_size
+        if full_length > 0:
+            indices[:full_length].reshape([-1, batch_size]).sort(axis=-1)
+        if full_length < len(indices):
+            indices[full_length:].sort()
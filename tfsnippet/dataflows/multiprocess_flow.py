@@ -0,0 +1,255 @@
+import multiprocessing
+from collections import deque
+from threading import Condition
+
+from .base import ExtraInfoDataFlow
+from .mapper_flow import MapperFlow, _apply_mapper
+from .shared_memory import SharedMemoryRingBuffer
+from .threading_flow import ThreadingFlow
+
+__all__ = ['MultiprocessFlow']
+
+_worker_mappers = None  # the (mapper, array_indices) list in worker processes
+_worker_buffer = None  # the shared memory ring buffer in worker processes
+
+
+def _init_worker(mappers, buffer):
+    global _worker_mappers, _worker_buffer
+    _worker_mappers = mappers
+    _worker_buffer = buffer
+
+
+def _worker_map_batch(batch, slot=None):
+    for mapper, array_indices in _worker_mappers:
+        batch = _apply_mapper(mapper, array_indices, batch)
+    if slot is not None:
+        return _worker_buffer.write(slot, batch)
+    return batch
+
+
+class MultiprocessFlow(ThreadingFlow):
+    """
+    Data flow to prefetch from the source data flow in a background thread,
+    executing the mappers of the source flow in a pool of worker processes.
+
+    If the source flow is a :class:`MapperFlow` (or a chain of
+    :class:`MapperFlow`), the mappers will be executed in the worker
+    processes, while the source of the mappers will be iterated in the
+    background thread.  Otherwise the mini-batches of the source flow will
+    be prefetched in the background thread, just as :class:`ThreadingFlow`.
+
+    The mini-batches are always produced in the same order as the source
+    flow, no matter how many worker processes are used.
+
+    Usage::
+
+        mapper_flow = DataFlow.arrays([x], batch_size=256).map(sampler)
+        with mapper_flow.multiprocess(prefetch=5, workers=4) as df:
+            for epoch in epochs:
+                for [batch_x] in df:
+                    ...
+
+    If `shared_memory` is :obj:`True`, the worker processes will write the
+    mapped mini-batches into a :class:`SharedMemoryRingBuffer` in place,
+    instead of sending them back through pickling.  The mini-batches are
+    then read-only views of the shared memory, which are only valid until
+    the next mini-batch is requested, so copy them if they need to be kept.
+
+    Note:
+        The mappers are passed to the worker processes when the pool is
+        created.  On platforms where the worker processes are not forked
+        from the main process (e.g., Windows), the mappers must be picklable.
+    """
+
+    def __init__(self, source, prefetch, workers=None, shared_memory=False,
+                 data_shapes=None, data_dtypes=None):
+        """
+        Construct a :class:`MultiprocessFlow`.
+
+        Args:
+            source (DataFlow): The source data flow.
+            prefetch (int): Number of mini-batches to prefetch ahead.
+                It should be at least 1.
+            workers (int): Number of worker processes.  It should be at
+                least 1.  (default :obj:`None`, the number of CPU cores)
+            shared_memory (bool): Whether or not to transport the mapped
+                mini-batches through shared memory?  This requires the source
+                of the mappers to be an :class:`ExtraInfoDataFlow`, whose
+                `batch_size` bounds the size of the mapped mini-batches.
+                (default :obj:`False`)
+            data_shapes (tuple[tuple[int]]): The shapes of data in a mapped
+                mini-batch, excluding the batch dimension.  Only used if
+                `shared_memory` is :obj:`True`.  (default :obj:`None`, the
+                `data_shapes` of the source of the mappers)
+            data_dtypes (tuple[np.dtype]): The dtypes of data in a mapped
+                mini-batch.  Only used if `shared_memory` is :obj:`True`.
+                (default :obj:`None`, the `data_dtypes` of the source of
+                the mappers)
+        """
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        if workers < 1:
+            raise ValueError('`workers` must be at least 1')
+        super(MultiprocessFlow, self).__init__(source, prefetch=prefetch)
+        self._workers = workers
+
+        # gather the mappers to be executed in the worker processes
+        mappers = []
+        mapper_source = source
+        while isinstance(mapper_source, MapperFlow):
+            mappers.insert(
+                0, (mapper_source.mapper, mapper_source.array_indices))
+            mapper_source = mapper_source.source
+        self._mappers = tuple(mappers)
+        self._mapper_source = mapper_source
+
+        # determine the layout of the shared memory slots
+        self._shared_memory = bool(shared_memory) and bool(mappers)
+        if self._shared_memory:
+            if not isinstance(mapper_source, ExtraInfoDataFlow):
+                raise ValueError('`shared_memory` requires the source of the '
+                                 'mappers to be an ExtraInfoDataFlow: {!r}'.
+                                 format(mapper_source))
+            if data_shapes is None:
+                data_shapes = mapper_source.data_shapes
+            if data_dtypes is None:
+                data_dtypes = mapper_source.data_dtypes
+            if data_dtypes is None or any(d is None for d in data_dtypes):
+                raise ValueError('`data_dtypes` must be specified, since the '
+                                 'source of the mappers does not provide it.')
+        self._data_shapes = data_shapes
+        self._data_dtypes = data_dtypes
+
+        # internal states for the worker processes
+        self._pool = None
+        self._buffer = None  # type: SharedMemoryRingBuffer
+        self._slot_cond = None  # type: Condition
+        self._next_seq = None  # sequence number of the next mapped batch
+        self._released_seq = None  # all batches before this are released
+
+    @property
+    def workers(self):
+        """Get the number of worker processes."""
+        return self._workers
+
+    @property
+    def shared_memory(self):
+        """Whether or not to transport the mini-batches via shared memory?"""
+        return self._shared_memory
+
+    def _max_pending(self):
+        # at most `workers + prefetch` mini-batches can be in flight,
+        # so that the pool will not run ahead of the consumer too much
+        return self.workers + self.prefetch_num
+
+    def _acquire_slot(self):
+        # wait until the slot of the next sequence number has been released
+        # by the consumer.  Returns None if the flow is being closed.
+        with self._slot_cond:
+            while self._next_seq >= \
+                    self._released_seq + self._buffer.slot_count:
+                if self._stopping:
+                    return None
+                self._slot_cond.wait(0.1)
+            seq = self._next_seq
+            self._next_seq += 1
+            return seq
+
+    def _release_slots(self, seq):
+        with self._slot_cond:
+            if seq > self._released_seq:
+                self._released_seq = seq
+                self._slot_cond.notify_all()
+
+    def _slot_available(self):
+        with self._slot_cond:
+            return self._next_seq < \
+                self._released_seq + self._buffer.slot_count
+
+    def _iter_source(self):
+        if not self._mappers:
+            for batch in self._mapper_source:
+                yield batch
+        elif not self._shared_memory:
+            pending = deque()
+            for batch in self._mapper_source:
+                pending.append(
+                    self._pool.apply_async(_worker_map_batch, (batch,)))
+                if len(pending) >= self._max_pending():
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
+        else:
+            pending = deque()
+            try:
+                for batch in self._mapper_source:
+                    # do not wait for free slots while holding finished
+                    # batches, otherwise the consumer might never release
+                    while pending and not self._slot_available():
+                        seq, result = pending.popleft()
+                        yield seq, result.get()
+                    seq = self._acquire_slot()
+                    if seq is None:
+                        return
+                    slot = seq % self._buffer.slot_count
+                    pending.append((seq, self._pool.apply_async(
+                        _worker_map_batch, (batch, slot))))
+                    if len(pending) >= self._max_pending():
+                        seq, result = pending.popleft()
+                        yield seq, result.get()
+                while pending:
+                    seq, result = pending.popleft()
+                    yield seq, result.get()
+            finally:
+                # the dropped batches may still be written by the workers,
+                # wait for them before their slots can be reused
+                for _, result in pending:
+                    result.wait()
+
+    def _init(self):
+        if self._mappers:
+            if self._shared_memory:
+                self._buffer = SharedMemoryRingBuffer(
+                    slot_count=self.workers + 2 * self.prefetch_num + 2,
+                    batch_size=self._mapper_source.batch_size,
+                    data_shapes=self._data_shapes,
+                    data_dtypes=self._data_dtypes
+                )
+                self._slot_cond = Condition()
+                self._next_seq = 0
+                self._released_seq = 0
+            self._pool = multiprocessing.Pool(
+                self.workers, initializer=_init_worker,
+                initargs=(self._mappers, self._buffer)
+            )
+        super(MultiprocessFlow, self)._init()
+
+    def _close(self):
+        try:
+            super(MultiprocessFlow, self)._close()
+        finally:
+            if self._pool is not None:
+                self._pool.terminate()
+                self._pool.join()
+                self._pool = None
+            self._buffer = None
+            self._slot_cond = None
+
+    def _minibatch_iterator(self):
+        if not self._shared_memory:
+            for batch in super(MultiprocessFlow, self)._minibatch_iterator():
+                yield batch
+        else:
+            self.init()
+            buffer = self._buffer
+            last_seq = None
+            try:
+                for seq, length in \
+                        super(MultiprocessFlow, self)._minibatch_iterator():
+                    # requesting the next batch releases all previous ones
+                    self._release_slots(seq)
+                    last_seq = seq
+                    yield buffer.read(seq % buffer.slot_count, length)
+            finally:
+                if last_seq is not None and self._slot_cond is not None:
+                    self._release_slots(last_seq + 1)
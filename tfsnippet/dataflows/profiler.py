@@ -0,0 +1,258 @@
+import threading
+from collections import OrderedDict
+from timeit import default_timer
+
+import six
+
+__all__ = ['DataFlowProfiler']
+
+
+class _StageStats(object):
+    """Statistics of a profiled data flow stage."""
+
+    def __init__(self):
+        self.batches = 0
+        self.inclusive_time = 0.
+        self.exclusive_time = 0.
+        self.bytes = 0
+        self.queue_fill_sum = 0.
+        self.queue_fill_count = 0
+
+
+def _get_batch_bytes(batch):
+    return sum(int(getattr(arr, 'nbytes', 0)) for arr in batch)
+
+
+class DataFlowProfiler(object):
+    """
+    Profiler to record the performance of each stage in a pipeline of
+    :class:`DataFlow`.
+
+    The profiling is opt-in.  A data flow, as well as all its upstream flows
+    (i.e., the `source` or `flows` of each flow), can be attached to a
+    profiler by :meth:`attach`.  Each of the attached flows is a stage
+    of the pipeline, which records the following metrics::
+
+        "<prefix><stage>/time": average time spent by this stage for each
+            mini-batch, excluding the time spent by its upstream stages
+            in the same thread.
+        "<prefix><stage>/batches_per_sec": mini-batches produced per
+            second, including the time spent by its upstream stages.
+        "<prefix><stage>/bytes": average number of bytes of each mini-batch.
+        "<prefix><stage>/queue_fill": average fraction of the prefetch queue
+            being filled, when a mini-batch is requested.  Only available
+            for :class:`ThreadingFlow` and its subclasses.
+
+    The metrics can be reported to a :class:`~tfsnippet.scaffold.TrainLoop`
+    by :meth:`collect_metrics`, such that they show up in the training logs
+    and the TensorBoard summaries.  For example::
+
+        flow = DataFlow.arrays([x], batch_size=64).map(f).threaded(5)
+        profiler = DataFlowProfiler()
+        profiler.attach(flow)
+
+        with TrainLoop(...) as loop:
+            loop.events.on(EventKeys.AFTER_EPOCH, profiler.collect_metrics)
+            for epoch in loop.iter_epochs():
+                for step, [batch_x] in loop.iter_steps(flow):
+                    ...
+
+    For a :class:`ThreadingFlow`, the time of its stage is the time waiting
+    for the prefetch queue, while its upstream stages are profiled in the
+    background worker.  A slow upstream stage will thus be revealed by a
+    long waiting time along with a nearly empty queue.
+    """
+
+    def __init__(self, prefix='dataflow/'):
+        """
+        Construct a new :class:`DataFlowProfiler`.
+
+        Args:
+            prefix (str): The prefix for the names of the metrics.
+                (default "dataflow/")
+        """
+        self._prefix = prefix
+        self._stats = OrderedDict()  # type: dict[str, _StageStats]
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def prefix(self):
+        """Get the prefix for the names of the metrics."""
+        return self._prefix
+
+    @property
+    def stage_names(self):
+        """
+        Get the names of the attached stages.
+
+        Returns:
+            tuple[str]: The names of the stages, in the order of attaching.
+        """
+        return tuple(self._stats)
+
+    def attach(self, flow, recursive=True):
+        """
+        Attach a data flow to this profiler.
+
+        Each stage is named after the class of the flow, with a numeric
+        suffix if there are more than one stages of the same class,
+        e.g., "MapperFlow" and "MapperFlow_1".
+
+        Args:
+            flow (DataFlow): The data flow to be profiled.
+            recursive (bool): Whether or not to also attach all the upstream
+                flows of `flow`?  (default :obj:`True`)
+
+        Returns:
+            DataFlow: The specified `flow`.
+
+        Raises:
+            ValueError: If `flow` has been attached to another profiler.
+        """
+        def visit(f):
+            if f._profiler is not self:
+                if f._profiler is not None:
+                    raise ValueError('{!r} has been attached to another '
+                                     'profiler.'.format(f))
+                base_name = name = f.__class__.__name__
+                i = 0
+                while name in self._stats:
+                    i += 1
+                    name = '{}_{}'.format(base_name, i)
+                with self._lock:
+                    self._stats[name] = _StageStats()
+                f._profiler = self
+                f._profile_stage = name
+
+            if recursive:
+                source = getattr(f, 'source', None)
+                if source is not None:
+                    visit(source)
+                for child in getattr(f, 'flows', None) or ():
+                    visit(child)
+
+        visit(flow)
+        return flow
+
+    def detach(self, flow, recursive=True):
+        """
+        Detach a data flow from this profiler.
+
+        Args:
+            flow (DataFlow): The data flow to stop being profiled.
+            recursive (bool): Whether or not to also detach all the upstream
+                flows of `flow`?  (default :obj:`True`)
+        """
+        def visit(f):
+            if f._profiler is self:
+                with self._lock:
+                    self._stats.pop(f._profile_stage, None)
+                f._profiler = None
+                f._profile_stage = None
+
+            if recursive:
+                source = getattr(f, 'source', None)
+                if source is not None:
+                    visit(source)
+                for child in getattr(f, 'flows', None) or ():
+                    visit(child)
+
+        visit(flow)
+
+    def reset(self):
+        """Clear the recorded statistics of all stages."""
+        with self._lock:
+            for name in self._stats:
+                self._stats[name] = _StageStats()
+
+    def get_metrics(self):
+        """
+        Get the metrics of the recorded statistics.
+
+        Returns:
+            dict[str, float]: The metrics, with the names described in
+                the document of :class:`DataFlowProfiler`.  Stages without
+                any mini-batch produced are excluded.
+        """
+        ret = {}
+        with self._lock:
+            for name, stats in six.iteritems(self._stats):
+                if not stats.batches:
+                    continue
+                prefix = '{}{}/'.format(self._prefix, name)
+                ret[prefix + 'time'] = \
+                    stats.exclusive_time / stats.batches
+                if stats.inclusive_time > 0:
+                    ret[prefix + 'batches_per_sec'] = \
+                        stats.batches / stats.inclusive_time
+                ret[prefix + 'bytes'] = float(stats.bytes) / stats.batches
+                if stats.queue_fill_count:
+                    ret[prefix + 'queue_fill'] = \
+                        stats.queue_fill_sum / stats.queue_fill_count
+        return ret
+
+    def collect_metrics(self, loop, reset=True):
+        """
+        Report the metrics to a train loop.
+
+        This method can be registered as an event handler of the train loop,
+        e.g., ``loop.events.on(EventKeys.AFTER_EPOCH,
+        profiler.collect_metrics)``.
+
+        Args:
+            loop (tfsnippet.scaffold.TrainLoop): The train loop.
+            reset (bool): Whether or not to clear the recorded statistics
+                after reporting?  (default :obj:`True`)
+        """
+        metrics = self.get_metrics()
+        if metrics:
+            loop.collect_metrics(metrics)
+        if reset:
+            self.reset()
+
+    def _record(self, stage, inclusive_time, exclusive_time, batch,
+                queue_fill):
+        with self._lock:
+            stats = self._stats.get(stage)
+            if stats is None:  # the flow has been detached
+                return
+            stats.inclusive_time += inclusive_time
+            stats.exclusive_time += exclusive_time
+            if batch is not None:
+                stats.batches += 1
+                stats.bytes += _get_batch_bytes(batch)
+            if queue_fill is not None:
+                stats.queue_fill_sum += queue_fill
+                stats.queue_fill_count += 1
+
+    def _profiled_iterator(self, flow, iterator):
+        """
+        Wrap the mini-batch iterator of `flow`, to record the statistics.
+
+        The time spent by the upstream stages in the same thread is tracked
+        by a thread-local stack, such that it can be excluded from the time
+        spent by the stage of `flow`.
+        """
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        stage = flow._profile_stage
+
+        while True:
+            queue_fill = flow._get_queue_fill()
+            batch = None
+            stack.append(0.)
+            start_time = default_timer()
+            try:
+                batch = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                elapsed = default_timer() - start_time
+                upstream_time = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                self._record(stage, elapsed, elapsed - upstream_time, batch,
+                             queue_fill)
+            yield batch
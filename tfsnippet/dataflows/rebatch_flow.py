@@ -0,0 +1,240 @@
+import numpy as np
+
+from .base import DataFlow
+
+__all__ = ['RebatchFlow', 'BucketFlow']
+
+
+class _BatchAccumulator(object):
+    """
+    Split and merge the incoming arrays into mini-batches of a fixed size.
+
+    Complete mini-batches within an incoming batch are emitted as views,
+    while the items across the boundary of incoming batches are kept
+    pending, and concatenated once there are enough of them.
+    """
+
+    def __init__(self, batch_size, copy_pending):
+        self._batch_size = batch_size
+        self._copy_pending = copy_pending
+        self._chunks = []
+        self._length = 0
+
+    def _keep(self, arrays):
+        # the pending arrays are copied if required, since the source flow
+        # may re-use its buffers once the next mini-batch is requested.
+        if self._copy_pending:
+            arrays = tuple(np.array(a) for a in arrays)
+        self._chunks.append(arrays)
+
+    def _pop(self):
+        if len(self._chunks) == 1:
+            ret = self._chunks[0]
+        else:
+            ret = tuple(np.concatenate(a) for a in zip(*self._chunks))
+        self._chunks = []
+        self._length = 0
+        return ret
+
+    def add(self, arrays):
+        batch_size = self._batch_size
+        length = len(arrays[0])
+        pos = 0
+
+        # complete the pending mini-batch
+        if self._length > 0:
+            pos = min(batch_size - self._length, length)
+            self._length += pos
+            if self._length < batch_size:
+                self._keep(arrays)
+                return
+            self._chunks.append(tuple(a[:pos] for a in arrays))
+            yield self._pop()
+
+        # emit the complete mini-batches as views
+        while length - pos >= batch_size:
+            yield tuple(a[pos: pos + batch_size] for a in arrays)
+            pos += batch_size
+
+        if pos < length:
+            self._keep(tuple(a[pos:] for a in arrays))
+            self._length = length - pos
+
+    def flush(self):
+        if self._length > 0:
+            return self._pop()
+
+
+def _as_batch_arrays(batch):
+    batch = tuple(np.asarray(a) for a in batch)
+    if not batch:
+        raise ValueError('The mini-batch must not be empty.')
+    return batch
+
+
+class RebatchFlow(DataFlow):
+    """
+    Data flow which splits and merges the mini-batches of a source flow,
+    into mini-batches of another size.
+
+    The complete mini-batches within a source mini-batch are yielded as
+    views of the source arrays, without copying.  Only the mini-batches
+    across the boundary of source mini-batches are concatenated.
+
+    Usage::
+
+        # evaluate with larger mini-batches than the training source
+        eval_flow = train_flow.rebatch(batch_size=1024)
+    """
+
+    def __init__(self, source, batch_size, skip_incomplete=False):
+        """
+        Construct a :class:`RebatchFlow`.
+
+        Args:
+            source (DataFlow): The source data flow.
+            batch_size (int): Size of each mini-batch.
+            skip_incomplete (bool): Whether or not to exclude the last
+                mini-batch if it is incomplete? (default :obj:`False`)
+        """
+        if batch_size < 1:
+            raise ValueError('`batch_size` must be at least 1')
+        self._source = source
+        self._batch_size = batch_size
+        self._skip_incomplete = skip_incomplete
+
+    @property
+    def source(self):
+        """Get the source data flow."""
+        return self._source
+
+    @property
+    def batch_size(self):
+        """Get the size of each mini-batch."""
+        return self._batch_size
+
+    @property
+    def skip_incomplete(self):
+        """
+        Whether or not to exclude the last mini-batch if it is incomplete?
+        """
+        return self._skip_incomplete
+
+    def _minibatch_iterator(self):
+        acc = _BatchAccumulator(self._batch_size, copy_pending=True)
+        for batch in self._source:
+            for b in acc.add(_as_batch_arrays(batch)):
+                yield b
+        last = acc.flush()
+        if last is not None and not self._skip_incomplete:
+            yield last
+
+
+class BucketFlow(DataFlow):
+    """
+    Data flow which groups the samples of a source flow into buckets,
+    according to their keys (e.g., the sequence lengths), and yields
+    mini-batches of samples from the same bucket.
+
+    The bucket of a sample with key `k` is the number of boundaries which
+    are less than or equal to `k`, i.e., the buckets are
+    ``(-inf, b[0]), [b[0], b[1]), ..., [b[-1], inf)``.
+
+    Usage::
+
+        flow = seq_flow.bucket_by(
+            lambda x, y: x_lengths[y], bucket_boundaries=[10, 20, 50],
+            batch_size=64
+        )
+    """
+
+    def __init__(self, source, key_fn, bucket_boundaries, batch_size,
+                 skip_incomplete=False):
+        """
+        Construct a :class:`BucketFlow`.
+
+        Args:
+            source (DataFlow): The source data flow.
+            key_fn ((\\*np.ndarray) -> np.ndarray): Function which receives
+                the arrays of a source mini-batch, and returns the 1-d
+                array of keys for the samples.
+            bucket_boundaries (Iterable[int or float]): The increasing
+                boundaries of the buckets.
+            batch_size (int or Iterable[int]): Size of each mini-batch.
+                It can also be a list of ``len(bucket_boundaries) + 1``
+                integers, the mini-batch size for each bucket.
+            skip_incomplete (bool): Whether or not to exclude the last
+                incomplete mini-batch of each bucket? (default :obj:`False`)
+        """
+        bucket_boundaries = tuple(bucket_boundaries)
+        if any(a >= b for a, b in zip(bucket_boundaries[:-1],
+                                      bucket_boundaries[1:])):
+            raise ValueError('`bucket_boundaries` must be strictly '
+                             'increasing: {!r}'.format(bucket_boundaries))
+        bucket_count = len(bucket_boundaries) + 1
+        if np.ndim(batch_size) == 0:
+            batch_sizes = (int(batch_size),) * bucket_count
+        else:
+            batch_sizes = tuple(int(s) for s in batch_size)
+            if len(batch_sizes) != bucket_count:
+                raise ValueError('`batch_size` must be an integer, or a list '
+                                 'of {} integers: got {!r}'.
+                                 format(bucket_count, batch_sizes))
+        if any(s < 1 for s in batch_sizes):
+            raise ValueError('`batch_size` must be at least 1')
+
+        self._source = source
+        self._key_fn = key_fn
+        self._bucket_boundaries = bucket_boundaries
+        self._batch_sizes = batch_sizes
+        self._skip_incomplete = skip_incomplete
+
+    @property
+    def source(self):
+        """Get the source data flow."""
+        return self._source
+
+    @property
+    def bucket_boundaries(self):
+        """Get the boundaries of the buckets."""
+        return self._bucket_boundaries
+
+    @property
+    def batch_sizes(self):
+        """Get the mini-batch size of each bucket."""
+        return self._batch_sizes
+
+    @property
+    def skip_incomplete(self):
+        """
+        Whether or not to exclude the last incomplete mini-batch of each
+        bucket?
+        """
+        return self._skip_incomplete
+
+    def _minibatch_iterator(self):
+        boundaries = np.asarray(self._bucket_boundaries)
+        buckets = [_BatchAccumulator(s, copy_pending=False)
+                   for s in self._batch_sizes]
+
+        for batch in self._source:
+            batch = _as_batch_arrays(batch)
+            keys = np.asarray(self._key_fn(*batch))
+            if keys.shape != (len(batch[0]),):
+                raise ValueError('`key_fn` must return a 1-d array of keys '
+                                 'for the samples: got shape {!r}, while '
+                                 'the mini-batch size is {}'.
+                                 format(keys.shape, len(batch[0])))
+            bucket_ids = np.searchsorted(boundaries, keys, side='right')
+            for i in np.unique(bucket_ids):
+                # the samples selected by fancy indexing are copies, thus
+                # need not to be copied again
+                idx = np.where(bucket_ids == i)[0]
+                for b in buckets[i].add(tuple(a[idx] for a in batch)):
+                    yield b
+
+        if not self._skip_incomplete:
+            for bucket in buckets:
+                last = bucket.flush()
+                if last is not None:
+                    yield last
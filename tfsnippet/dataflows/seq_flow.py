@@ -22,7 +22,8 @@ class SeqFlow(ArrayFlow):
     """
 
     def __init__(self, start, stop, step=1, batch_size=None, shuffle=False,
-                 skip_incomplete=False, dtype=np.int32, random_state=None):
+                 skip_incomplete=False, dtype=np.int32, random_state=None,
+                 num_shards=None, shard_index=None, pad_shards=False):
         """
         Construct a :class:`SeqFlow`.
 
@@ -39,6 +40,15 @@ class SeqFlow(ArrayFlow):
             random_state (RandomState): Optional numpy RandomState for
                 shuffling data before each epoch.  (default :obj:`None`,
                 construct a new :class:`RandomState`).
+            num_shards (int): If specified, split each epoch into this number
+                of disjoint shards, and iterate through only one of them.
+                (default :obj:`None`, iterate through all the data)
+            shard_index (int): The index of the shard to iterate through,
+                required if `num_shards` is specified.
+            pad_shards (bool): Whether or not to pad the shards with the
+                items from the beginning of the epoch, instead of dropping
+                the remaining items, such that every shard gets the same
+                number of items?  (default :obj:`False`)
         """
         # check the parameters
         if batch_size is None:
@@ -50,7 +60,10 @@ class SeqFlow(ArrayFlow):
             batch_size=batch_size,
             shuffle=shuffle,
             skip_incomplete=skip_incomplete,
-            random_state=random_state
+            random_state=random_state,
+            num_shards=num_shards,
+            shard_index=shard_index,
+            pad_shards=pad_shards
         )
         self._start = start
         self._stop = stop
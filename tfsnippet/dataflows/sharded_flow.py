@@ -0,0 +1,298 @@
+import codecs
+import json
+import os
+
+import numpy as np
+
+from tfsnippet.utils import makedirs, generate_random_seed
+from .base import ExtraInfoDataFlow
+
+__all__ = ['ShardWriter', 'ShardedFlow']
+
+SHARD_INDEX_FILE = 'index.json'
+SHARD_FORMAT_VERSION = 1
+
+
+def _shard_file_name(shard_index, array_index):
+    return 'shard-{:05d}.{}.npy'.format(shard_index, array_index)
+
+
+class ShardWriter(object):
+    """
+    Writer for the sharded on-disk dataset format.
+
+    A sharded dataset is a directory of fixed-size ``.npy`` shards (one
+    file for each array in each shard), plus a small JSON index file.
+    The mini-batches written to a :class:`ShardWriter` are copied into a
+    pre-allocated shard buffer, which is saved once it is full, thus the
+    memory usage is bounded by the size of one shard.
+
+    Usage::
+
+        with ShardWriter('/path/to/dataset', shard_size=10000) as writer:
+            for batch in source_flow:
+                writer.write(batch)
+
+        # or equivalently
+        source_flow.write_shards('/path/to/dataset', shard_size=10000)
+
+        # then read the dataset by a :class:`ShardedFlow`
+        flow = DataFlow.shards('/path/to/dataset', batch_size=256,
+                               shuffle=True)
+    """
+
+    def __init__(self, path, shard_size):
+        """
+        Construct a new :class:`ShardWriter`.
+
+        Args:
+            path (str): The directory where to save the shards.
+            shard_size (int): The number of items in each shard.
+
+        Raises:
+            IOError: If a sharded dataset already exists at `path`.
+        """
+        if shard_size < 1:
+            raise ValueError('`shard_size` must be at least 1')
+        path = os.path.abspath(path)
+        if os.path.exists(os.path.join(path, SHARD_INDEX_FILE)):
+            raise IOError('Sharded dataset already exists: {}'.format(path))
+
+        self._path = path
+        self._shard_size = shard_size
+        self._data_shapes = None
+        self._data_dtypes = None
+        self._buffers = None
+        self._buffer_length = 0
+        self._shard_lengths = []
+        self._closed = False
+
+    @property
+    def path(self):
+        """Get the directory where to save the shards."""
+        return self._path
+
+    @property
+    def shard_size(self):
+        """Get the number of items in each shard."""
+        return self._shard_size
+
+    def _flush(self):
+        if self._buffer_length > 0:
+            shard_index = len(self._shard_lengths)
+            for i, buf in enumerate(self._buffers):
+                np.save(os.path.join(
+                    self._path, _shard_file_name(shard_index, i)),
+                    buf[:self._buffer_length]
+                )
+            self._shard_lengths.append(self._buffer_length)
+            self._buffer_length = 0
+
+    def write(self, batch):
+        """
+        Write a mini-batch into the dataset.
+
+        Args:
+            batch (tuple[np.ndarray]): The mini-batch arrays.
+
+        Raises:
+            ValueError: If the arrays do not match the previous mini-batches.
+        """
+        if self._closed:
+            raise RuntimeError('The writer has been closed.')
+
+        # check the arrays
+        batch = tuple(np.asarray(arr) for arr in batch)
+        if not batch:
+            raise ValueError('The mini-batch must not be empty.')
+        length = len(batch[0])
+        for arr in batch[1:]:
+            if len(arr) != length:
+                raise ValueError('The arrays of the mini-batch must have the '
+                                 'same length.')
+
+        if self._buffers is None:
+            self._data_shapes = tuple(arr.shape[1:] for arr in batch)
+            self._data_dtypes = tuple(arr.dtype for arr in batch)
+            self._buffers = tuple(
+                np.empty((self._shard_size,) + arr.shape[1:], dtype=arr.dtype)
+                for arr in batch
+            )
+            makedirs(self._path, exist_ok=True)
+        elif tuple(arr.shape[1:] for arr in batch) != self._data_shapes or \
+                tuple(arr.dtype for arr in batch) != self._data_dtypes:
+            raise ValueError('The shapes or dtypes of the mini-batch do not '
+                             'match the previous mini-batches.')
+
+        # copy the arrays into the shard buffers
+        start = 0
+        while start < length:
+            size = min(length - start,
+                       self._shard_size - self._buffer_length)
+            for arr, buf in zip(batch, self._buffers):
+                buf[self._buffer_length: self._buffer_length + size] = \
+                    arr[start: start + size]
+            self._buffer_length += size
+            start += size
+            if self._buffer_length >= self._shard_size:
+                self._flush()
+
+    def close(self):
+        """Flush the last shard and write the index file."""
+        if not self._closed:
+            self._closed = True
+            if self._buffers is None:
+                raise ValueError('No data has been written.')
+            self._flush()
+            self._buffers = None
+            index = {
+                'format_version': SHARD_FORMAT_VERSION,
+                'shard_size': self._shard_size,
+                'shard_lengths': self._shard_lengths,
+                'data_shapes': [list(s) for s in self._data_shapes],
+                'data_dtypes': [d.str for d in self._data_dtypes],
+            }
+            with codecs.open(os.path.join(self._path, SHARD_INDEX_FILE),
+                             'wb', 'utf-8') as f:
+                f.write(json.dumps(index))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._closed = True
+
+
+class ShardedFlow(ExtraInfoDataFlow):
+    """
+    Using a sharded on-disk dataset (written by :class:`ShardWriter`) as
+    data source flow.
+
+    Only a few shards are loaded into memory at the same time.  If shuffled,
+    the data are shuffled at two levels: the order of the shards is firstly
+    permuted, then every `shuffle_shards` consecutive shards are loaded into
+    a buffer and shuffled.  This gives a near-random order, while the shard
+    files are always read sequentially as a whole.
+
+    Usage::
+
+        flow = DataFlow.shards('/path/to/dataset', batch_size=256,
+                               shuffle=True, shuffle_shards=4)
+        for batch_x, batch_y in flow:
+            ...
+    """
+
+    def __init__(self, path, batch_size, shuffle=False,
+                 skip_incomplete=False, random_state=None, shuffle_shards=1):
+        """
+        Construct a :class:`ShardedFlow`.
+
+        Args:
+            path (str): The directory of the sharded dataset.
+            batch_size (int): Size of each mini-batch.
+            shuffle (bool): Whether or not to shuffle data before iterating?
+                (default :obj:`False`)
+            skip_incomplete (bool): Whether or not to exclude the last
+                mini-batch if it is incomplete? (default :obj:`False`)
+            random_state (RandomState): Optional numpy RandomState for
+                shuffling data before each epoch.  (default :obj:`None`,
+                construct a new :class:`RandomState`).
+            shuffle_shards (int): The number of shards to be loaded into
+                the shuffling buffer at the same time.  (default 1)
+        """
+        if shuffle_shards < 1:
+            raise ValueError('`shuffle_shards` must be at least 1')
+        path = os.path.abspath(path)
+        index_file = os.path.join(path, SHARD_INDEX_FILE)
+        if not os.path.isfile(index_file):
+            raise IOError('Sharded dataset not found: {}'.format(path))
+        with codecs.open(index_file, 'rb', 'utf-8') as f:
+            index = json.loads(f.read())
+        if index.get('format_version') != SHARD_FORMAT_VERSION:
+            raise IOError('Unsupported sharded dataset format version: {!r}'.
+                          format(index.get('format_version')))
+
+        shard_lengths = tuple(int(n) for n in index['shard_lengths'])
+        data_shapes = tuple(tuple(int(s) for s in shape)
+                            for shape in index['data_shapes'])
+        data_dtypes = tuple(np.dtype(d) for d in index['data_dtypes'])
+        super(ShardedFlow, self).__init__(
+            array_count=len(data_shapes),
+            data_length=sum(shard_lengths),
+            data_shapes=data_shapes,
+            batch_size=batch_size,
+            skip_incomplete=skip_incomplete,
+            is_shuffled=shuffle,
+            data_dtypes=data_dtypes
+        )
+        self._path = path
+        self._shard_size = int(index['shard_size'])
+        self._shard_lengths = shard_lengths
+        self._shuffle_shards = shuffle_shards
+        self._random_state = \
+            random_state or np.random.RandomState(generate_random_seed())
+
+    @property
+    def path(self):
+        """Get the directory of the sharded dataset."""
+        return self._path
+
+    @property
+    def shard_count(self):
+        """Get the number of shards."""
+        return len(self._shard_lengths)
+
+    @property
+    def shard_size(self):
+        """Get the number of items in each shard."""
+        return self._shard_size
+
+    @property
+    def shuffle_shards(self):
+        """Get the number of shards to be loaded into the shuffling buffer."""
+        return self._shuffle_shards
+
+    def _load_shard(self, shard_index):
+        return tuple(
+            np.load(os.path.join(self._path, _shard_file_name(shard_index, i)))
+            for i in range(self.array_count)
+        )
+
+    def _minibatch_iterator(self):
+        shard_order = np.arange(self.shard_count)
+        if self.is_shuffled:
+            self._random_state.shuffle(shard_order)
+            group_size = self._shuffle_shards
+        else:
+            group_size = 1
+
+        batch_size = self.batch_size
+        remainder = None  # the items left by the last group of shards
+        for group_start in range(0, len(shard_order), group_size):
+            shards = [self._load_shard(i) for i in
+                      shard_order[group_start: group_start + group_size]]
+            if remainder is not None:
+                shards.insert(0, remainder)
+            if len(shards) == 1:
+                arrays = shards[0]
+            else:
+                arrays = tuple(np.concatenate(a) for a in zip(*shards))
+            if self.is_shuffled:
+                perm = self._random_state.permutation(len(arrays[0]))
+                arrays = tuple(a[perm] for a in arrays)
+            for a in arrays:
+                a.setflags(write=False)
+
+            # yield the complete mini-batches, and keep the remainder
+            length = len(arrays[0])
+            stop = (length // batch_size) * batch_size
+            for start in range(0, stop, batch_size):
+                yield tuple(a[start: start + batch_size] for a in arrays)
+            remainder = tuple(a[stop:] for a in arrays) \
+                if stop < length else None
+
+        if remainder is not None and not self.skip_incomplete:
+            yield remainder
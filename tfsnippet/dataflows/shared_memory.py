@@ -0,0 +1,210 @@
+import multiprocessing
+
+import numpy as np
+
+from .base import ExtraInfoDataFlow
+
+__all__ = ['SharedMemoryRingBuffer']
+
+
+class SharedMemoryRingBuffer(object):
+    """
+    A ring buffer of pre-allocated mini-batch slots in shared memory.
+
+    Each slot can hold one mini-batch, with at most `batch_size` items.
+    A worker process may write a mini-batch into a slot in place, and
+    the consumer process may read it as read-only numpy views, without
+    pickling or copying the arrays across the process boundary.
+
+    The buffer must be constructed before the worker processes are started,
+    such that the shared memory can be inherited by the workers.  Also, it
+    is the caller's duty to ensure a slot is not written while its content
+    is still being used.
+
+    Usage::
+
+        buffer = SharedMemoryRingBuffer.from_flow(array_flow, slot_count=8)
+
+        # in the worker process
+        length = buffer.write(slot, batch)
+
+        # in the consumer process
+        batch = buffer.read(slot, length)
+    """
+
+    def __init__(self, slot_count, batch_size, data_shapes, data_dtypes):
+        """
+        Construct a new :class:`SharedMemoryRingBuffer`.
+
+        Args:
+            slot_count (int): The number of mini-batch slots.
+            batch_size (int): The maximum size of each mini-batch.
+            data_shapes (Iterable[tuple[int]]): The shapes of data in a
+                mini-batch.  The batch dimension is not included.
+            data_dtypes (Iterable[np.dtype]): The dtypes of data in a
+                mini-batch.
+        """
+        data_shapes = tuple(tuple(int(s) for s in shape)
+                            for shape in data_shapes)
+        data_dtypes = tuple(np.dtype(dtype) for dtype in data_dtypes)
+        if slot_count < 1:
+            raise ValueError('`slot_count` must be at least 1')
+        if batch_size < 1:
+            raise ValueError('`batch_size` must be at least 1')
+        if not data_shapes:
+            raise ValueError('`data_shapes` must not be empty.')
+        if len(data_shapes) != len(data_dtypes):
+            raise ValueError('`data_shapes` and `data_dtypes` must have the '
+                             'same length: {} vs {}.'.
+                             format(len(data_shapes), len(data_dtypes)))
+
+        self._slot_count = slot_count
+        self._batch_size = batch_size
+        self._data_shapes = data_shapes
+        self._data_dtypes = data_dtypes
+
+        # allocate the shared memory for each array, in which all the slots
+        # are laid out contiguously
+        self._buffers = []
+        for shape, dtype in zip(data_shapes, data_dtypes):
+            n_bytes = self._slot_array_size(shape) * dtype.itemsize
+            self._buffers.append(
+                multiprocessing.RawArray('b', max(n_bytes, 1)))
+        self._arrays = self._make_arrays()
+
+    def _slot_array_size(self, shape):
+        return int(np.prod((self._slot_count, self._batch_size) + shape,
+                           dtype=np.int64))
+
+    def _make_arrays(self):
+        return [
+            np.frombuffer(buf, dtype=dtype,
+                          count=self._slot_array_size(shape)).
+            reshape((self._slot_count, self._batch_size) + shape)
+            for buf, shape, dtype in zip(
+                self._buffers, self._data_shapes, self._data_dtypes)
+        ]
+
+    @classmethod
+    def from_flow(cls, flow, slot_count):
+        """
+        Construct a :class:`SharedMemoryRingBuffer` for the mini-batches
+        of an :class:`ExtraInfoDataFlow`.
+
+        Args:
+            flow (ExtraInfoDataFlow): The data flow.
+            slot_count (int): The number of mini-batch slots.
+
+        Returns:
+            SharedMemoryRingBuffer: The constructed ring buffer.
+
+        Raises:
+            TypeError: If `flow` is not an :class:`ExtraInfoDataFlow`.
+            ValueError: If the data dtypes of `flow` is unknown.
+        """
+        if not isinstance(flow, ExtraInfoDataFlow):
+            raise TypeError('`flow` must be an ExtraInfoDataFlow: {!r}'.
+                            format(flow))
+        if flow.data_dtypes is None or \
+                any(dtype is None for dtype in flow.data_dtypes):
+            raise ValueError('The data dtypes of `flow` is unknown: {!r}'.
+                             format(flow))
+        return cls(slot_count=slot_count, batch_size=flow.batch_size,
+                   data_shapes=flow.data_shapes, data_dtypes=flow.data_dtypes)
+
+    def __getstate__(self):
+        # only the shared memory buffers should be passed to other processes,
+        # and the numpy views will be re-constructed from these buffers
+        return {
+            '_slot_count': self._slot_count,
+            '_batch_size': self._batch_size,
+            '_data_shapes': self._data_shapes,
+            '_data_dtypes': self._data_dtypes,
+            '_buffers': self._buffers,
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._arrays = self._make_arrays()
+
+    @property
+    def slot_count(self):
+        """Get the number of mini-batch slots."""
+        return self._slot_count
+
+    @property
+    def batch_size(self):
+        """Get the maximum size of each mini-batch."""
+        return self._batch_size
+
+    @property
+    def data_shapes(self):
+        """Get the shapes of data in a mini-batch."""
+        return self._data_shapes
+
+    @property
+    def data_dtypes(self):
+        """Get the dtypes of data in a mini-batch."""
+        return self._data_dtypes
+
+    def write(self, slot, batch):
+        """
+        Write a mini-batch into the specified slot.
+
+        Args:
+            slot (int): The index of the slot.
+            batch (tuple[np.ndarray]): The mini-batch arrays.
+
+        Returns:
+            int: The size of the written mini-batch.
+
+        Raises:
+            ValueError: If the mini-batch does not match the slot layout.
+        """
+        batch = tuple(batch)
+        if len(batch) != len(self._arrays):
+            raise ValueError('The mini-batch is expected to have {} arrays, '
+                             'but got {}.'.format(len(self._arrays),
+                                                  len(batch)))
+        length = None
+        for i, (arr, shape, dtype) in enumerate(
+                zip(batch, self._data_shapes, self._data_dtypes)):
+            arr = np.asarray(arr)
+            if arr.shape[1:] != shape or arr.dtype != dtype:
+                raise ValueError(
+                    'The array {} of the mini-batch does not match the slot '
+                    'layout: got shape {!r} and dtype {}, but expected shape '
+                    '{!r} and dtype {}.'.format(i, arr.shape[1:], arr.dtype,
+                                                shape, dtype)
+                )
+            if length is None:
+                length = len(arr)
+            elif len(arr) != length:
+                raise ValueError('The arrays of the mini-batch must have the '
+                                 'same length.')
+            if length > self._batch_size:
+                raise ValueError('The mini-batch size {} exceeds the batch '
+                                 'size of the slot {}.'.
+                                 format(length, self._batch_size))
+        for arr, dst in zip(batch, self._arrays):
+            dst[slot, :length, ...] = arr
+        return length
+
+    def read(self, slot, length):
+        """
+        Read a mini-batch from the specified slot.
+
+        Args:
+            slot (int): The index of the slot.
+            length (int): The size of the mini-batch.
+
+        Returns:
+            tuple[np.ndarray]: Read-only views of the mini-batch arrays.
+                The views are only valid before the slot is written again.
+        """
+        ret = []
+        for arr in self._arrays:
+            view = arr[slot, :length, ...]
+            view.setflags(write=False)
+            ret.append(view)
+        return tuple(ret)
@@ -0,0 +1,152 @@
+import numpy as np
+
+from tfsnippet.utils import generate_random_seed
+from .base import DataFlow
+
+__all__ = ['ShuffleBufferFlow']
+
+
+class ShuffleBufferFlow(DataFlow):
+    """
+    Data flow which approximately shuffles the samples of a streaming
+    source flow, through a fixed-size shuffling buffer.
+
+    The samples from the source flow are copied into pre-allocated arrays
+    of `buffer_size` slots.  Once the buffer is full, a mini-batch of
+    `batch_size` samples will be drawn from random slots, whose slots are
+    then refilled by the following samples from the source.  At the end of
+    each epoch, the remaining samples in the buffer are drained in random
+    order.  The memory usage is thus bounded by the buffer size, no matter
+    how large the source is.
+
+    Usage::
+
+        source_flow = DataFlow.iterator_factory(read_batches_from_files)
+        shuffled_flow = source_flow.shuffle_buffer(
+            buffer_size=10000, batch_size=256)
+    """
+
+    def __init__(self, source, buffer_size, batch_size,
+                 skip_incomplete=False, random_state=None):
+        """
+        Construct a :class:`ShuffleBufferFlow`.
+
+        Args:
+            source (DataFlow): The source data flow.
+            buffer_size (int): The number of samples in the shuffling
+                buffer.  It should be at least `batch_size`.
+            batch_size (int): Size of each mini-batch.
+            skip_incomplete (bool): Whether or not to exclude the last
+                mini-batch if it is incomplete? (default :obj:`False`)
+            random_state (RandomState): Optional numpy RandomState for
+                shuffling data.  (default :obj:`None`, construct a new
+                :class:`RandomState`).
+        """
+        if batch_size < 1:
+            raise ValueError('`batch_size` must be at least 1')
+        if buffer_size < batch_size:
+            raise ValueError('`buffer_size` must be at least `batch_size`: '
+                             '{} vs {}'.format(buffer_size, batch_size))
+        self._source = source
+        self._buffer_size = buffer_size
+        self._batch_size = batch_size
+        self._skip_incomplete = skip_incomplete
+        self._random_state = \
+            random_state or np.random.RandomState(generate_random_seed())
+
+        # the pre-allocated buffer arrays, created at the first mini-batch
+        self._buffers = None
+
+    @property
+    def source(self):
+        """Get the source data flow."""
+        return self._source
+
+    @property
+    def buffer_size(self):
+        """Get the number of samples in the shuffling buffer."""
+        return self._buffer_size
+
+    @property
+    def batch_size(self):
+        """Get the size of each mini-batch."""
+        return self._batch_size
+
+    @property
+    def skip_incomplete(self):
+        """
+        Whether or not to exclude the last mini-batch if it is incomplete?
+        """
+        return self._skip_incomplete
+
+    def _sample_slots(self, count):
+        # sample `count` distinct slots from the buffer.  When the buffer is
+        # much larger than `count`, rejecting duplicated random integers is
+        # much cheaper than permuting the whole buffer.
+        n = self._buffer_size
+        if count * 4 <= n:
+            for _ in range(3):
+                slots = self._random_state.randint(0, n, size=2 * count)
+                _, first = np.unique(slots, return_index=True)
+                if len(first) >= count:
+                    first.sort()
+                    return slots[first[:count]]
+        return self._random_state.permutation(n)[:count]
+
+    def _check_batch(self, batch):
+        batch = tuple(batch)
+        if self._buffers is None:
+            self._buffers = tuple(
+                np.empty((self._buffer_size,) + np.shape(arr)[1:],
+                         dtype=np.asarray(arr).dtype)
+                for arr in batch
+            )
+        elif len(batch) != len(self._buffers):
+            raise ValueError('The number of arrays in the mini-batch does '
+                             'not match the buffer: {} vs {}'.
+                             format(len(batch), len(self._buffers)))
+        for arr, buf in zip(batch, self._buffers):
+            if np.shape(arr)[1:] != buf.shape[1:]:
+                raise ValueError('The shape of the mini-batch arrays does not '
+                                 'match the buffer: {!r} vs {!r}'.
+                                 format(np.shape(arr)[1:], buf.shape[1:]))
+        return batch
+
+    def _minibatch_iterator(self):
+        # the indices of the free slots in the buffer are kept in
+        # `free_slots[:free_count]`
+        free_slots = np.arange(self._buffer_size)
+        free_count = self._buffer_size
+
+        for batch in self._source:
+            batch = self._check_batch(batch)
+            length = len(batch[0])
+            pos = 0
+            while pos < length:
+                # fill the free slots with the incoming samples
+                size = min(length - pos, free_count)
+                slots = free_slots[free_count - size: free_count]
+                for arr, buf in zip(batch, self._buffers):
+                    buf[slots] = arr[pos: pos + size]
+                free_count -= size
+                pos += size
+
+                # draw a mini-batch from the buffer, if it is full
+                if free_count == 0:
+                    slots = self._sample_slots(self._batch_size)
+                    yield tuple(buf[slots] for buf in self._buffers)
+                    free_slots[:self._batch_size] = slots
+                    free_count = self._batch_size
+
+        # drain the remaining samples in the buffer
+        if self._buffers is not None:
+            is_filled = np.ones([self._buffer_size], dtype=np.bool_)
+            is_filled[free_slots[:free_count]] = False
+            slots = np.where(is_filled)[0]
+            self._random_state.shuffle(slots)
+            for start in range(0, len(slots), self._batch_size):
+                batch_slots = slots[start: start + self._batch_size]
+                if len(batch_slots) < self._batch_size and \
+                        self._skip_incomplete:
+                    break
+                yield tuple(buf[batch_slots] for buf in self._buffers)
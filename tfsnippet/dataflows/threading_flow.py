@@ -3,8 +3,10 @@ from threading import Thread, Semaphore
 import six
 from logging import getLogger
 
-from tfsnippet.utils import AutoInitAndCloseable
-from .base import DataFlow
+from tfsnippet.utils import AutoInitAndCloseable, CheckpointSavableObject
+from .array_flow import _check_gather_buffers
+from .base import DataFlow, _is_state_supported, _get_flow_state, \
+    _set_flow_state
 
 if six.PY2:
     from Queue import Queue
@@ -14,7 +16,7 @@ else:
 __all__ = ['ThreadingFlow']
 
 
-class ThreadingFlow(DataFlow, AutoInitAndCloseable):
+class ThreadingFlow(DataFlow, AutoInitAndCloseable, CheckpointSavableObject):
     """
     Data flow to prefetch from the source data flow in a background thread.
 
@@ -25,6 +27,11 @@ class ThreadingFlow(DataFlow, AutoInitAndCloseable):
             for epoch in epochs:
                 for batch_x, batch_y in df:
                     ...
+
+    If the source flow supports :meth:`get_state` and :meth:`set_state`,
+    the iteration state of this flow can also be saved and restored.  The
+    state reflects the mini-batches consumed from this flow, rather than
+    those prefetched by the background worker.
     """
 
     EPOCH_END = object()
@@ -37,11 +44,17 @@ class ThreadingFlow(DataFlow, AutoInitAndCloseable):
         Args:
             source (DataFlow): The source data flow.
             prefetch (int): Number of mini-batches to prefetch ahead.
-                It should be at least 1.
+                It should be at least 1.  If `source` is a shuffled
+                :class:`ArrayFlow` with `gather_buffers`, it should have
+                at least ``prefetch + 2`` buffers.
         """
         # check the parameters
         if prefetch < 1:
             raise ValueError('`prefetch_num` must be at least 1')
+        _check_gather_buffers(
+            source, prefetch + 2, 'ThreadingFlow with `prefetch` = {}'.
+            format(prefetch)
+        )
 
         # memorize the parameters
         self._source = source
@@ -55,6 +68,15 @@ class ThreadingFlow(DataFlow, AutoInitAndCloseable):
         self._worker_alive = None
         self._worker_ready_sem = None
 
+        # states of the source flow at the beginning of each epoch, captured
+        # by the background worker before iterating through the epoch
+        self._source_states = None
+        # internal states for the active epoch, and for resuming an epoch
+        self._batch_cursor = None
+        self._resume_cursor = None
+        # number of mini-batches consumed in the last epoch
+        self._exit_cursor = None
+
     @property
     def source(self):
         """Get the source data flow."""
@@ -65,19 +87,101 @@ class ThreadingFlow(DataFlow, AutoInitAndCloseable):
         """Get the number of batches to prefetch."""
         return self._prefetch_num
 
+    @property
+    def _state_supported(self):
+        return _is_state_supported(self.source)
+
+    def get_state(self):
+        """
+        Get the iteration state of this flow.
+
+        If the consumer has broken out of the last epoch early (e.g., when
+        the training loop reaches `max_step`), the returned state will
+        resume the rest of that epoch.
+
+        Returns:
+            dict: The state dict, with the state of the source flow at the
+                beginning of the active epoch, and the number of mini-batches
+                already consumed in the active epoch.
+
+        Raises:
+            TypeError: If the source flow does not support saving the
+                iteration state.
+        """
+        if self._batch_cursor is not None:
+            batch_cursor = self._batch_cursor
+        else:
+            batch_cursor = self._resume_cursor or 0
+        if self._initialized and self._state_supported:
+            # the worker may have iterated ahead of the active epoch, thus
+            # we must use the source state captured at the epoch beginning
+            source_state = self._source_states.get(self._epoch_counter)
+            if source_state is None:
+                # the consumer has broken out of the last epoch before the
+                # worker has finished it, thus the source state of the next
+                # epoch is not captured yet.  Resume the last epoch instead.
+                source_state = self._source_states[self._epoch_counter - 1]
+                batch_cursor = self._exit_cursor
+        else:
+            source_state = _get_flow_state(self.source)
+        return {'source': source_state, 'batch_cursor': batch_cursor}
+
+    def set_state(self, state):
+        """
+        Set the iteration state of this flow.
+
+        The background worker will be stopped, discarding all prefetched
+        mini-batches, and re-started at the next epoch.
+
+        Args:
+            state (dict): The state dict obtained by :meth:`get_state`.
+
+        Raises:
+            TypeError: If the source flow does not support restoring the
+                iteration state.
+        """
+        self.close()
+        _set_flow_state(self.source, state)
+        self._resume_cursor = state['batch_cursor'] or None
+
+    def _get_queue_fill(self):
+        batch_queue = self._batch_queue
+        if batch_queue is not None:
+            return float(batch_queue.qsize()) / self.prefetch_num
+
+    def _capture_source_state(self, epoch):
+        if self._state_supported:
+            self._source_states[epoch] = self.source.get_state()
+
+    def _iter_source(self):
+        """
+        Get the iterator of the source mini-batches in the background worker.
+        Subclasses may override this to change how the mini-batches are
+        produced, while keeping the epoch management of this class.
+
+        Returns:
+            Iterator[tuple[np.ndarray]]: The mini-batch iterator.
+        """
+        return iter(self.source)
+
     def _worker_func(self):
         active_epoch = self._epoch_counter
+        self._capture_source_state(active_epoch)
         self._worker_alive = True
         self._worker_ready_sem.release()
 
         try:
             while not self._stopping:
                 # iterate through the mini-batches in the current epoch
-                for batch in self.source:
+                for batch in self._iter_source():
                     if self._stopping or active_epoch < self._epoch_counter:
                         break
                     self._batch_queue.put((active_epoch, batch))
 
+                # capture the source state for the next epoch, before the
+                # consumer may move to the next epoch
+                self._capture_source_state(active_epoch + 1)
+
                 # put the epoch ending mark into the queue
                 if not self._stopping:
                     self._batch_queue.put((active_epoch, self.EPOCH_END))
@@ -99,6 +203,7 @@ class ThreadingFlow(DataFlow, AutoInitAndCloseable):
         self._epoch_counter = 0
         self._stopping = False
         self._worker_ready_sem = Semaphore(value=0)
+        self._source_states = {}
 
         # create and start the worker
         self._worker = Thread(target=self._worker_func)
@@ -121,10 +226,16 @@ class ThreadingFlow(DataFlow, AutoInitAndCloseable):
             self._worker = None
             self._batch_queue = None
             self._worker_ready_sem = None
+            self._source_states = None
             self._initialized = False
 
     def _minibatch_iterator(self):
         self.init()
+        self._batch_cursor = self._resume_cursor or 0
+        self._resume_cursor = None
+        for epoch in list(self._source_states):
+            if epoch < self._epoch_counter:
+                del self._source_states[epoch]
 
         try:
             # iterate through one epoch
@@ -144,6 +255,9 @@ class ThreadingFlow(DataFlow, AutoInitAndCloseable):
                 else:
                     # we've got a normal batch for the current epoch,
                     # so yield it
+                    self._batch_cursor += 1
                     yield payload
         finally:
+            self._exit_cursor = self._batch_cursor
+            self._batch_cursor = None
             self._epoch_counter += 1
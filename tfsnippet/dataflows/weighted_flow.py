@@ -0,0 +1,319 @@
+import numpy as np
+
+from tfsnippet.utils import generate_random_seed
+from .base import ExtraInfoDataFlow
+
+__all__ = ['WeightedFlow']
+
+# the number of items in each alias table group, if not stratified
+ALIAS_GROUP_SIZE = 4096
+
+
+def build_alias_table(weights):
+    """
+    Build the alias table for sampling from a discrete distribution,
+    with the probability of each item proportional to `weights`.
+
+    This is a vectorized equivalent of Vose's algorithm: the "small" columns
+    (``q < 1``) take their alias from the "large" columns (``q >= 1``) in
+    turn, and a large column becomes small and takes the next large column
+    as its alias once its surplus is used up.  Both assignments are derived
+    from the cumulative deficits and surpluses by binary search.
+
+    Args:
+        weights (np.ndarray): The 1-d non-negative weights, whose sum must
+            be positive.
+
+    Returns:
+        (np.ndarray, np.ndarray): The probability of each column for
+            choosing the column itself, and the alias of each column.
+    """
+    n = len(weights)
+    q = np.asarray(weights, dtype=np.float64) * (n / np.sum(weights))
+    prob = np.ones([n], dtype=np.float64)
+    alias = np.arange(n)
+    small = np.where(q < 1.)[0]
+    large = np.where(q >= 1.)[0]
+    if len(small) == 0 or len(large) == 0:
+        return prob, alias
+
+    deficits = 1. - q[small]
+    cum_deficits = np.cumsum(deficits)
+    start_deficits = np.concatenate([[0.], cum_deficits[:-1]])
+    cum_surpluses = np.cumsum(q[large] - 1.)
+
+    # the small columns are served by the large column, whose surplus
+    # range covers the starting position of the deficit
+    j = np.searchsorted(cum_surpluses, start_deficits, side='right')
+    prob[small] = q[small]
+    alias[small] = large[np.minimum(j, len(large) - 1)]
+
+    # the large columns serve until the cumulative deficits exceed their
+    # surplus, then the overshoot (if a small column straddles the end of
+    # the surplus range) is served by the next large column
+    k = np.minimum(
+        np.searchsorted(cum_deficits, cum_surpluses[:-1], side='right'),
+        len(small) - 1
+    )
+    has_next = (start_deficits[k] < cum_surpluses[:-1]) & \
+        (cum_deficits[k] > cum_surpluses[:-1])
+    overshoot = cum_deficits[k] - cum_surpluses[:-1]
+    prob[large[:-1][has_next]] = 1. - overshoot[has_next]
+    alias[large[:-1][has_next]] = large[1:][has_next]
+    return prob, alias
+
+
+class WeightedFlow(ExtraInfoDataFlow):
+    """
+    Using numpy arrays as data source flow, sampling the items according
+    to their weights.
+
+    Usage::
+
+        # sample with replacement, by O(1) alias table lookups per item
+        weighted_flow = DataFlow.weighted([x, y], weights, batch_size=256)
+
+        # each mini-batch contains the same number of items of each label
+        stratified_flow = DataFlow.weighted([x, y], weights, batch_size=256,
+                                            stratify_by=y)
+
+    With replacement, the items are partitioned into groups (the labels if
+    stratified, otherwise fixed-size chunks of items), each with an alias
+    table.  An item is sampled by choosing a group (by a small alias table
+    over the total weights of the groups, or by the balanced allocation of
+    the labels if stratified), and then an item in the group.  Thus
+    :meth:`update_weights` only needs to rebuild the alias tables of the
+    affected groups.
+
+    Without replacement, each epoch is a weighted random permutation of the
+    items with positive weights (by sorting exponential random keys divided
+    by the weights).
+    """
+
+    def __init__(self, arrays, weights, batch_size, replacement=True,
+                 epoch_size=None, stratify_by=None, skip_incomplete=False,
+                 random_state=None):
+        """
+        Construct a :class:`WeightedFlow`.
+
+        Args:
+            arrays: List of numpy-like arrays, to be sampled through
+                mini-batches.  These arrays should be at least 1-d,
+                with identical first dimension.
+            weights: The 1-d non-negative sampling weights of the items.
+                If :obj:`None`, the items are weighted uniformly.
+            batch_size (int): Size of each mini-batch.
+            replacement (bool): Whether or not to sample with replacement?
+                (default :obj:`True`)
+            epoch_size (int): The number of items to sample in each epoch.
+                (default :obj:`None`, the number of items if `replacement`
+                is :obj:`True`, or the number of items with positive weights
+                if `replacement` is :obj:`False`)
+            stratify_by: If specified, the 1-d integer labels of the items.
+                Each mini-batch will contain the same number of items of
+                each label (with the remainder assigned to random labels).
+                Requires `replacement` to be :obj:`True`.
+            skip_incomplete (bool): Whether or not to exclude the last
+                mini-batch if it is incomplete? (default :obj:`False`)
+            random_state (RandomState): Optional numpy RandomState for
+                sampling.  (default :obj:`None`, construct a new
+                :class:`RandomState`).
+        """
+        arrays = tuple(arrays)
+        if not arrays:
+            raise ValueError('`arrays` must not be empty.')
+        for a in arrays:
+            if not hasattr(a, 'shape'):
+                raise ValueError('`arrays` must be numpy-like arrays.')
+            if len(a.shape) < 1:
+                raise ValueError('`arrays` must be at least 1-d arrays.')
+        length = len(arrays[0])
+        for a in arrays[1:]:
+            if len(a) != length:
+                raise ValueError('`arrays` must have the same data length.')
+
+        if weights is None:
+            weights = np.ones([length], dtype=np.float64)
+        else:
+            weights = np.array(weights, dtype=np.float64)
+        self._check_weights(weights, length)
+
+        if stratify_by is not None:
+            if not replacement:
+                raise ValueError('`stratify_by` requires `replacement` to '
+                                 'be True.')
+            stratify_by = np.asarray(stratify_by)
+            if stratify_by.shape != (length,):
+                raise ValueError('`stratify_by` must be a 1-d array with '
+                                 'the same length as `arrays`.')
+            labels, group_ids = np.unique(stratify_by, return_inverse=True)
+        else:
+            labels = None
+            group_ids = np.arange(length) // ALIAS_GROUP_SIZE
+
+        if epoch_size is None:
+            epoch_size = length if replacement else \
+                int(np.count_nonzero(weights))
+        elif not replacement and epoch_size > np.count_nonzero(weights):
+            raise ValueError('`epoch_size` must not exceed the number of '
+                             'items with positive weights, if `replacement` '
+                             'is False.')
+
+        super(WeightedFlow, self).__init__(
+            array_count=len(arrays),
+            data_length=epoch_size,
+            data_shapes=tuple(a.shape[1:] for a in arrays),
+            batch_size=batch_size,
+            skip_incomplete=skip_incomplete,
+            is_shuffled=True,
+            data_dtypes=tuple(getattr(a, 'dtype', None) for a in arrays)
+        )
+        self._arrays = arrays
+        self._weights = weights
+        self._replacement = replacement
+        self._labels = labels
+        self._random_state = \
+            random_state or np.random.RandomState(generate_random_seed())
+
+        # the items are ordered by groups, and each group occupies a
+        # contiguous range of the alias table
+        self._order = np.argsort(group_ids, kind='mergesort')
+        self._position = np.empty_like(self._order)
+        self._position[self._order] = np.arange(length)
+        group_sizes = np.bincount(group_ids)
+        self._group_sizes = group_sizes
+        self._group_offsets = np.concatenate([[0], np.cumsum(group_sizes)])
+        self._group_of_position = np.repeat(
+            np.arange(len(group_sizes)), group_sizes)
+        self._prob = np.ones([length], dtype=np.float64)
+        self._alias = np.arange(length)
+        self._group_weights = np.zeros([len(group_sizes)], dtype=np.float64)
+        self._group_table = None
+        self._dirty_groups = set(range(len(group_sizes)))
+
+    @staticmethod
+    def _check_weights(weights, length):
+        if weights.shape != (length,):
+            raise ValueError('`weights` must be a 1-d array with the same '
+                             'length as `arrays`.')
+        if not np.all(weights >= 0) or not np.all(np.isfinite(weights)):
+            raise ValueError('`weights` must be finite and non-negative.')
+        if not np.any(weights > 0):
+            raise ValueError('`weights` must have at least one positive '
+                             'value.')
+
+    @property
+    def the_arrays(self):
+        """Get the tuple of arrays accessed by this :class:`WeightedFlow`."""
+        return self._arrays
+
+    @property
+    def weights(self):
+        """Get the sampling weights of the items (read-only view)."""
+        ret = self._weights.view()
+        ret.setflags(write=False)
+        return ret
+
+    @property
+    def replacement(self):
+        """Whether or not to sample with replacement?"""
+        return self._replacement
+
+    @property
+    def labels(self):
+        """Get the distinct labels if stratified, or :obj:`None`."""
+        return self._labels
+
+    def update_weights(self, indices, weights):
+        """
+        Update the sampling weights of some items.  The alias tables of the
+        affected groups will be rebuilt before sampling the next mini-batch.
+
+        Args:
+            indices: The indices of the items.
+            weights: The new weights of the items.
+        """
+        new_weights = self._weights.copy()
+        new_weights[indices] = weights
+        self._check_weights(new_weights, len(new_weights))
+        groups = np.unique(self._group_of_position[self._position[indices]])
+        if self._labels is not None:
+            ordered_weights = new_weights[self._order]
+            for g in groups:
+                start, stop = self._group_offsets[g: g + 2]
+                if not np.any(ordered_weights[start: stop] > 0):
+                    raise ValueError('`weights` of the items with label {!r} '
+                                     'must have at least one positive value.'.
+                                     format(self._labels[g].tolist()))
+        self._weights = new_weights
+        self._dirty_groups.update(int(g) for g in groups)
+
+    def _rebuild_tables(self):
+        ordered_weights = self._weights[self._order]
+        for g in sorted(self._dirty_groups):
+            start, stop = self._group_offsets[g: g + 2]
+            w = ordered_weights[start: stop]
+            total = np.sum(w)
+            if total > 0:
+                prob, alias = build_alias_table(w)
+                self._prob[start: stop] = prob
+                self._alias[start: stop] = alias + start
+            elif self._labels is not None:
+                raise ValueError('`weights` of the items with label {!r} '
+                                 'must have at least one positive value.'.
+                                 format(self._labels[g].tolist()))
+            self._group_weights[g] = total
+        self._dirty_groups.clear()
+        if self._labels is None:
+            self._group_table = build_alias_table(self._group_weights)
+
+    def _sample_groups(self, count):
+        rs = self._random_state
+        group_count = len(self._group_sizes)
+        if self._labels is None:
+            prob, alias = self._group_table
+            g = rs.randint(group_count, size=count)
+            return np.where(rs.random_sample(count) < prob[g], g, alias[g])
+
+        # the balanced allocation of the labels, with the remainder
+        # assigned to random labels, and then shuffled
+        repeats, remainder = divmod(count, group_count)
+        groups = np.concatenate([
+            np.tile(np.arange(group_count), repeats),
+            rs.permutation(group_count)[:remainder]
+        ])
+        rs.shuffle(groups)
+        return groups
+
+    def _sample_with_replacement(self, count):
+        if self._dirty_groups:
+            self._rebuild_tables()
+        rs = self._random_state
+        groups = self._sample_groups(count)
+        positions = self._group_offsets[groups] + \
+            (rs.random_sample(count) * self._group_sizes[groups]).astype(
+                np.int64)
+        positions = np.where(rs.random_sample(count) < self._prob[positions],
+                             positions, self._alias[positions])
+        return self._order[positions]
+
+    def _minibatch_iterator(self):
+        batch_size = self.batch_size
+        epoch_size = self.data_length
+        stop = epoch_size - epoch_size % batch_size \
+            if self.skip_incomplete else epoch_size
+
+        if not self._replacement:
+            # Efraimidis-Spirakis: sort by exponential keys over weights
+            with np.errstate(divide='ignore'):
+                keys = self._random_state.standard_exponential(
+                    len(self._weights)) / self._weights
+            indices = np.argsort(keys, kind='mergesort')[:epoch_size]
+
+        for start in range(0, stop, batch_size):
+            count = min(batch_size, stop - start)
+            if self._replacement:
+                idx = self._sample_with_replacement(count)
+            else:
+                idx = indices[start: start + count]
+            yield tuple(a[idx] for a in self._arrays)
@@ -4,7 +4,8 @@ import os
 import six
 import numpy as np
 
-from tfsnippet.utils import CacheDir, validate_enum_arg
+from tfsnippet.utils import (CacheDir, Extractor, PackedArray, settings,
+                             validate_enum_arg)
 
 if six.PY2:
     import cPickle as pickle
@@ -21,22 +22,49 @@ CIFAR_100_MD5 = 'eb9058c3a382ffc7106e4002c42a8d85'
 CIFAR_100_CONTENT_DIR = 'cifar-100-python'
 
 
-def _load_batch(path, channels_last, x_shape, x_dtype, y_dtype, normalize_x,
-                expected_batch_label, labels_key='labels'):
-    # load from file
-    with open(path, 'rb') as f:
-        if six.PY2:
-            d = pickle.load(f)
-        else:
-            d = {
-                k.decode('utf-8'): v
-                for k, v in pickle.load(f, encoding='bytes').items()
-            }
-            d['batch_label'] = d['batch_label'].decode('utf-8')
+def _iter_batch_files(uri, md5, content_dir, names):
+    """
+    Iterate through the contents of the batch files.
+
+    The batch files are parsed directly from the downloaded archive,
+    without extracting it onto disk.  The extracted directory by earlier
+    versions of this module is used instead, if it exists.
+
+    Yields:
+        (str, bytes): The name and the content of each batch file.
+    """
+    cache_dir = CacheDir('cifar')
+    extract_dir = uri.rsplit('/', 1)[-1].split('.', 1)[0]
+    data_dir = os.path.join(cache_dir.resolve(extract_dir), content_dir)
+
+    if os.path.isdir(data_dir):
+        for name in names:
+            with open(os.path.join(data_dir, name), 'rb') as f:
+                yield name, f.read()
+    else:
+        archive_file = cache_dir.download(
+            uri, hasher=hashlib.md5(), expected_hash=md5)
+        entry_names = ['{}/{}'.format(content_dir, name) for name in names]
+        with Extractor.open(archive_file) as extractor:
+            for entry_name, content in extractor.iter_buffers(entry_names):
+                yield entry_name.rsplit('/', 1)[-1], content
+
+
+def _load_batch(content, channels_last, x_shape, expected_batch_label,
+                labels_key='labels'):
+    # load from the file content
+    if six.PY2:
+        d = pickle.loads(content)
+    else:
+        d = {
+            k.decode('utf-8'): v
+            for k, v in pickle.loads(content, encoding='bytes').items()
+        }
+        d['batch_label'] = d['batch_label'].decode('utf-8')
     assert(d['batch_label'] == expected_batch_label)
 
-    data = np.asarray(d['data'], dtype=x_dtype)
-    labels = np.asarray(d[labels_key], dtype=y_dtype)
+    data = np.asarray(d['data'], dtype=np.uint8)
+    labels = np.asarray(d[labels_key], dtype=np.int32)
 
     # change shape
     data = data.reshape((data.shape[0], 3, 32, 32))
@@ -45,11 +73,25 @@ def _load_batch(path, channels_last, x_shape, x_dtype, y_dtype, normalize_x,
     if x_shape:
         data = data.reshape([data.shape[0]] + list(x_shape))
 
-    # normalize x
-    if normalize_x:
-        data /= np.asarray(255., dtype=data.dtype)
+    return np.ascontiguousarray(data), labels
+
 
-    return data, labels
+def _cached_arrays(key, load):
+    """Get the arrays from the converted array cache if enabled."""
+    if not settings.cache_dataset_arrays:
+        return load()
+    return CacheDir('cifar').cached_arrays('arrays', key, load)
+
+
+def _finalize_x(x, lazy, x_dtype, normalize_x):
+    """Cast and normalize x, or wrap x in :class:`PackedArray` if lazy."""
+    if lazy:
+        return PackedArray(x, dtype=x_dtype,
+                           divisor=255. if normalize_x else None)
+    x = np.array(x, dtype=x_dtype)
+    if normalize_x:
+        x /= np.asarray(255., dtype=x.dtype)
+    return x
 
 
 def _validate_x_shape(x_shape, channels_last):
@@ -66,7 +108,7 @@ def _validate_x_shape(x_shape, channels_last):
 
 
 def load_cifar10(channels_last=True, x_shape=None, x_dtype=np.float32,
-                 y_dtype=np.int32, normalize_x=False):
+                 y_dtype=np.int32, normalize_x=False, lazy=False):
     """
     Load the CIFAR-10 dataset as NumPy arrays.
 
@@ -80,47 +122,65 @@ def load_cifar10(channels_last=True, x_shape=None, x_dtype=np.float32,
         y_dtype: Cast each label into this data type.  Default `np.int32`.
         normalize_x (bool): Whether or not to normalize x into ``[0, 1]``,
             by dividing each pixel value with 255.?  (default :obj:`False`)
+        lazy (bool): If :obj:`True`, keep x in the native `np.uint8`
+            storage, and return :class:`~tfsnippet.utils.PackedArray`
+            for x, which casts (and normalizes) each indexed mini-batch.
+            (default :obj:`False`)
 
     Returns:
         (np.ndarray, np.ndarray), (np.ndarray, np.ndarray): The
-            (train_x, train_y), (test_x, test_y)
+            (train_x, train_y), (test_x, test_y).  If `lazy` is
+            :obj:`True`, `train_x` and `test_x` are
+            :class:`~tfsnippet.utils.PackedArray`.
     """
     # check the arguments
     x_shape = _validate_x_shape(x_shape, channels_last)
 
-    # fetch data
-    path = CacheDir('cifar').download_and_extract(
-        CIFAR_10_URI, hasher=hashlib.md5(), expected_hash=CIFAR_10_MD5)
-    data_dir = os.path.join(path, CIFAR_10_CONTENT_DIR)
-
     # load the data
-    train_num = 50000
-    train_x = np.zeros((train_num,) + x_shape, dtype=x_dtype)
-    train_y = np.zeros((train_num,), dtype=y_dtype)
-
-    for i in range(1, 6):
-        path = os.path.join(data_dir, 'data_batch_{}'.format(i))
-        x, y = _load_batch(
-            path, channels_last=channels_last, x_shape=x_shape,
-            x_dtype=x_dtype, y_dtype=y_dtype, normalize_x=normalize_x,
-            expected_batch_label='training batch {} of 5'.format(i)
-        )
-        (train_x[(i - 1) * 10000: i * 10000, ...],
-         train_y[(i - 1) * 10000: i * 10000]) = x, y
-
-    path = os.path.join(data_dir, 'test_batch')
-    test_x, test_y = _load_batch(
-        path, channels_last=channels_last, x_shape=x_shape,
-        x_dtype=x_dtype, y_dtype=y_dtype, normalize_x=normalize_x,
-        expected_batch_label='testing batch 1 of 1'
-    )
+    def load():
+        train_num = 50000
+        train_x = np.zeros((train_num,) + x_shape, dtype=np.uint8)
+        train_y = np.zeros((train_num,), dtype=np.int32)
+        test_x = test_y = None
+        names = ['data_batch_{}'.format(i) for i in range(1, 6)] + \
+            ['test_batch']
+        loaded = []
+
+        for name, content in _iter_batch_files(
+                CIFAR_10_URI, CIFAR_10_MD5, CIFAR_10_CONTENT_DIR, names):
+            if name == 'test_batch':
+                test_x, test_y = _load_batch(
+                    content, channels_last=channels_last, x_shape=x_shape,
+                    expected_batch_label='testing batch 1 of 1'
+                )
+            else:
+                i = int(name.rsplit('_', 1)[-1])
+                x, y = _load_batch(
+                    content, channels_last=channels_last, x_shape=x_shape,
+                    expected_batch_label='training batch {} of 5'.format(i)
+                )
+                (train_x[(i - 1) * 10000: i * 10000, ...],
+                 train_y[(i - 1) * 10000: i * 10000]) = x, y
+            loaded.append(name)
+
+        assert(sorted(loaded) == sorted(names))
+        return train_x, train_y, test_x, test_y
+
+    train_x, train_y, test_x, test_y = _cached_arrays(
+        [CIFAR_10_MD5, channels_last, list(x_shape)], load)
+    assert(len(train_x) == len(train_y) == 50000)
     assert(len(test_x) == len(test_y) == 10000)
 
+    train_x = _finalize_x(train_x, lazy, x_dtype, normalize_x)
+    test_x = _finalize_x(test_x, lazy, x_dtype, normalize_x)
+    train_y = np.array(train_y, dtype=y_dtype)
+    test_y = np.array(test_y, dtype=y_dtype)
     return (train_x, train_y), (test_x, test_y)
 
 
 def load_cifar100(label_mode='fine', channels_last=True, x_shape=None,
-                  x_dtype=np.float32, y_dtype=np.int32, normalize_x=False):
+                  x_dtype=np.float32, y_dtype=np.int32, normalize_x=False,
+                  lazy=False):
     """
     Load the CIFAR-100 dataset as NumPy arrays.
 
@@ -135,37 +195,46 @@ def load_cifar100(label_mode='fine', channels_last=True, x_shape=None,
         y_dtype: Cast each label into this data type.  Default `np.int32`.
         normalize_x (bool): Whether or not to normalize x into ``[0, 1]``,
             by dividing each pixel value with 255.?  (default :obj:`False`)
+        lazy (bool): If :obj:`True`, keep x in the native `np.uint8`
+            storage, and return :class:`~tfsnippet.utils.PackedArray`
+            for x, which casts (and normalizes) each indexed mini-batch.
+            (default :obj:`False`)
 
     Returns:
         (np.ndarray, np.ndarray), (np.ndarray, np.ndarray): The
-            (train_x, train_y), (test_x, test_y)
+            (train_x, train_y), (test_x, test_y).  If `lazy` is
+            :obj:`True`, `train_x` and `test_x` are
+            :class:`~tfsnippet.utils.PackedArray`.
     """
     # check the arguments
     label_mode = validate_enum_arg('label_mode', label_mode, ('fine', 'coarse'))
     x_shape = _validate_x_shape(x_shape, channels_last)
 
-    # fetch data
-    path = CacheDir('cifar').download_and_extract(
-        CIFAR_100_URI, hasher=hashlib.md5(), expected_hash=CIFAR_100_MD5)
-    data_dir = os.path.join(path, CIFAR_100_CONTENT_DIR)
-
     # load the data
-    path = os.path.join(data_dir, 'train')
-    train_x, train_y = _load_batch(
-        path, channels_last=channels_last, x_shape=x_shape,
-        x_dtype=x_dtype, y_dtype=y_dtype, normalize_x=normalize_x,
-        expected_batch_label='training batch 1 of 1',
-        labels_key='{}_labels'.format(label_mode)
-    )
+    def load():
+        batches = {}
+        expected_batch_labels = {'train': 'training batch 1 of 1',
+                                 'test': 'testing batch 1 of 1'}
+
+        for name, content in _iter_batch_files(
+                CIFAR_100_URI, CIFAR_100_MD5, CIFAR_100_CONTENT_DIR,
+                ['train', 'test']):
+            batches[name] = _load_batch(
+                content, channels_last=channels_last, x_shape=x_shape,
+                expected_batch_label=expected_batch_labels[name],
+                labels_key='{}_labels'.format(label_mode)
+            )
+
+        assert(sorted(batches) == ['test', 'train'])
+        return batches['train'] + batches['test']
+
+    train_x, train_y, test_x, test_y = _cached_arrays(
+        [CIFAR_100_MD5, label_mode, channels_last, list(x_shape)], load)
     assert(len(train_x) == len(train_y) == 50000)
-
-    path = os.path.join(data_dir, 'test')
-    test_x, test_y = _load_batch(
-        path, channels_last=channels_last, x_shape=x_shape,
-        x_dtype=x_dtype, y_dtype=y_dtype, normalize_x=normalize_x,
-        expected_batch_label='testing batch 1 of 1',
-        labels_key='{}_labels'.format(label_mode)
-    )
     assert(len(test_x) == len(test_y) == 10000)
 
+    train_x = _finalize_x(train_x, lazy, x_dtype, normalize_x)
+    test_x = _finalize_x(test_x, lazy, x_dtype, normalize_x)
+    train_y = np.array(train_y, dtype=y_dtype)
+    test_y = np.array(test_y, dtype=y_dtype)
     return (train_x, train_y), (test_x, test_y)
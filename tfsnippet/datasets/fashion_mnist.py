@@ -1,10 +1,6 @@
-import gzip
-import hashlib
-
 import numpy as np
-import idx2numpy
 
-from tfsnippet.utils import CacheDir
+from .mnist import _load_mnist_like
 
 __all__ = ['load_fashion_mnist']
 
@@ -19,24 +15,8 @@ TEST_Y_URI = 'http://fashion-mnist.s3-website.eu-central-1.amazonaws.com/t10k-la
 TEST_Y_MD5 = 'bb300cfdad3c16e7a12a480ee83cd310'
 
 
-def _fetch_array(uri, md5):
-    """Fetch an MNIST array from the `uri` with cache."""
-    path = CacheDir('fashion_mnist').download(
-        uri, hasher=hashlib.md5(), expected_hash=md5)
-    with gzip.open(path, 'rb') as f:
-        return idx2numpy.convert_from_file(f)
-
-
-def _validate_x_shape(x_shape):
-    x_shape = tuple([int(v) for v in x_shape])
-    if np.prod(x_shape) != 784:
-        raise ValueError('`x_shape` does not product to 784: {!r}'.
-                         format(x_shape))
-    return x_shape
-
-
 def load_fashion_mnist(x_shape=(28, 28), x_dtype=np.float32,
-                       y_dtype=np.int32, normalize_x=False):
+                       y_dtype=np.int32, normalize_x=False, lazy=False):
     """
     Load the Fashion MNIST dataset as NumPy arrays.
 
@@ -48,30 +28,21 @@ def load_fashion_mnist(x_shape=(28, 28), x_dtype=np.float32,
         y_dtype: Cast each label into this data type.  Default `np.int32`.
         normalize_x (bool): Whether or not to normalize x into ``[0, 1]``,
             by dividing each pixel value with 255.?  (default :obj:`False`)
+        lazy (bool): If :obj:`True`, keep x in the native `np.uint8`
+            storage, and return :class:`~tfsnippet.utils.PackedArray`
+            for x, which casts (and normalizes) each indexed mini-batch.
+            (default :obj:`False`)
 
     Returns:
         (np.ndarray, np.ndarray), (np.ndarray, np.ndarray): The
-            (train_x, train_y), (test_x, test_y)
+            (train_x, train_y), (test_x, test_y).  If `lazy` is
+            :obj:`True`, `train_x` and `test_x` are
+            :class:`~tfsnippet.utils.PackedArray`.
     """
-    # check arguments
-    x_shape = _validate_x_shape(x_shape)
-
-    # load data
-    train_x = _fetch_array(TRAIN_X_URI, TRAIN_X_MD5).astype(x_dtype)
-    train_y = _fetch_array(TRAIN_Y_URI, TRAIN_Y_MD5).astype(y_dtype)
-    test_x = _fetch_array(TEST_X_URI, TEST_X_MD5).astype(x_dtype)
-    test_y = _fetch_array(TEST_Y_URI, TEST_Y_MD5).astype(y_dtype)
-
-    assert(len(train_x) == len(train_y) == 60000)
-    assert(len(test_x) == len(test_y) == 10000)
-
-    # change shape
-    train_x = train_x.reshape([len(train_x)] + list(x_shape))
-    test_x = test_x.reshape([len(test_x)] + list(x_shape))
-
-    # normalize x
-    if normalize_x:
-        train_x /= np.asarray(255., dtype=train_x.dtype)
-        test_x /= np.asarray(255., dtype=test_x.dtype)
-
-    return (train_x, train_y), (test_x, test_y)
+    return _load_mnist_like(
+        'fashion_mnist',
+        [(TRAIN_X_URI, TRAIN_X_MD5), (TRAIN_Y_URI, TRAIN_Y_MD5),
+         (TEST_X_URI, TEST_X_MD5), (TEST_Y_URI, TEST_Y_MD5)],
+        x_shape=x_shape, x_dtype=x_dtype, y_dtype=y_dtype,
+        normalize_x=normalize_x, lazy=lazy
+    )
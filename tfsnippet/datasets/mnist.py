@@ -4,7 +4,8 @@ import hashlib
 import numpy as np
 import idx2numpy
 
-from tfsnippet.utils import CacheDir
+from tfsnippet.utils import CacheDir, settings
+from .cifar import _finalize_x
 
 __all__ = ['load_mnist']
 
@@ -19,14 +20,37 @@ TEST_Y_URI = 'http://yann.lecun.com/exdb/mnist/t10k-labels-idx1-ubyte.gz'
 TEST_Y_MD5 = 'ec29112dd5afa0611ce80d1b7f02629c'
 
 
-def _fetch_array(uri, md5):
-    """Fetch an MNIST array from the `uri` with cache."""
-    path = CacheDir('mnist').download(
-        uri, hasher=hashlib.md5(), expected_hash=md5)
+def _fetch_array(cache_dir, uri, md5):
+    """Fetch an MNIST-like array from the `uri` with cache."""
+    path = cache_dir.download(uri, hasher=hashlib.md5(), expected_hash=md5)
     with gzip.open(path, 'rb') as f:
         return idx2numpy.convert_from_file(f)
 
 
+def _load_arrays(cache_name, resources, x_shape):
+    """
+    Load the arrays of an MNIST-like dataset with native data types, from
+    the converted array cache if enabled.
+
+    Args:
+        cache_name (str): Name of the cache directory.
+        resources: The ``(uri, md5)`` of train_x, train_y, test_x and test_y.
+        x_shape (tuple[int]): Reshape each image into this shape.
+    """
+    cache_dir = CacheDir(cache_name)
+
+    def load():
+        train_x, train_y, test_x, test_y = [
+            _fetch_array(cache_dir, uri, md5) for uri, md5 in resources]
+        return (train_x.reshape([len(train_x)] + list(x_shape)), train_y,
+                test_x.reshape([len(test_x)] + list(x_shape)), test_y)
+
+    if not settings.cache_dataset_arrays:
+        return load()
+    key = [md5 for _, md5 in resources] + [list(x_shape)]
+    return cache_dir.cached_arrays('arrays', key, load)
+
+
 def _validate_x_shape(x_shape):
     x_shape = tuple([int(v) for v in x_shape])
     if np.prod(x_shape) != 784:
@@ -35,8 +59,34 @@ def _validate_x_shape(x_shape):
     return x_shape
 
 
+def _load_mnist_like(cache_name, resources, x_shape, x_dtype, y_dtype,
+                     normalize_x, lazy):
+    """
+    Load an MNIST-like dataset as NumPy arrays.
+
+    See :func:`load_mnist` for the arguments `x_shape`, `x_dtype`,
+    `y_dtype`, `normalize_x` and `lazy`, and :func:`_load_arrays` for
+    `cache_name` and `resources`.
+    """
+    # check arguments
+    x_shape = _validate_x_shape(x_shape)
+
+    # load data
+    train_x, train_y, test_x, test_y = \
+        _load_arrays(cache_name, resources, x_shape)
+    assert(len(train_x) == len(train_y) == 60000)
+    assert(len(test_x) == len(test_y) == 10000)
+
+    # cast and normalize x, or keep x in the native storage if lazy
+    train_x = _finalize_x(train_x, lazy, x_dtype, normalize_x)
+    test_x = _finalize_x(test_x, lazy, x_dtype, normalize_x)
+    train_y = np.array(train_y, dtype=y_dtype)
+    test_y = np.array(test_y, dtype=y_dtype)
+    return (train_x, train_y), (test_x, test_y)
+
+
 def load_mnist(x_shape=(28, 28), x_dtype=np.float32, y_dtype=np.int32,
-               normalize_x=False):
+               normalize_x=False, lazy=False):
     """
     Load the MNIST dataset as NumPy arrays.
 
@@ -46,30 +96,21 @@ def load_mnist(x_shape=(28, 28), x_dtype=np.float32, y_dtype=np.int32,
         y_dtype: Cast each label into this data type.  Default `np.int32`.
         normalize_x (bool): Whether or not to normalize x into ``[0, 1]``,
             by dividing each pixel value with 255.?  (default :obj:`False`)
+        lazy (bool): If :obj:`True`, keep x in the native `np.uint8`
+            storage, and return :class:`~tfsnippet.utils.PackedArray`
+            for x, which casts (and normalizes) each indexed mini-batch.
+            (default :obj:`False`)
 
     Returns:
         (np.ndarray, np.ndarray), (np.ndarray, np.ndarray): The
-            (train_x, train_y), (test_x, test_y)
+            (train_x, train_y), (test_x, test_y).  If `lazy` is
+            :obj:`True`, `train_x` and `test_x` are
+            :class:`~tfsnippet.utils.PackedArray`.
     """
-    # check arguments
-    x_shape = _validate_x_shape(x_shape)
-
-    # load data
-    train_x = _fetch_array(TRAIN_X_URI, TRAIN_X_MD5).astype(x_dtype)
-    train_y = _fetch_array(TRAIN_Y_URI, TRAIN_Y_MD5).astype(y_dtype)
-    test_x = _fetch_array(TEST_X_URI, TEST_X_MD5).astype(x_dtype)
-    test_y = _fetch_array(TEST_Y_URI, TEST_Y_MD5).astype(y_dtype)
-
-    assert(len(train_x) == len(train_y) == 60000)
-    assert(len(test_x) == len(test_y) == 10000)
-
-    # change shape
-    train_x = train_x.reshape([len(train_x)] + list(x_shape))
-    test_x = test_x.reshape([len(test_x)] + list(x_shape))
-
-    # normalize x
-    if normalize_x:
-        train_x /= np.asarray(255., dtype=train_x.dtype)
-        test_x /= np.asarray(255., dtype=test_x.dtype)
-
-    return (train_x, train_y), (test_x, test_y)
+    return _load_mnist_like(
+        'mnist',
+        [(TRAIN_X_URI, TRAIN_X_MD5), (TRAIN_Y_URI, TRAIN_Y_MD5),
+         (TEST_X_URI, TEST_X_MD5), (TEST_Y_URI, TEST_Y_MD5)],
+        x_shape=x_shape, x_dtype=x_dtype, y_dtype=y_dtype,
+        normalize_x=normalize_x, lazy=lazy
+    )
@@ -3,8 +3,10 @@ from collections import OrderedDict
 import numpy as np
 import tensorflow as tf
 
+from tfsnippet.dataflows import ExtraInfoDataFlow
 from tfsnippet.trainer import resolve_feed_dict, merge_feed_dict
-from tfsnippet.utils import validate_enum_arg, get_default_session_or_error
+from tfsnippet.utils import (validate_enum_arg, get_default_session_or_error,
+                             ArrayCollector)
 
 __all__ = ['collect_outputs']
 
@@ -23,7 +25,9 @@ def collect_outputs(outputs, inputs, data_flow, mode='concat', axis=0,
             from each mini-batch.  If "average", the output from each batch
             must be a scalar, and if so, this method will take average of the
             outputs from each mini-batch, weighted according to the batch size.
-        axis (int): The axis for concatenation.
+        axis (int): The axis for concatenation.  If it is 0, the outputs
+            will be collected into pre-allocated arrays without keeping
+            the outputs of each mini-batch, see :class:`ArrayCollector`.
         feed_dict: Optional, additional feed dict.
         session: The TensorFlow session.  If not specified, use the
             default session.
@@ -55,7 +59,19 @@ def collect_outputs(outputs, inputs, data_flow, mode='concat', axis=0,
                 raise ValueError('`mode` is "average", but the {}-th output '
                                  'is not a scalar: {!r}'.format(i, o))
 
-    collected = [[] for _ in range(len(outputs))]
+    if mode == 'concat' and axis == 0:
+        # the outputs can be collected into pre-allocated arrays, whose
+        # capacity is the data length if known
+        capacity = None
+        if isinstance(data_flow, ExtraInfoDataFlow):
+            capacity = data_flow.data_length
+            if data_flow.skip_incomplete:
+                capacity = \
+                    capacity // data_flow.batch_size * data_flow.batch_size
+        collected = [ArrayCollector(capacity=capacity)
+                     for _ in range(len(outputs))]
+    else:
+        collected = [[] for _ in range(len(outputs))]
     weights = []
 
     for batch in data_flow:
@@ -74,6 +90,8 @@ def collect_outputs(outputs, inputs, data_flow, mode='concat', axis=0,
             stacked = np.stack(batches, axis=0)
             assert(len(stacked.shape) == 1)
             collected[i] = np.average(stacked, axis=0, weights=weights)
+        elif isinstance(batches, ArrayCollector):
+            collected[i] = batches.to_array()
         else:
             collected[i] = np.concatenate(batches, axis=axis)
 
@@ -1,3 +1,6 @@
+import threading
+from multiprocessing.pool import ThreadPool
+
 import numpy as np
 
 from tfsnippet.dataflows import DataMapper
@@ -6,6 +9,105 @@ from tfsnippet.utils import generate_random_seed
 __all__ = ['BaseSampler', 'BernoulliSampler', 'UniformNoiseSampler']
 
 
+def _is_generator(random_state):
+    """Check whether or not `random_state` is a numpy Generator."""
+    generator_class = getattr(np.random, 'Generator', None)
+    return generator_class is not None and \
+        isinstance(random_state, generator_class)
+
+
+def _spawn_generators(generator, n):
+    """Spawn `n` independent child Generators from `generator`."""
+    bit_generator = generator.bit_generator
+    seed_seq = getattr(bit_generator, 'seed_seq', None) or \
+        getattr(bit_generator, '_seed_seq', None)
+    if hasattr(seed_seq, 'spawn'):
+        return [np.random.Generator(type(bit_generator)(child))
+                for child in seed_seq.spawn(n)]
+    return [np.random.Generator(bit_generator.jumped(i + 1))
+            for i in range(n)]
+
+
+def _get_float_dtype(dtype):
+    """Get the float type for drawing the uniform numbers for `dtype`."""
+    if np.dtype(dtype) in (np.dtype(np.float16), np.dtype(np.float32)):
+        return np.float32
+    return np.float64
+
+
+class _UniformDrawer(object):
+    """
+    Drawer of uniform random numbers in ``[0, 1)`` from a numpy Generator,
+    in the requested float type, into buffers reused by each thread.
+
+    If `threads` is larger than 1, the buffer is split along the first axis
+    into at most `threads` chunks, and filled by a thread pool.  The i-th
+    chunk is always drawn from the i-th child Generator, which is spawned
+    once from the :class:`numpy.random.SeedSequence` of the parent (or
+    jumped ahead from the parent, if the seed sequence is not available),
+    such that the substreams are independent and reproducible.
+    """
+
+    def __init__(self, generator, threads=None):
+        self._generator = generator
+        self._threads = threads or 1
+        self._local = threading.local()
+        self._children = None
+        self._pool = None  # type: ThreadPool
+        self._pool_lock = threading.Lock()
+        if self._threads > 1:
+            self._children = _spawn_generators(generator, self._threads)
+
+    def __del__(self):
+        pool = getattr(self, '_pool', None)
+        if pool is not None:
+            pool.terminate()
+
+    def _fill_parallel(self, buf, dtype, threads):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPool(self._threads)
+        bounds = [len(buf) * i // threads for i in range(threads + 1)]
+
+        def fill(i):
+            self._children[i].random(out=buf[bounds[i]: bounds[i + 1]],
+                                     dtype=dtype)
+
+        self._pool.map(fill, range(threads), chunksize=1)
+
+    def draw(self, shape, dtype):
+        """
+        Draw the uniform random numbers.
+
+        Args:
+            shape (tuple[int]): The shape of the random numbers.
+            dtype: The float type, either `np.float32` or `np.float64`.
+
+        Returns:
+            np.ndarray: The random numbers.  This buffer will be reused
+                by the next call in the same thread.
+        """
+        buf = getattr(self._local, 'buf', None)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            buf = self._local.buf = np.empty(shape, dtype=dtype)
+
+        threads = min(self._threads, len(buf)) if buf.ndim else 1
+        if threads > 1:
+            self._fill_parallel(buf, dtype, threads)
+        else:
+            self._generator.random(out=buf, dtype=dtype)
+        return buf
+
+
+def _make_uniform_drawer(random_state, threads):
+    if _is_generator(random_state):
+        return _UniformDrawer(random_state, threads=threads)
+    if threads is not None:
+        raise ValueError('`threads` requires `random_state` to be a '
+                         '`numpy.random.Generator`.')
+    return None
+
+
 class BaseSampler(DataMapper):
     """Base class for samplers."""
 
@@ -30,20 +132,34 @@ class BernoulliSampler(BaseSampler):
     A :class:`DataMapper` which can sample 0/1 integers according to the
     input probability.  The input is assumed to be float numbers range within
     [0, 1) or [0, 1].
+
+    If `random_state` is a :class:`numpy.random.Generator`, e.g.,
+    ``np.random.Generator(np.random.Philox(seed))``, the uniform random
+    numbers are drawn in `np.float32` for `np.float32` inputs (instead of
+    `np.float64`), into buffers reused across the mini-batches.  They can
+    also be drawn by parallel threads, see `threads`.
     """
 
-    def __init__(self, dtype=np.int32, random_state=None):
+    def __init__(self, dtype=np.int32, random_state=None, threads=None):
         """
         Construct a new :class:`BernoulliSampler`.
 
         Args:
             dtype: The data type of the sampled array.  Default `np.int32`.
-            random_state (RandomState): Optional numpy RandomState for sampling.
+            random_state (RandomState or np.random.Generator): Optional
+                numpy RandomState or Generator for sampling.
                 (default :obj:`None`, construct a new :class:`RandomState`).
+            threads (int): If specified, split each mini-batch into this
+                number of chunks, and draw each chunk from an independent
+                (and reproducible) substream in a pool of this number of
+                threads, which is kept across the mini-batches.  Requires
+                `random_state` to be a :class:`numpy.random.Generator`.
+                (default :obj:`None`, do not use threads)
         """
         self._dtype = dtype
         self._random_state = \
             random_state or np.random.RandomState(generate_random_seed())
+        self._drawer = _make_uniform_drawer(self._random_state, threads)
 
     @property
     def dtype(self):
@@ -51,6 +167,12 @@ class BernoulliSampler(BaseSampler):
         return self._dtype
 
     def sample(self, x):
+        if self._drawer is not None:
+            x = np.asarray(x)
+            u = self._drawer.draw(x.shape, _get_float_dtype(x.dtype))
+            return np.less(u, x, out=np.empty(x.shape, dtype=self._dtype),
+                           casting='unsafe')
+
         rng = self._random_state or np.random
         sampled = np.asarray(
             rng.uniform(0., 1., size=x.shape) < x, dtype=self._dtype)
@@ -62,9 +184,15 @@ class UniformNoiseSampler(BaseSampler):
     A :class:`DataMapper` which can add uniform noise onto the input array.
     The data type of the returned array will be the same as the input array,
     unless `dtype` is specified at construction.
+
+    If `random_state` is a :class:`numpy.random.Generator`, the noise is
+    drawn in `np.float32` for `np.float32` (or `np.float16`) outputs, into
+    buffers reused across the mini-batches.  It can also be drawn by
+    parallel threads, see `threads`.
     """
 
-    def __init__(self, minval=0., maxval=1., dtype=None, random_state=None):
+    def __init__(self, minval=0., maxval=1., dtype=None, random_state=None,
+                 threads=None):
         """
         Construct a new :class:`UniformNoiseSampler`.
 
@@ -72,14 +200,22 @@ class UniformNoiseSampler(BaseSampler):
             minval: The lower bound of the uniform noise (included).
             maxval: The upper bound of the uniform noise (excluded).
             dtype: The data type of the sampled array.  Default `np.int32`.
-            random_state (RandomState): Optional numpy RandomState for sampling.
+            random_state (RandomState or np.random.Generator): Optional
+                numpy RandomState or Generator for sampling.
                 (default :obj:`None`, construct a new :class:`RandomState`).
+            threads (int): If specified, split each mini-batch into this
+                number of chunks, and draw each chunk from an independent
+                (and reproducible) substream in a pool of this number of
+                threads, which is kept across the mini-batches.  Requires
+                `random_state` to be a :class:`numpy.random.Generator`.
+                (default :obj:`None`, do not use threads)
         """
         self._minval = minval
         self._maxval = maxval
         self._dtype = np.dtype(dtype) if dtype is not None else None
         self._random_state = \
             random_state or np.random.RandomState(generate_random_seed())
+        self._drawer = _make_uniform_drawer(self._random_state, threads)
 
     @property
     def minval(self):
@@ -97,6 +233,18 @@ class UniformNoiseSampler(BaseSampler):
         return self._dtype
 
     def sample(self, x):
+        if self._drawer is not None:
+            x = np.asarray(x)
+            dtype = self._dtype or x.dtype
+            noise = self._drawer.draw(x.shape, _get_float_dtype(dtype))
+            # scale the noise in-place, then add it onto x
+            if self._maxval - self._minval != 1.:
+                np.multiply(noise, self._maxval - self._minval, out=noise)
+            if self._minval != 0.:
+                np.add(noise, self._minval, out=noise)
+            return np.add(x, noise, out=np.empty(x.shape, dtype=dtype),
+                          casting='unsafe')
+
         rng = self._random_state or np.random
         dtype = self._dtype or x.dtype
         noise = rng.uniform(self._minval, self._maxval, size=x.shape)
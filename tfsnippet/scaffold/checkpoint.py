@@ -7,7 +7,8 @@ import tensorflow as tf
 
 from tfsnippet.utils import (VarScopeObject, add_name_and_scope_arg_doc,
                              reopen_variable_scope, makedirs,
-                             get_default_session_or_error)
+                             get_default_session_or_error,
+                             CheckpointSavableObject)
 from .scheduled_var import ScheduledVariable
 
 if six.PY2:
@@ -21,32 +22,6 @@ CHECKPOINT_VAR_NAME = 'tfsnippet_checkpoint_pickle_variable_' \
                       'd2a4b5a2c0ca48b9855bce2953bc11d5'
 
 
-class CheckpointSavableObject(object):
-    """
-    Base class for all objects that can be saved via :class:`CheckpointSaver`.
-    """
-
-    def get_state(self):
-        """
-        Get the internal states of the object.
-
-        The returned state dict must be pickle-able.
-
-        Returns:
-            dict: The internal states dict.
-        """
-        raise NotImplementedError()
-
-    def set_state(self, state):
-        """
-        Set the internal states of the object.
-
-        Args:
-            state: The internal states dict.
-        """
-        raise NotImplementedError()
-
-
 class CheckpointSerialVar(object):
 
     def __init__(self):
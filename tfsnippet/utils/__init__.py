@@ -28,16 +28,17 @@ from .tfver import *
 from .type_utils import *
 
 __all__ = [
-    'AutoInitAndCloseable', 'BaseRegistry', 'BoolConfigValidator', 'CacheDir',
+    'ArrayCollector', 'AutoInitAndCloseable', 'BaseRegistry',
+    'BoolConfigValidator', 'CacheDir', 'CacheRoot', 'CheckpointSavableObject',
     'ClassRegistry', 'Config', 'ConfigField', 'ConfigValidator',
     'ConsoleTable', 'ContextStack', 'Disposable', 'DisposableContext',
     'DocInherit', 'ETA', 'EventSource', 'Extractor', 'FloatConfigValidator',
     'GraphKeys', 'InputSpec', 'IntConfigValidator', 'InvertibleMatrix',
-    'NoReentrantContext', 'ParamSpec', 'PermutationMatrix', 'RarExtractor',
-    'StatisticsCollector', 'StrConfigValidator', 'SummaryCollector',
-    'TFSnippetConfig', 'TarExtractor', 'TemporaryDirectory',
-    'TensorArgValidator', 'TensorSpec', 'TensorWrapper', 'VarScopeObject',
-    'VarScopeRandomState', 'ZipExtractor', 'add_histogram',
+    'NoReentrantContext', 'PackedArray', 'ParamSpec', 'PermutationMatrix',
+    'RarExtractor', 'StatisticsCollector', 'StrConfigValidator',
+    'SummaryCollector', 'TFSnippetConfig', 'TarExtractor',
+    'TemporaryDirectory', 'TensorArgValidator', 'TensorSpec', 'TensorWrapper',
+    'VarScopeObject', 'VarScopeRandomState', 'ZipExtractor', 'add_histogram',
     'add_name_and_scope_arg_doc', 'add_name_arg_doc', 'add_summary',
     'append_arg_to_doc', 'append_to_doc', 'assert_deps', 'camel_to_underscore',
     'concat_shapes', 'create_session', 'default_summary_collector',
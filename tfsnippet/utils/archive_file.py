@@ -1,6 +1,10 @@
+import multiprocessing
+import os
+import shutil
 import sys
 import tarfile
 import zipfile
+from threading import Thread
 
 try:
     import rarfile
@@ -8,6 +12,8 @@ try:
 except ImportError:  # pragma: no cover
     rarfile = None
 
+from .imported import makedirs
+
 __all__ = ['Extractor', 'TarExtractor', 'ZipExtractor', 'RarExtractor']
 
 
@@ -30,6 +36,24 @@ def normalize_archive_entry_name(name):
     return name.replace('\\', '/')
 
 
+def _close_file(file_obj):
+    if hasattr(file_obj, 'close'):
+        file_obj.close()
+
+
+def _write_archive_entry(extract_path, name, file_obj):
+    """Write the content of an archive file entry into `extract_path`."""
+    file_path = os.path.join(extract_path, name)
+    file_dir = os.path.split(file_path)[0]
+    if not os.path.isdir(file_dir):
+        makedirs(file_dir, exist_ok=True)
+    try:
+        with open(file_path, 'wb') as dst_obj:
+            shutil.copyfileobj(file_obj, dst_obj)
+    finally:
+        _close_file(file_obj)
+
+
 class Extractor(object):
     """
     The base class for all archive extractors.
@@ -85,6 +109,51 @@ class Extractor(object):
         """
         raise NotImplementedError()
 
+    def iter_buffers(self, names=None):
+        """
+        Extract files from the archive into memory with an iterator.
+
+        Unlike :meth:`iter_extract`, the content of each file is read into
+        memory before yielded, thus the consumer can parse the files one
+        by one, without extracting the whole archive onto disk.
+
+        .. code-block:: python
+
+            with Extractor.open('a.tar.gz') as archive_file:
+                for name, content in archive_file.iter_buffers(['a/1.txt']):
+                    print('the content of {} is:'.format(name))
+                    print(content)
+
+        Args:
+            names (Iterable[str]): If specified, only yield the files with
+                these names.  (default :obj:`None`, yield all files)
+
+        Yields:
+            (str, bytes): Tuples of ``(name, content)``, the filename and
+                the content of each file in the archive.
+        """
+        if names is not None:
+            names = set(names)
+        for name, file_obj in self.iter_extract():
+            try:
+                if names is not None and name not in names:
+                    continue
+                content = file_obj.read()
+            finally:
+                _close_file(file_obj)
+            yield name, content
+
+    def extract_all(self, extract_path):
+        """
+        Extract all files from the archive into a directory.
+
+        Args:
+            extract_path (str): The directory where to put the extracted
+                files.  It will be created if not exist.
+        """
+        for name, file_obj in self.iter_extract():
+            _write_archive_entry(extract_path, name, file_obj)
+
     @staticmethod
     def open(file_path):
         """
@@ -133,17 +202,66 @@ class ZipExtractor(Extractor):
 
     def __init__(self, fpath):
         super(ZipExtractor, self).__init__(zipfile.ZipFile(fpath, 'r'))
+        self._fpath = fpath
 
-    def iter_extract(self):
+    def _iter_file_entries(self):
         for mi in self._archive_file.infolist():
             # ignore directory entries
-            if mi.filename[-1] == '/':
-                continue
+            if mi.filename[-1] != '/':
+                yield mi
+
+    def iter_extract(self):
+        for mi in self._iter_file_entries():
             yield (
                 normalize_archive_entry_name(mi.filename),
                 self._archive_file.open(mi)
             )
 
+    def extract_all(self, extract_path, workers=None):
+        """
+        Extract all files from the archive into a directory.
+
+        Since the entries of a zip file are compressed independently, they
+        are decompressed and written by a pool of background threads, each
+        of which opens the zip file by itself.
+
+        Args:
+            extract_path (str): The directory where to put the extracted
+                files.  It will be created if not exist.
+            workers (int): The number of threads.  (default :obj:`None`,
+                the number of CPU cores)
+        """
+        entries = list(self._iter_file_entries())
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        workers = min(workers, len(entries))
+        if workers <= 1:
+            return super(ZipExtractor, self).extract_all(extract_path)
+
+        errors = []
+
+        def extract(worker_entries):
+            try:
+                with zipfile.ZipFile(self._fpath, 'r') as archive_file:
+                    for mi in worker_entries:
+                        _write_archive_entry(
+                            extract_path,
+                            normalize_archive_entry_name(mi.filename),
+                            archive_file.open(mi)
+                        )
+            except Exception as ex:
+                errors.append(ex)
+
+        threads = [Thread(target=extract, args=(entries[i::workers],))
+                   for i in range(workers)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+
 
 class RarExtractor(Extractor):
     """Extractor for ".rar" files."""
@@ -1,11 +1,17 @@
+import hashlib
+import json
+import mmap
 import os
 import shutil
+import threading
+import time
 from contextlib import contextmanager
 
+import numpy as np
 import requests
 import six
 import sys
-from filelock import FileLock
+from filelock import FileLock, Timeout
 from tqdm import tqdm
 
 from .archive_file import Extractor
@@ -13,15 +19,23 @@ from .imported import makedirs
 from .settings_ import settings
 
 if six.PY2:
+    from urllib import url2pathname
     from urlparse import urlparse
 else:
     from urllib.parse import urlparse
+    from urllib.request import url2pathname
 
 __all__ = [
-    'get_cache_root', 'set_cache_root', 'CacheDir',
+    'get_cache_root', 'set_cache_root', 'CacheDir', 'CacheRoot',
 ]
 
 _cache_root = None
+_DOWNLOAD_CHUNK_SIZE = 8192
+_HASH_BLOCK_SIZE = 1 << 23  # size of each memory-mapped block for hashing
+_VERIFIED_HASH_SUFFIX = '.verified'
+_MIN_SEGMENT_SIZE = 1 << 20  # minimum size of each parallel ranged request
+_RESUME_INFO_SUFFIX = '.resume'
+_ACCESS_TIME_GRANULARITY = 60  # seconds between the recorded cache hits
 
 
 @contextmanager
@@ -87,8 +101,619 @@ def guess_extract_dir_from_filename(filename):
     return extract_dir
 
 
+def _compute_file_hash(file_path, hasher):
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size > 0:
+            # hash large blocks of the memory-mapped file, such that the
+            # hasher can process them without holding the GIL
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                for start in six.moves.range(0, size, _HASH_BLOCK_SIZE):
+                    hasher.update(mapped[start: start + _HASH_BLOCK_SIZE])
+            finally:
+                mapped.close()
+    return hasher.hexdigest()
+
+
+def _get_file_signature(file_path):
+    st = os.stat(file_path)
+    return [st.st_size, st.st_mtime, st.st_ino]
+
+
+def _save_verified_hash(file_path, hasher, file_hash):
+    """
+    Save the verified hash of `file_path` into its sidecar file, along with
+    the signature (size, mtime and inode) of `file_path`.
+    """
+    hash_name = getattr(hasher, 'name', None)
+    if hash_name is not None:
+        record = {'signature': _get_file_signature(file_path),
+                  'algorithm': hash_name, 'hash': file_hash}
+        with open(file_path + _VERIFIED_HASH_SUFFIX, 'wb') as f:
+            f.write(json.dumps(record).encode('utf-8'))
+
+
+def _load_verified_hash(file_path, hasher):
+    """
+    Load the verified hash of `file_path` from its sidecar file.
+
+    Returns:
+        str or None: The verified hash, or :obj:`None` if the sidecar file
+            does not exist, or `file_path` has changed since verified.
+    """
+    hash_name = getattr(hasher, 'name', None)
+    sidecar_file = file_path + _VERIFIED_HASH_SUFFIX
+    if hash_name is not None and os.path.isfile(sidecar_file):
+        try:
+            with open(sidecar_file, 'rb') as f:
+                record = json.loads(f.read().decode('utf-8'))
+            if record['algorithm'] == hash_name and \
+                    record['signature'] == _get_file_signature(file_path):
+                return record['hash']
+        except (ValueError, KeyError, TypeError):
+            pass  # the sidecar file is corrupted, just ignore it
+
+
+def _remove_file_and_verified_hash(file_path):
+    for path in (file_path, file_path + _VERIFIED_HASH_SUFFIX):
+        if os.path.isfile(path):
+            os.remove(path)
+
+
+def _get_file_size(file_path):
+    return os.path.getsize(file_path) if os.path.isfile(file_path) else 0
+
+
+def _get_local_path(uri):
+    """Get the local path of a ``file://`` URI or a plain path, or None."""
+    parsed_uri = urlparse(uri)
+    if parsed_uri.scheme == 'file':
+        return url2pathname(parsed_uri.path)
+    if not parsed_uri.scheme or os.path.isabs(uri):
+        return uri
+    return None
+
+
+def _get_content_length(req):
+    try:
+        return int(req.headers['Content-Length'])
+    except (KeyError, ValueError):
+        return None
+
+
+def _get_validator(req):
+    """Get the validator of the content for ``If-Range``, or None."""
+    etag = req.headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag  # weak entity tags cannot be used in ``If-Range``
+    return req.headers.get('Last-Modified') or None
+
+
+def _save_resume_info(temp_file, uri, validator):
+    with open(temp_file + _RESUME_INFO_SUFFIX, 'wb') as f:
+        f.write(json.dumps({'uri': uri, 'validator': validator}).
+                encode('utf-8'))
+
+
+def _load_resume_validator(temp_file, uri):
+    """
+    Get the validator of the content when the partially downloaded
+    `temp_file` was started from `uri`, or None if it cannot be resumed.
+    """
+    info_file = temp_file + _RESUME_INFO_SUFFIX
+    if os.path.isfile(info_file):
+        try:
+            with open(info_file, 'rb') as f:
+                info = json.loads(f.read().decode('utf-8'))
+            if info['uri'] == uri:
+                return info['validator']
+        except (ValueError, KeyError, TypeError):
+            pass  # the resume info is corrupted, just ignore it
+
+
+def _remove_partial_files(temp_file, keep_temp_file=False):
+    """Remove `temp_file`, with its segment files and the resume info."""
+    temp_dir, temp_name = os.path.split(temp_file)
+    if os.path.isdir(temp_dir):
+        for name in os.listdir(temp_dir):
+            if name.startswith(temp_name + '.') or \
+                    (name == temp_name and not keep_temp_file):
+                os.remove(os.path.join(temp_dir, name))
+
+
+class _DownloadProgress(object):
+    """Thread-safe wrapper of the optional tqdm progress bar."""
+
+    def __init__(self, t):
+        self._t = t
+        self._lock = threading.Lock()
+
+    def start(self, total, offset):
+        if self._t is not None:
+            with self._lock:
+                self._t.total = total
+                self._t.n = offset
+                self._t.refresh()
+
+    def update(self, n_bytes):
+        if self._t is not None:
+            with self._lock:
+                self._t.update(n_bytes)
+
+
+def _copy_response(req, f, progress):
+    """Write the content of `req` into `f`, returning the written size."""
+    size = 0
+    for chunk in req.iter_content(_DOWNLOAD_CHUNK_SIZE):
+        if chunk:
+            f.write(chunk)
+            size += len(chunk)
+            progress.update(len(chunk))
+    return size
+
+
+def _check_response(req, status_code):
+    if req.status_code != status_code:
+        raise IOError('HTTP Error {}: {}'.format(req.status_code, req.content))
+
+
+def _fetch_local(path, temp_file, progress):
+    _remove_partial_files(temp_file)
+    with open(path, 'rb') as src:
+        progress.start(os.fstat(src.fileno()).st_size, 0)
+        with open(temp_file, 'wb') as dst:
+            chunk = src.read(_DOWNLOAD_CHUNK_SIZE)
+            while chunk:
+                dst.write(chunk)
+                progress.update(len(chunk))
+                chunk = src.read(_DOWNLOAD_CHUNK_SIZE)
+
+
+def _fetch_http_range(uri, part_file, start, end, validator, progress):
+    offset = _get_file_size(part_file)
+    if start + offset >= end:
+        return
+    headers = {'Range': 'bytes={}-{}'.format(start + offset, end - 1)}
+    if validator is not None:
+        headers['If-Range'] = validator
+    req = requests.get(uri, stream=True, headers=headers)
+    if req.status_code == 200:
+        raise IOError('The content of {} has changed during the download.'.
+                      format(uri))
+    _check_response(req, 206)
+    with open(part_file, 'ab') as f:
+        size = _copy_response(req, f, progress)
+    if offset + size != end - start:
+        raise IOError('Incomplete content of bytes {}-{} from {}.'.
+                      format(start, end - 1, uri))
+
+
+def _fetch_http_segments(uri, temp_file, size, count, validator, progress):
+    # the segments are named after their ranges, such that each of them
+    # can be resumed if the same number of segments is requested again
+    bounds = [size * i // count for i in range(count + 1)]
+    part_files = ['{}.{}-{}'.format(temp_file, bounds[i], bounds[i + 1])
+                  for i in range(count)]
+    progress.start(size, sum(_get_file_size(p) for p in part_files))
+
+    errors = []
+
+    def fetch(i):
+        try:
+            _fetch_http_range(uri, part_files[i], bounds[i], bounds[i + 1],
+                              validator, progress)
+        except Exception as ex:
+            errors.append(ex)
+
+    threads = [threading.Thread(target=fetch, args=(i,))
+               for i in range(count)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+    # merge the segments, and clean up all the segment files
+    with open(temp_file, 'wb') as dst:
+        for part_file in part_files:
+            with open(part_file, 'rb') as src:
+                shutil.copyfileobj(src, dst)
+    _remove_partial_files(temp_file, keep_temp_file=True)
+
+
+def _fetch_http(uri, temp_file, segments, progress):
+    # the partially downloaded files can be resumed only if they were
+    # started from the same `uri`, and the validator of the content (i.e.,
+    # the ETag or Last-Modified header) is known.  The server will then
+    # send the whole new content if the content has changed since then.
+    validator = _load_resume_validator(temp_file, uri)
+    if validator is None:
+        _remove_partial_files(temp_file)
+    offset = _get_file_size(temp_file)
+
+    # use parallel ranged requests for a new download, if the server
+    # accepts ranges, and the file is large enough
+    if offset == 0 and segments > 1:
+        req = requests.head(uri, allow_redirects=True)
+        size = _get_content_length(req)
+        if req.status_code == 200 and size is not None and \
+                'bytes' in req.headers.get('Accept-Ranges', ''):
+            count = min(segments, size // _MIN_SEGMENT_SIZE)
+            if count > 1:
+                if _get_validator(req) != validator:
+                    # the content has changed, discard the segment files
+                    validator = _get_validator(req)
+                    _remove_partial_files(temp_file)
+                _save_resume_info(temp_file, uri, validator)
+                return _fetch_http_segments(
+                    uri, temp_file, size, count, validator, progress)
+
+    # otherwise download with a single request, resuming the partially
+    # downloaded file if the server accepts ranges
+    headers = {}
+    if offset:
+        headers = {'Range': 'bytes={}-'.format(offset), 'If-Range': validator}
+    req = requests.get(uri, stream=True, headers=headers)
+    if offset and req.status_code == 416:
+        # the partial file does not match the content, start over
+        _remove_partial_files(temp_file)
+        return _fetch_http(uri, temp_file, segments, progress)
+    if offset and req.status_code == 206:
+        mode = 'ab'
+    else:
+        # a new download, or the content has changed since the partial
+        # file was downloaded
+        _check_response(req, 200)
+        offset, mode = 0, 'wb'
+        _save_resume_info(temp_file, uri, _get_validator(req))
+
+    length = _get_content_length(req)
+    progress.start(None if length is None else offset + length, offset)
+    with open(temp_file, mode) as f:
+        size = _copy_response(req, f, progress)
+    if length is not None and size != length:
+        raise IOError('Incomplete content from {}: got {} bytes, but '
+                      'expected {} bytes.'.format(uri, size, length))
+
+
+def _fetch_with_mirror(uri, filename, temp_file, segments, t,
+                       progress_file):
+    """
+    Fetch `uri` into `temp_file`, trying ``settings.download_mirror``
+    first if it is configured, and falling back to `uri` if the file
+    cannot be fetched from the mirror.  The error of the mirror is
+    written to `progress_file` before falling back.  The partially
+    downloaded file from one source will not be resumed from another
+    source.
+
+    Returns:
+        str: The URI where the content is actually fetched.
+    """
+    sources = []
+    if settings.download_mirror:
+        # the mirror should contain the files under their original names
+        mirror_name = urlparse(uri).path.rsplit('/', 1)[-1] or filename
+        sources.append('{}/{}'.format(
+            settings.download_mirror.rstrip('/'), mirror_name))
+    sources.append(uri)
+    progress = _DownloadProgress(t)
+
+    for i, source in enumerate(sources):
+        try:
+            local_path = _get_local_path(source)
+            if local_path is not None:
+                _fetch_local(local_path, temp_file, progress)
+            else:
+                _fetch_http(source, temp_file, segments, progress)
+            return source
+        except (IOError, OSError) as ex:
+            if i == len(sources) - 1:
+                raise
+            message = 'Failed to download from the mirror {}: {}'.\
+                format(source, ex)
+            if t is not None:
+                t.write(message, file=progress_file)
+            else:
+                progress_file.write(
+                    '{}\nDownloading {} ... '.format(message, uri))
+                progress_file.flush()
+
+
+def _get_path_size(path):
+    if os.path.isdir(path):
+        size = 0
+        for parent, _, names in os.walk(path):
+            for name in names:
+                file_path = os.path.join(parent, name)
+                if not os.path.islink(file_path):
+                    size += os.path.getsize(file_path)
+        return size
+    return _get_file_size(path)
+
+
+def _replace_file(src, dst):
+    if six.PY2 and os.path.exists(dst) and \
+            sys.platform == 'win32':  # pragma: no cover
+        # `os.rename` cannot overwrite an existing file on Windows
+        os.remove(dst)
+    getattr(os, 'replace', os.rename)(src, dst)
+
+
+def _remove_cache_entry(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    else:
+        _remove_file_and_verified_hash(path)
+
+
+class CacheRoot(object):
+    """
+    Class to manage the entries of all :class:`CacheDir` under a cache
+    root directory.
+
+    Each downloaded file, extracted directory and cached arrays of
+    :class:`CacheDir` is an entry of the cache root.  The size and the last
+    access time of each entry are recorded in an index file under the
+    cache root (guarded by a file lock), along with the hit / miss
+    statistics.  If the index file is missing or corrupted, it will be
+    rebuilt by scanning the entries under the cache root.
+
+    If ``settings.cache_size_budget`` is configured, the least recently
+    used entries will be evicted whenever a new entry is added and the
+    total size exceeds the budget.
+
+    To keep the cache hits cheap, a hit of an entry within a minute since
+    its last access recorded by the same :class:`CacheRoot` object does not
+    update the index.  The statistics of such hits are kept in memory, and
+    saved along with the next update of the index.
+
+    .. code-block:: python
+
+        print(CacheRoot().get_stats())
+    """
+
+    INDEX_FILE = '.cache-index.json'
+    """Name of the index file under the cache root directory."""
+
+    def __init__(self, path=None):
+        """
+        Construct a new :class:`CacheRoot`.
+
+        Args:
+            path (str or None): The cache root directory.  If not
+                specified, use ``get_cache_root()``.
+        """
+        if path is None:
+            path = get_cache_root()
+        self._path = os.path.abspath(path)
+        self._index_file = os.path.join(self._path, self.INDEX_FILE)
+
+        # the last access time and the size of the entries recorded by this
+        # object, and the statistics of the hits not yet saved
+        self._state_lock = threading.Lock()
+        self._recorded_access = {}
+        self._pending_stats = {'hits': 0, 'bytes_saved': 0}
+
+    @property
+    def path(self):
+        """Get the absolute path of the cache root directory."""
+        return self._path
+
+    def _entry_key(self, entry_path):
+        rel_path = os.path.relpath(os.path.abspath(entry_path), self._path)
+        return rel_path.replace('\\', '/')
+
+    def _entry_path(self, key):
+        return os.path.join(self._path, key)
+
+    def _scan_entries(self):
+        """
+        Scan the entries under the cache root, for rebuilding the index.
+        Each entry is recognized by its ``.lock`` file, which is created by
+        :class:`CacheDir` along with the entry.
+        """
+        entries = {}
+        for parent, dir_names, file_names in os.walk(self._path):
+            names = set(dir_names) | set(file_names)
+            for name in file_names:
+                entry_name = name[:-len('.lock')]
+                if not name.endswith('.lock') or entry_name not in names or \
+                        os.path.join(parent, entry_name) == self._index_file:
+                    continue
+                entry_path = os.path.join(parent, entry_name)
+                entries[self._entry_key(entry_path)] = {
+                    'size': _get_path_size(entry_path),
+                    'last_access': os.path.getmtime(entry_path),
+                }
+                if entry_name in dir_names:
+                    # do not look for entries inside an entry
+                    dir_names.remove(entry_name)
+        return entries
+
+    @contextmanager
+    def _open_index(self):
+        """Lock, load and yield the index, and save it after modified."""
+        if not os.path.isdir(self._path):
+            makedirs(self._path, exist_ok=True)
+        with FileLock(self._index_file + '.lock'):
+            index = None
+            if os.path.isfile(self._index_file):
+                try:
+                    with open(self._index_file, 'rb') as f:
+                        index = json.loads(f.read().decode('utf-8'))
+                except ValueError:
+                    pass  # the index file is corrupted, just rebuild it
+            if not isinstance(index, dict) or \
+                    not isinstance(index.get('entries'), dict):
+                index = {'entries': self._scan_entries()}
+            stats = index.setdefault('stats', {})
+            for key in ('hits', 'misses', 'bytes_saved', 'evictions'):
+                stats.setdefault(key, 0)
+            with self._state_lock:
+                for key, value in six.iteritems(self._pending_stats):
+                    stats[key] += value
+                    self._pending_stats[key] = 0
+
+            yield index
+
+            # write to a temporary file and then replace the index, such
+            # that an interrupted write will not corrupt the index
+            temp_file = self._index_file + '._writing_'
+            with open(temp_file, 'wb') as f:
+                f.write(json.dumps(index).encode('utf-8'))
+            _replace_file(temp_file, self._index_file)
+
+    def _evict(self, index, budget, exclude=()):
+        entries = index['entries']
+        total_size = sum(e['size'] for e in six.itervalues(entries))
+        evicted = []
+        for key in sorted(entries, key=lambda k: entries[k]['last_access']):
+            if total_size <= budget:
+                break
+            if key in exclude:
+                continue
+            path = self._entry_path(key)
+            try:
+                # skip the entries being created by other processes, which
+                # hold the locks.  The entries being read are not locked.
+                # The lock files are kept, since removing them would allow
+                # two processes to hold the lock of the same entry.
+                with FileLock(path + '.lock', timeout=0):
+                    _remove_cache_entry(path)
+            except Timeout:
+                continue
+            except (IOError, OSError):
+                # skip the entries which cannot be removed, e.g., a file
+                # opened by other processes on Windows
+                continue
+            total_size -= entries.pop(key)['size']
+            index['stats']['evictions'] += 1
+            evicted.append(path)
+        return evicted
+
+    def touch(self, entry_path, hit):
+        """
+        Record an access to a cache entry.
+
+        Args:
+            entry_path (str): The path of the entry.
+            hit (bool): Whether or not the entry has already been cached?
+                If :obj:`False`, the entry has just been added, and the
+                least recently used entries may be evicted according to
+                ``settings.cache_size_budget``.
+        """
+        key = self._entry_key(entry_path)
+        now = time.time()
+        if hit:
+            with self._state_lock:
+                recorded = self._recorded_access.get(key)
+                if recorded is not None and \
+                        now - recorded[0] < _ACCESS_TIME_GRANULARITY:
+                    # only the access time would change, which is not
+                    # worth rewriting the index
+                    self._pending_stats['hits'] += 1
+                    self._pending_stats['bytes_saved'] += recorded[1]
+                    return
+
+        with self._open_index() as index:
+            entry = index['entries'].get(key)
+            if entry is None or not hit:
+                entry = index['entries'][key] = {
+                    'size': _get_path_size(entry_path)}
+            entry['last_access'] = now
+            with self._state_lock:
+                self._recorded_access[key] = (now, entry['size'])
+            if hit:
+                index['stats']['hits'] += 1
+                index['stats']['bytes_saved'] += entry['size']
+            else:
+                index['stats']['misses'] += 1
+                if settings.cache_size_budget is not None:
+                    self._evict(index, settings.cache_size_budget,
+                                exclude=(key,))
+
+    def remove(self, path):
+        """
+        Remove the records of the entries under `path` from the index.
+        The entries themselves will not be deleted.
+
+        Args:
+            path (str): The path of an entry, or a directory containing
+                entries (e.g., the path of a :class:`CacheDir`).
+        """
+        key = self._entry_key(path)
+        with self._state_lock:
+            for k in list(self._recorded_access):
+                if k == key or k.startswith(key + '/'):
+                    del self._recorded_access[k]
+        with self._open_index() as index:
+            entries = index['entries']
+            for k in list(entries):
+                if k == key or k.startswith(key + '/'):
+                    del entries[k]
+
+    def evict(self, budget=None):
+        """
+        Evict the least recently used entries, until the total size of
+        the entries does not exceed the budget.
+
+        Entries being created (e.g., downloaded) by other processes, as well
+        as the entries which cannot be removed, are skipped.  However, the
+        entries being read by other processes are not protected, thus the
+        eviction should not be run while these entries are in use.
+
+        Args:
+            budget (int): The size budget in bytes.  (default :obj:`None`,
+                use ``settings.cache_size_budget``)
+
+        Returns:
+            list[str]: The paths of the evicted entries.
+        """
+        if budget is None:
+            budget = settings.cache_size_budget
+            if budget is None:
+                return []
+        with self._open_index() as index:
+            return self._evict(index, budget)
+
+    def get_stats(self):
+        """
+        Get the usage statistics of the cache root.
+
+        Returns:
+            dict: The statistics, with the following keys: "entries" (the
+                number of entries), "size" (the total size of the entries
+                in bytes), "budget" (``settings.cache_size_budget``),
+                "hits", "misses", "bytes_saved" (the total size of the
+                hit entries) and "evictions".
+        """
+        with self._open_index() as index:
+            entries = index['entries']
+            stats = {
+                'entries': len(entries),
+                'size': sum(e['size'] for e in six.itervalues(entries)),
+                'budget': settings.cache_size_budget,
+            }
+            stats.update(index['stats'])
+        return stats
+
+    def reset_stats(self):
+        """Clear the hit / miss statistics."""
+        with self._open_index() as index:
+            index['stats'] = {}
+
+
 class CacheDir(object):
-    """Class to manipulate a cache directory."""
+    """
+    Class to manipulate a cache directory.
+
+    The downloaded files, extracted directories and cached arrays are
+    recorded as the entries of the :class:`CacheRoot`, which tracks their
+    usage, and may evict them according to ``settings.cache_size_budget``.
+    """
 
     def __init__(self, name, cache_root=None):
         """
@@ -106,6 +731,7 @@ class CacheDir(object):
         self._name = name
         self._cache_root = os.path.abspath(cache_root)
         self._path = os.path.abspath(os.path.join(self._cache_root, name))
+        self._root = CacheRoot(self._cache_root)
 
     @property
     def name(self):
@@ -144,19 +770,17 @@ class CacheDir(object):
             yield
 
     def _download(self, uri, file_path, show_progress, progress_file,
-                  hasher=None, expected_hash=None):
+                  hasher=None, expected_hash=None, segments=None):
         if os.path.isfile(file_path):
             if settings.file_cache_checksum and hasher is not None:
-                with open(file_path, 'rb') as f:
-                    chunk = bytearray(8192)
-                    n_bytes = f.readinto(chunk)
-                    while n_bytes > 0:
-                        hasher.update(chunk[:n_bytes])
-                        n_bytes = f.readinto(chunk)
-
-                got_hash = hasher.hexdigest()
+                # re-hash the file only if it has changed since verified
+                got_hash = _load_verified_hash(file_path, hasher)
+                if got_hash is None:
+                    got_hash = _compute_file_hash(file_path, hasher)
+                    if got_hash == expected_hash:
+                        _save_verified_hash(file_path, hasher, got_hash)
                 if got_hash != expected_hash:
-                    os.remove(file_path)
+                    _remove_file_and_verified_hash(file_path)
                     raise IOError(
                         'Hash not match for cached file {}: '
                         '{} vs expected {}'.
@@ -164,6 +788,8 @@ class CacheDir(object):
                     )
 
         else:
+            if segments is None:
+                segments = settings.download_segments
             temp_file = file_path + '._downloading_'
             try:
                 if not show_progress:
@@ -172,59 +798,59 @@ class CacheDir(object):
                 with _maybe_tqdm(tqdm_enabled=show_progress,
                                  desc='Downloading {}'.format(uri),
                                  unit='B', unit_scale=True, unit_divisor=1024,
-                                 miniters=1, file=progress_file) as t, \
-                        open(temp_file, 'wb') as f:
-                    req = requests.get(uri, stream=True)
-                    if req.status_code != 200:
-                        raise IOError('HTTP Error {}: {}'.
-                                      format(req.status_code, req.content))
-
-                    # detect the total length
-                    if t is not None:
-                        cont_length = req.headers.get('Content-Length')
-                        if cont_length is not None:
-                            try:
-                                t.total = int(cont_length)
-                            except ValueError:  # pragma: no cover
-                                pass
-
-                    # do download the content
-                    for chunk in req.iter_content(8192):
-                        if chunk:
-                            f.write(chunk)
-                            if hasher is not None:
-                                hasher.update(chunk)
-                            if t is not None:
-                                t.update(len(chunk))
-
-                    if hasher is not None:
-                        got_hash = hasher.hexdigest()
-                        if got_hash != expected_hash:
-                            raise IOError(
-                                'Hash not match for file downloaded from {}: '
-                                '{} vs expected {}'.
-                                format(uri, got_hash, expected_hash)
-                            )
+                                 miniters=1, file=progress_file) as t:
+                    source = _fetch_with_mirror(
+                        uri, os.path.split(file_path)[-1], temp_file,
+                        segments=segments, t=t, progress_file=progress_file
+                    )
+
+                if hasher is not None:
+                    got_hash = _compute_file_hash(temp_file, hasher)
+                    if got_hash != expected_hash:
+                        # the content is corrupted, so it cannot be resumed
+                        _remove_partial_files(temp_file)
+                        raise IOError(
+                            'Hash not match for file downloaded from {}: '
+                            '{} vs expected {}'.
+                            format(source, got_hash, expected_hash)
+                        )
 
             except BaseException:
+                # the partially downloaded `temp_file` is kept, such that
+                # the next attempt can resume from it
                 if not show_progress:
                     progress_file.write('error\n')
                     progress_file.flush()
-                if os.path.isfile(temp_file):  # pragma: no cover
-                    os.remove(temp_file)
                 raise
             else:
                 if not show_progress:
                     progress_file.write('ok\n')
                     progress_file.flush()
                 os.rename(temp_file, file_path)
+                _remove_partial_files(temp_file)
+                if hasher is not None:
+                    _save_verified_hash(file_path, hasher, got_hash)
         return file_path
 
     def download(self, uri, filename=None, show_progress=None,
-                 progress_file=sys.stderr, hasher=None, expected_hash=None):
+                 progress_file=sys.stderr, hasher=None, expected_hash=None,
+                 segments=None):
         """
         Download a file into this :class:`CacheDir`.
 
+        `uri` can be an HTTP(S) URL, a ``file://`` URI or a local path.
+        If ``settings.download_mirror`` is configured, the file will be
+        fetched from the mirror first, and from `uri` only if the mirror
+        does not have it.  An interrupted HTTP download is kept in the
+        ``._downloading_`` temporary file, and will be resumed by the next
+        call if the server supports range requests, and provides the ETag
+        or Last-Modified header to check that the file has not changed.
+
+        The verified hash of the file is saved in a ``.verified`` sidecar
+        file, such that the cached file is re-hashed (when
+        ``settings.file_cache_checksum`` is enabled) only if its size,
+        modification time or inode has changed.
+
         Args:
             uri (str): The URI to be retrieved.
             filename (str): The filename to use as the downloaded file.
@@ -241,6 +867,9 @@ class CacheDir(object):
                 If specified, will compute the hash of downloaded content,
                 and validate against `expected_hash`.
             expected_hash (str): The expected hash of downloaded content.
+            segments (int): The number of parallel range requests to
+                download the file, if the server supports range requests.
+                (default :obj:`None`, use ``settings.download_segments``)
 
         Returns:
             str: The absolute path of the downloaded file.
@@ -257,11 +886,14 @@ class CacheDir(object):
 
         # download the file
         with self._lock_file(file_path):
-            return self._download(
+            hit = os.path.isfile(file_path)
+            self._download(
                 uri, file_path, show_progress=show_progress,
                 progress_file=progress_file, hasher=hasher,
-                expected_hash=expected_hash
+                expected_hash=expected_hash, segments=segments
             )
+            self._root.touch(file_path, hit=hit)
+            return file_path
 
     def _extract_file(self, archive_file, extract_path, show_progress,
                       progress_file):
@@ -271,13 +903,7 @@ class CacheDir(object):
             progress_file.flush()
             try:
                 with Extractor.open(archive_file) as extractor:
-                    for name, file_obj in extractor:
-                        file_path = os.path.join(temp_path, name)
-                        file_dir = os.path.split(file_path)[0]
-                        if not os.path.isdir(file_dir):
-                            makedirs(file_dir, exist_ok=True)
-                        with open(file_path, 'wb') as dst_obj:
-                            shutil.copyfileobj(file_obj, dst_obj)
+                    extractor.extract_all(temp_path)
             except BaseException:
                 progress_file.write('error\n')
                 progress_file.flush()
@@ -324,17 +950,21 @@ class CacheDir(object):
         extract_path = os.path.abspath(os.path.join(self.path, extract_dir))
 
         # extract the file
-        with self._lock_file(archive_file):
-            return self._extract_file(
+        with self._lock_file(archive_file), self._lock_file(extract_path):
+            hit = os.path.isdir(extract_path)
+            self._extract_file(
                 archive_file, extract_path, show_progress=show_progress,
                 progress_file=progress_file
             )
+            self._root.touch(extract_path, hit=hit)
+            return extract_path
 
     def download_and_extract(self, uri, filename=None, extract_dir=None,
                              show_progress=None, progress_file=sys.stderr,
-                             hasher=None, expected_hash=None):
+                             hasher=None, expected_hash=None, segments=None):
         """
         Download a file into this :class:`CacheDir`, and extract it.
+        See :meth:`download` for the details of downloading.
 
         Args:
             uri (str): The URI to be retrieved.
@@ -356,6 +986,9 @@ class CacheDir(object):
                 If specified, will compute the hash of downloaded content,
                 and validate against `expected_hash`.
             expected_hash (str): The expected hash of downloaded content.
+            segments (int): The number of parallel range requests to
+                download the file, if the server supports range requests.
+                (default :obj:`None`, use ``settings.download_segments``)
 
         Returns:
             str: The absolute path of the extracted directory.
@@ -375,21 +1008,76 @@ class CacheDir(object):
         extract_path = os.path.abspath(os.path.join(self.path, extract_dir))
 
         # download and extract the file
-        with self._lock_file(file_path):
-            if not os.path.isdir(extract_path):
+        with self._lock_file(file_path), self._lock_file(extract_path):
+            hit = os.path.isdir(extract_path)
+            if not hit:
                 archive_file = self._download(
                     uri, file_path, show_progress=show_progress,
                     progress_file=progress_file, hasher=hasher,
-                    expected_hash=expected_hash
+                    expected_hash=expected_hash, segments=segments
                 )
                 self._extract_file(
                     archive_file, extract_path, show_progress=show_progress,
                     progress_file=progress_file
                 )
                 # download the archive file if we successfully extracted it.
-                os.remove(file_path)
+                _remove_file_and_verified_hash(file_path)
+            self._root.touch(extract_path, hit=hit)
             return extract_path
 
+    def cached_arrays(self, name, key, factory, mmap_mode='r'):
+        """
+        Get the arrays from the ``.npy`` cache in this :class:`CacheDir`,
+        or create them by `factory` and save them into the cache.
+
+        This is useful for caching the arrays converted from slow-to-parse
+        source files (e.g., pickled or compressed datasets), such that the
+        later loads are merely memory-mapped :func:`np.load`.
+
+        Args:
+            name (str): The name prefix of the cache entry.
+            key: A JSON serializable object, which identifies the arrays.
+                It should include the hashes of the source files, as well
+                as the arguments for converting the arrays.
+            factory (() -> tuple[np.ndarray]): The function to create the
+                arrays, if not cached.
+            mmap_mode: The memory-map mode for :func:`np.load`.
+                (default "r", read-only memory-mapped arrays)
+
+        Returns:
+            tuple[np.ndarray]: The cached arrays.
+        """
+        digest = hashlib.md5(
+            json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()
+        cache_path = os.path.abspath(
+            os.path.join(self.path, '{}-{}'.format(name, digest)))
+
+        def array_path(parent, i):
+            return os.path.join(parent, 'arr_{}.npy'.format(i))
+
+        with self._lock_file(cache_path):
+            hit = os.path.isdir(cache_path)
+            if not hit:
+                temp_path = cache_path + '._writing_'
+                try:
+                    makedirs(temp_path, exist_ok=True)
+                    for i, arr in enumerate(factory()):
+                        np.save(array_path(temp_path, i), arr)
+                except BaseException:
+                    if os.path.isdir(temp_path):
+                        shutil.rmtree(temp_path)
+                    raise
+                else:
+                    os.rename(temp_path, cache_path)
+
+            self._root.touch(cache_path, hit=hit)
+            ret = []
+            while os.path.isfile(array_path(cache_path, len(ret))):
+                ret.append(np.load(array_path(cache_path, len(ret)),
+                                   mmap_mode=mmap_mode))
+            return tuple(ret)
+
     def purge_all(self):
         """Delete everything in this :class:`CacheDir`."""
         shutil.rmtree(self.path)
+        self._root.remove(self.path)
@@ -1,3 +1,5 @@
+import os
+
 import numpy as np
 from numpy.random import RandomState
 
@@ -7,6 +9,8 @@ __all__ = [
     'minibatch_slices_iterator',
     'split_numpy_arrays',
     'split_numpy_array',
+    'ArrayCollector',
+    'PackedArray',
 ]
 
 
@@ -115,3 +119,251 @@ def split_numpy_array(array, portion=None, size=None, shuffle=True):
     (a,), (b,) = split_numpy_arrays((array,), portion=portion, size=size,
                                     shuffle=shuffle)
     return a, b
+
+
+class ArrayCollector(object):
+    """
+    Collect arrays along the first axis into a single array, without
+    keeping the separated arrays and concatenating them at last.
+
+    The collected data are copied into a pre-allocated buffer, whose size
+    is `capacity` if specified, or otherwise grown geometrically.  At last,
+    the buffer is shrunk to the collected size.  If `memmap_path` is
+    specified, the buffer will be a :class:`np.memmap` on that file, which
+    allows collecting arrays larger than the memory.
+
+    Usage::
+
+        collector = ArrayCollector(capacity=len(x))
+        for batch_x in ...:
+            collector.append(batch_x)
+        collected_x = collector.to_array()
+    """
+
+    def __init__(self, capacity=None, memmap_path=None):
+        """
+        Construct a new :class:`ArrayCollector`.
+
+        Args:
+            capacity (int): The expected size of the collected array, along
+                the first axis.  The collector can still grow beyond this
+                size, but it is most efficient when the size is exact.
+                (default :obj:`None`, unknown size)
+            memmap_path (str): If specified, store the collected data in
+                this file, as a raw :class:`np.memmap`.
+        """
+        if capacity is not None and capacity < 0:
+            raise ValueError('`capacity` must be non-negative.')
+        self._capacity = capacity
+        self._memmap_path = memmap_path
+        self._buffer = None
+        self._length = 0
+        self._finished = False
+
+    @property
+    def length(self):
+        """Get the size of the collected data along the first axis."""
+        return self._length
+
+    def _allocate(self, capacity, shape, dtype):
+        if self._memmap_path is None:
+            return np.empty((capacity,) + shape, dtype=dtype)
+        else:
+            # zero-length file cannot be memory-mapped
+            return np.memmap(self._memmap_path, dtype=dtype, mode='w+',
+                             shape=(max(capacity, 1),) + shape)
+
+    def _resize(self, capacity):
+        shape = self._buffer.shape[1:]
+        dtype = self._buffer.dtype
+        if self._memmap_path is None:
+            # `resize` may re-allocate the memory in place, without copying
+            self._buffer.resize((capacity,) + shape, refcheck=False)
+        else:
+            # re-map the file with the new size, truncating the file if
+            # it is going to be shrunk
+            self._buffer.flush()
+            self._buffer = None
+            n_bytes = int(np.prod((capacity,) + shape, dtype=np.int64)) * \
+                dtype.itemsize
+            if os.path.getsize(self._memmap_path) > n_bytes:
+                with open(self._memmap_path, 'r+b') as f:
+                    f.truncate(n_bytes)
+            self._buffer = np.memmap(
+                self._memmap_path, dtype=dtype, mode='r+',
+                shape=(capacity,) + shape
+            )
+
+    def append(self, arr):
+        """
+        Append an array to the collected data.
+
+        Args:
+            arr (np.ndarray): The array to be appended, along the first axis.
+
+        Raises:
+            ValueError: If the shape of `arr` does not match the collected
+                data, or the dtype of `arr` cannot be cast into the dtype
+                of the memory-mapped data.
+            RuntimeError: If :meth:`to_array` has been called.
+        """
+        if self._finished:
+            raise RuntimeError('The collected array has been taken out, '
+                               'cannot append more data.')
+        arr = np.asarray(arr)
+        if len(arr.shape) < 1:
+            raise ValueError('`arr` must be at least 1-d.')
+        length = len(arr)
+
+        # allocate or check the buffer
+        if self._buffer is None:
+            capacity = self._capacity
+            if capacity is None or capacity < length:
+                capacity = length
+            self._buffer = self._allocate(capacity, arr.shape[1:], arr.dtype)
+        else:
+            if arr.shape[1:] != self._buffer.shape[1:]:
+                raise ValueError(
+                    'The shape of the array does not match the collected '
+                    'data: {!r} vs {!r}.'.format(
+                        arr.shape[1:], self._buffer.shape[1:]))
+            if arr.dtype != self._buffer.dtype:
+                dtype = np.result_type(self._buffer, arr)
+                if dtype != self._buffer.dtype:
+                    if self._memmap_path is not None:
+                        raise ValueError(
+                            'The dtype of the array cannot be cast into the '
+                            'memory-mapped data: {} vs {}.'.format(
+                                arr.dtype, self._buffer.dtype))
+                    self._buffer = self._buffer.astype(dtype)
+            if self._length + length > len(self._buffer):
+                self._resize(max(self._length + length,
+                                 2 * len(self._buffer)))
+
+        # copy the array into the buffer
+        self._buffer[self._length: self._length + length] = arr
+        self._length += length
+
+    def to_array(self):
+        """
+        Get the collected array.  No more array can be appended after
+        calling this method.
+
+        Returns:
+            np.ndarray: The collected array.
+
+        Raises:
+            ValueError: If no array has been appended.
+        """
+        if self._buffer is None:
+            raise ValueError('No array has been collected.')
+        self._finished = True
+        if self._length == 0:
+            # zero-length file cannot be memory-mapped, thus we always
+            # return an in-memory array for empty data
+            return np.empty((0,) + self._buffer.shape[1:],
+                            dtype=self._buffer.dtype)
+        if self._length != len(self._buffer):
+            self._resize(self._length)
+        if self._memmap_path is not None:
+            self._buffer.flush()
+        return self._buffer
+
+
+class PackedArray(object):
+    """
+    A numpy-like array proxy upon compact storage (e.g., `np.uint8` pixels),
+    which casts (and optionally normalizes) the values only when indexed.
+
+    Datasets kept in their native compact type take much less memory than
+    being casted into `np.float32` in advance, and the casting cost is then
+    paid per mini-batch, inside the data flow pipeline.  For example::
+
+        (train_x, train_y), _ = load_cifar100(lazy=True, normalize_x=True)
+        for [batch_x, batch_y] in DataFlow.arrays(
+                [train_x, train_y], batch_size=64, shuffle=True):
+            # `batch_x` is a float32 array in [0, 1]
+            ...
+    """
+
+    def __init__(self, data, dtype=np.float32, divisor=None):
+        """
+        Construct a new :class:`PackedArray`.
+
+        Args:
+            data: The numpy-like array of the compact storage.
+            dtype: Cast the indexed values into this data type.
+                (default `np.float32`)
+            divisor: If specified, divide the casted values by this number,
+                e.g., ``255.`` to normalize pixels into ``[0, 1]``.
+                (default :obj:`None`)
+        """
+        self._data = data
+        self._dtype = np.dtype(dtype)
+        self._divisor = divisor
+
+    def __repr__(self):
+        return 'PackedArray(shape={!r}, dtype={}, storage_dtype={})'. \
+            format(self.shape, self.dtype, self.data.dtype)
+
+    @property
+    def data(self):
+        """Get the array of the compact storage."""
+        return self._data
+
+    @property
+    def dtype(self):
+        """Get the data type of the indexed values."""
+        return self._dtype
+
+    @property
+    def divisor(self):
+        """Get the divisor for the casted values."""
+        return self._divisor
+
+    @property
+    def shape(self):
+        """Get the shape of the array."""
+        return tuple(self._data.shape)
+
+    @property
+    def ndim(self):
+        """Get the number of dimensions of the array."""
+        return len(self._data.shape)
+
+    @property
+    def nbytes(self):
+        """Get the number of bytes of the compact storage."""
+        return self._data.nbytes
+
+    def __len__(self):
+        return len(self._data)
+
+    def _unpack(self, values):
+        values = np.asarray(values).astype(self._dtype)
+        if self._divisor is not None:
+            values /= np.asarray(self._divisor, dtype=self._dtype)
+        return values
+
+    def __getitem__(self, item):
+        return self._unpack(self._data[item])
+
+    def __array__(self, dtype=None, copy=None):
+        ret = self._unpack(self._data)
+        if dtype is not None:
+            ret = ret.astype(dtype, copy=False)
+        return ret
+
+    def subset(self, indices):
+        """
+        Get a subset of this array, without unpacking the values.
+
+        Args:
+            indices: The indices or slice along the first axis.
+
+        Returns:
+            PackedArray: The subset array, sharing the same `dtype` and
+                `divisor` with this array.
+        """
+        return PackedArray(self._data[indices], dtype=self._dtype,
+                           divisor=self._divisor)
@@ -1,3 +1,5 @@
+import os
+
 from .config_utils import Config, ConfigField
 
 __all__ = ['TFSnippetConfig', 'settings']
@@ -24,6 +26,32 @@ class TFSnippetConfig(Config):
         bool, default=False,
         description='Whether or not to validate the checksum of cached files?'
     )
+    cache_dataset_arrays = ConfigField(
+        bool, default=True,
+        description='Whether or not to cache the converted arrays of the '
+                    'datasets as `.npy` files in the cache directory?'
+    )
+    cache_size_budget = ConfigField(
+        int, default=None, nullable=True,
+        description='The maximum total size in bytes of the entries in the '
+                    'cache root directory.  The least recently used entries '
+                    'are evicted when exceeding this budget.  If not '
+                    'specified, the cache size is not limited.'
+    )
+    download_segments = ConfigField(
+        int, default=1,
+        description='The number of parallel range requests to download each '
+                    'file into the cache directory, if supported by the '
+                    'server.'
+    )
+    download_mirror = ConfigField(
+        str, default=os.environ.get('TFSNIPPET_DOWNLOAD_MIRROR') or None,
+        nullable=True,
+        description='The URL prefix or the local directory of a mirror, '
+                    'where to fetch the files before trying the original '
+                    'URLs.  It can be set by the environmental variable '
+                    '`TFSNIPPET_DOWNLOAD_MIRROR`.'
+    )
 
 
 settings = TFSnippetConfig()